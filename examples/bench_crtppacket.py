@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Micro-benchmark of the per-packet cost of CRTPPacket.
+
+A copy of the previous struct based implementation is kept here so the cost
+before and after the __slots__ rewrite can be compared on the same machine.
+Each iteration does what a typical receive callback does: create a packet
+from a header and payload and read the tuple/list views a few times.
+"""
+
+import sys
+sys.path.append("../lib")
+
+import struct
+import timeit
+
+from cflib.crtp.crtpstack import CRTPPacket
+
+ITERATIONS = 200000
+
+
+class LegacyCRTPPacket(object):
+    """The CRTPPacket implementation before the __slots__ rewrite"""
+
+    def __init__(self, header=0, data=None):
+        self.size = 0
+        self._data = ""
+        self.header = header | 0x3 << 2
+        self._port = (header & 0xF0) >> 4
+        self._channel = header & 0x03
+        if data:
+            self._set_data(data)
+
+    def _get_data(self):
+        return self._data
+
+    def _set_data(self, data):
+        if type(data) == str:
+            self._data = data
+        elif type(data) == list or type(data) == tuple:
+            if len(data) == 1:
+                self._data = struct.pack("B", data[0])
+            elif len(data) > 1:
+                self._data = struct.pack("B" * len(data), *data)
+            else:
+                self._data = ""
+
+    def _get_data_l(self):
+        return list(self._get_data_t())
+
+    def _get_data_t(self):
+        return struct.unpack("B" * len(self._data), self._data)
+
+    data = property(_get_data, _set_data)
+    datal = property(_get_data_l, _set_data)
+    datat = property(_get_data_t, _set_data)
+
+
+PAYLOAD = struct.pack("<BBBBfff", 2, 0x10, 0x20, 0x30, 1.0, 2.0, 3.0)
+PAYLOAD_LIST = list(bytearray(PAYLOAD))
+
+
+def receive_path(packet_class):
+    """Packet built from a str payload and then inspected the way
+    Log/TocFetcher/Crazyflie._check_for_answers does it"""
+    pk = packet_class(0x52, PAYLOAD)
+    pk.datal[0]
+    (pk.header,) + pk.datat
+    pk.datat[0]
+    pk.data[1:]
+
+
+def radio_path(packet_class):
+    """Packet built from a list of bytes, as the radio driver does"""
+    pk = packet_class(0x52, PAYLOAD_LIST)
+    (pk.header,) + pk.datat
+    pk.datat[0]
+
+
+def send_path(packet_class):
+    """Packet built from a tuple like the TOC/param/log requests"""
+    pk = packet_class()
+    pk.data = (0, 12)
+    pk.datat[0:2]
+
+
+def run(name, func):
+    """Run func for both implementations and print the result"""
+    before = min(timeit.repeat(lambda: func(LegacyCRTPPacket), repeat=3,
+                               number=ITERATIONS))
+    after = min(timeit.repeat(lambda: func(CRTPPacket), repeat=3,
+                              number=ITERATIONS))
+    print "%-12s before: %6.2f us/packet  after: %6.2f us/packet  (%.1fx)" % (
+        name, before / ITERATIONS * 1e6, after / ITERATIONS * 1e6,
+        before / after)
+
+
+if __name__ == '__main__':
+    run("receive", receive_path)
+    run("radio", radio_path)
+    run("send", send_path)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Benchmark of the dispatch of incoming packets to the port callbacks.
+
+The callbacks registered by a connected Crazyflie (console, param, log and
+the two TOC ports) are dispatched a synthetic mix of packets, using the
+header table of the incoming packet handler and a copy of the previous
+implementation that tested every callback for every packet.
+"""
+
+import sys
+sys.path.append("../lib")
+
+import logging
+import timeit
+
+logging.basicConfig(level=logging.ERROR)
+
+from cflib.crazyflie import _IncomingPacketHandler
+from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
+
+ITERATIONS = 200000
+
+
+def legacy_dispatch(callbacks, pk):
+    """The dispatch loop before the header table"""
+    found = False
+    for cb in callbacks:
+        if (cb[0] == pk.port & cb[1] and
+                cb[2] == pk.channel & cb[3]):
+            cb[4](pk)
+            if (cb[0] != 0xFF):
+                found = True
+    return found
+
+
+def callback(pk):
+    pass
+
+
+if __name__ == "__main__":
+    handler = _IncomingPacketHandler(None)
+    for port in (CRTPPort.CONSOLE, CRTPPort.PARAM, CRTPPort.LOGGING,
+                 CRTPPort.PARAM, CRTPPort.LOGGING):
+        handler.add_port_callback(port, callback)
+    for i in range(3):
+        handler.add_header_callback(callback, CRTPPort.LINKCTRL, i)
+
+    # Mostly log data, some console and param traffic
+    packets = ([CRTPPacket(0x52, "\x01\x00\x00\x00")] * 8 +
+               [CRTPPacket(0x00, "hello")] +
+               [CRTPPacket(0x22, "\x01\x02")])
+
+    def new():
+        for pk in packets:
+            handler._dispatch(pk)
+
+    def legacy():
+        for pk in packets:
+            legacy_dispatch(handler.cb, pk)
+
+    for (name, func) in (("legacy", legacy), ("table", new)):
+        n = ITERATIONS / len(packets)
+        t = min(timeit.repeat(func, number=n, repeat=3))
+        print "%-8s %9.0f packets/s" % (name, n * len(packets) / t)
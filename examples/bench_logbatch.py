@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+
+"""
+Benchmark of the batch decoding of log data with NumPy against the per
+packet decoding, from the packet to the callback of the log configuration.
+
+Usage: bench_logbatch.py [packets]
+"""
+
+import sys
+sys.path.append("../lib")
+
+import time
+
+from cflib.crazyflie.log import Log, LogConfig
+from bench_logdecode import VARIABLES, FakeCrazyflie, make_packets
+
+
+def run(label, log, packets, reference=None):
+    """Pass the packets to the log and flush what is left in the batches"""
+    start = time.time()
+    for pk in packets:
+        log._new_packet_cb(pk)
+    log.flush_batches()
+    rate = len(packets) / (time.time() - start)
+    print "  %-22s %9.0f packets/s%s" % (
+        label, rate, " (%.1fx)" % (rate / reference) if reference else "")
+    return rate
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    log = Log(FakeCrazyflie())
+    block = LogConfig("Bench", 10)
+    for name, fetch_as in VARIABLES:
+        block.add_variable(name, fetch_as)
+    block.compile()
+    log.log_blocks.append(block)
+
+    received = []
+    block.data_received_cb.add_callback(
+        lambda ts, data, conf: received.append((ts, data)))
+    batches = []
+    block.batch_received_cb.add_callback(
+        lambda batch, conf: batches.append(batch))
+
+    print "Decoding %d packets with %d variables (%d bytes)" % (
+        count, len(block.variables), block._struct.size)
+    reference = {}
+    for form in (LogConfig.DICT, LogConfig.TUPLE):
+        block.set_delivery(form)
+        reference[form] = run("per packet %s" % form, log,
+                              make_packets(block, count))
+    timestamps = [ts for ts, _ in received[-count:]]
+    values = [[data[i] for data in [d for _, d in received[-count:]]]
+              for i in range(len(VARIABLES))]
+
+    for batch_size in (64, 256, 1024):
+        log.enable_batch(block, batch_size, interval=10)
+        del batches[:]
+        run("batch of %d" % batch_size, log, make_packets(block, count),
+            reference[LogConfig.DICT])
+        log.disable_batch(block)
+        assert sum(len(b) for b in batches) == count
+        assert [int(t) for b in batches for t in b["timestamp"]] == \
+            timestamps
+        for i, (name, _) in enumerate(VARIABLES):
+            assert [v.item() for b in batches for v in b[name]] == values[i]
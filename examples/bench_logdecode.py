@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Benchmark of the decoding of log data packets, from the packet to the
+callback of the log configuration, for each delivery form against the
+decoding done before the decoders were precompiled.
+
+Usage: bench_logdecode.py [packets]
+"""
+
+import sys
+sys.path.append("../lib")
+
+import array
+import struct
+import time
+
+from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
+from cflib.crazyflie.log import Log, LogConfig, LogTocElement, CHAN_LOGDATA
+from cflib.utils.callbacks import Caller
+
+VARIABLES = [("stabilizer.roll", "float"), ("stabilizer.pitch", "float"),
+             ("stabilizer.yaw", "float"), ("stabilizer.thrust", "uint16_t"),
+             ("acc.x", "float"), ("acc.y", "float"), ("acc.z", "float"),
+             ("pm.vbat", "FP16")]
+
+
+class FakeCrazyflie(object):
+    """Just enough of a Crazyflie for Log"""
+    def __init__(self):
+        self.reply_timeout = Caller()
+
+    def add_port_callback(self, port, cb):
+        pass
+
+
+def old_unpack_log_data(block, log_data, timestamp):
+    """LogConfig.unpack_log_data before the decoders were precompiled"""
+    ret_data = {}
+    data_index = 0
+    for var in block.variables:
+        size = LogTocElement.get_size_from_id(var.fetch_as)
+        name = var.name
+        unpackstring = LogTocElement.get_unpack_string_from_id(
+            var.fetch_as)
+        value = struct.unpack(unpackstring,
+                              log_data[data_index:data_index + size])[0]
+        data_index += size
+        ret_data[name] = value
+    block.data_received_cb.call(timestamp, ret_data, block)
+
+
+def old_new_packet_cb(log, packet):
+    """The log data part of Log._new_packet_cb before"""
+    id = packet.datat[0]
+    block = log._find_block(id)
+    timestamps = struct.unpack("<BBB", packet.data[1:4])
+    timestamp = (timestamps[0] | timestamps[1] << 8 | timestamps[2] << 16)
+    logdata = packet.data[4:]
+    old_unpack_log_data(block, logdata, timestamp)
+
+
+def make_packets(block, count):
+    """Log data packets with different timestamps and values"""
+    fmt = "<" + "".join(LogTocElement.get_unpack_string_from_id(
+        var.fetch_as)[1:] for var in block.variables)
+    packets = []
+    for i in range(count):
+        values = [i * 0.5 if c in "fd" else i % 1000 for c in fmt[1:]]
+        data = struct.pack("<BHB", block.id, i & 0xFFFF, i >> 16 & 0xFF)
+        data += struct.pack(fmt, *values)
+        packets.append(CRTPPacket(CRTPPort.LOGGING << 4 | CHAN_LOGDATA,
+                                  data))
+    return packets
+
+
+def run(label, decode, packets, reference=None):
+    """Decode the packets, new ones for each run so no cached views of the
+    packet data are reused"""
+    start = time.time()
+    for pk in packets:
+        decode(pk)
+    rate = len(packets) / (time.time() - start)
+    print "  %-22s %9.0f packets/s%s" % (
+        label, rate, " (%.1fx)" % (rate / reference) if reference else "")
+    return rate
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    log = Log(FakeCrazyflie())
+    block = LogConfig("Bench", 10)
+    for name, fetch_as in VARIABLES:
+        block.add_variable(name, fetch_as)
+    block.compile()
+    log.log_blocks.append(block)
+    received = []
+    block.data_received_cb.add_callback(
+        lambda ts, data, conf: received.append(data))
+
+    print "Decoding %d packets with %d variables (%d bytes)" % (
+        count, len(block.variables), block._struct.size)
+    old = run("before", lambda pk: old_new_packet_cb(log, pk),
+              make_packets(block, count))
+    reference = received[-1]
+    del received[:]
+
+    targets = [(LogConfig.DICT, None), (LogConfig.TUPLE, None),
+               (LogConfig.RECORD, None), (LogConfig.ARRAY, [0.0] * 8),
+               (LogConfig.ARRAY, array.array("d", [0.0] * 8))]
+    for form, target in targets:
+        block.set_delivery(form, target)
+        run("%s %s" % (form, type(target).__name__ if target else ""),
+            log._new_packet_cb, make_packets(block, count), old)
+        data = received[-1]
+        values = [data[name] for name, _ in VARIABLES] if form == "dict" \
+            else list(data)
+        assert values == [reference[name] for name, _ in VARIABLES]
+        del received[:]
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+
+"""
+Benchmark of the log traffic of the client, with one log configuration per
+consumer and with the same variables as subscriptions, which are packed into
+shared log blocks.
+
+Usage: bench_logpacking.py [URI] [seconds]
+"""
+
+import sys
+sys.path.append("../lib")
+
+import time
+import logging
+
+logging.basicConfig(level=logging.ERROR)
+
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.log import LogConfig, LogSubscription
+
+# The logging of the flight tab, the GPS tab and the main window, and a plot
+# of the attitude
+CONSUMERS = [
+    ("Stabilizer", 100, [("stabilizer.roll", "float"),
+                         ("stabilizer.pitch", "float"),
+                         ("stabilizer.yaw", "float"),
+                         ("stabilizer.thrust", "uint16_t")]),
+    ("Motors", 100, ["motor.m1", "motor.m2", "motor.m3", "motor.m4"]),
+    ("Baro", 200, [("baro.aslLong", "float")]),
+    ("AltHold", 200, [("altHold.target", "float")]),
+    ("GPS", 100, ["gps.lat", "gps.lon", "gps.hMSL", "gps.heading",
+                  "gps.gSpeed", "gps.hAcc", "gps.fixType"]),
+    ("Battery", 1000, [("pm.vbat", "float")]),
+    ("Plot", 100, [("stabilizer.roll", "float"),
+                   ("stabilizer.pitch", "float"),
+                   ("stabilizer.yaw", "float")]),
+]
+
+
+class Counter:
+    """Counts the log data packets and the callbacks of the consumers"""
+
+    def __init__(self):
+        self.packets = 0
+        self.bytes = 0
+        self.callbacks = 0
+
+    def packet(self, pk):
+        if pk.port == 5 and pk.channel == 2:
+            self.packets += 1
+            self.bytes += len(pk.data)
+
+    def callback(self, timestamp, data, conf):
+        self.callbacks += 1
+
+
+def add_configs(cf, counter):
+    """One log configuration per consumer"""
+    for name, period, variables in CONSUMERS:
+        conf = LogConfig(name, period)
+        for var in variables:
+            if isinstance(var, tuple):
+                conf.add_variable(*var)
+            else:
+                conf.add_variable(var)
+        cf.log.add_config(conf)
+        conf.data_received_cb.add_callback(counter.callback)
+        conf.start()
+
+
+def add_subscriptions(cf, counter):
+    """The variables of the consumers as subscriptions"""
+    for name, period, variables in CONSUMERS:
+        sub = LogSubscription(name, period, variables)
+        sub.data_received_cb.add_callback(counter.callback)
+        cf.log.subscribe(sub)
+
+
+def run(label, cf, uri, setup, seconds):
+    """Connect, set up the logging and count the traffic. The same
+    Crazyflie is used for both runs, the blocks are removed when
+    reconnecting"""
+    counter = Counter()
+    cf.connected.add_callback(lambda uri: setup(cf, counter))
+    cf.open_link(uri)
+    time.sleep(1)
+    cf.packet_received.add_callback(counter.packet)
+    counter.callbacks = 0
+    time.sleep(seconds)
+    cf.packet_received.remove_callback(counter.packet)
+    cf.connected.callbacks = []
+    blocks = len(cf.log.log_blocks)
+    cf.close_link()
+    print "  %-14s %2d blocks %6.1f packets/s %7.0f bytes/s %6.1f " \
+          "callbacks/s" % (label, blocks, counter.packets / seconds,
+                           counter.bytes / seconds,
+                           counter.callbacks / seconds)
+
+
+if __name__ == "__main__":
+    uri = sys.argv[1] if len(sys.argv) > 1 else "debug://0/0"
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    cflib.crtp.init_drivers(enable_debug_driver=True)
+    cf = Crazyflie()
+    print "Log traffic of %d consumers on %s" % (len(CONSUMERS), uri)
+    run("configs", cf, uri, add_configs, seconds)
+    run("subscriptions", cf, uri, add_subscriptions, seconds)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Benchmark of the send path when the link stalls, using a simulated Crazyradio
+so no hardware is needed.
+
+The radio is paused so nothing is sent, then param read requests are sent
+until well past the size of the send queue. Sending never blocks: the
+packets that do not fit are reported by send_queue_full and sent again by
+the retries, and send_queue_high signals when senders should hold back.
+
+Usage: bench_sendpath.py [requests]
+"""
+
+import sys
+sys.path.append("../lib")
+
+import time
+import logging
+
+logging.basicConfig(level=logging.ERROR)
+
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
+from cflib.drivers.simradio import SimulatedCrazyradio, SimulatedCopter
+
+PARAM_READ_CHANNEL = 1
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    cflib.crtp.init_drivers()
+    radio = SimulatedCrazyradio()
+    radio.add_copter(SimulatedCopter(channel=80))
+    radio.plug()
+
+    cf = Crazyflie()
+    connected = []
+    full = []
+    high = []
+    cf.connected.add_callback(connected.append)
+    cf.send_queue_full.add_callback(full.append)
+    cf.send_queue_high.add_callback(lambda h: high.append((time.time(), h)))
+    cf.open_link("radio://0/80/2M")
+    while not connected:
+        time.sleep(0.01)
+
+    cf.link.pause()
+    times = []
+    refused = 0
+    for i in range(requests):
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.PARAM, PARAM_READ_CHANNEL)
+        pk.data = (i % 24, )
+        start = time.time()
+        cf.send_packet(pk, expected_reply=(i % 24, ))
+        times.append(time.time() - start)
+        # A sender that sheds load instead
+        if not cf.try_send(pk):
+            refused += 1
+    print "Stalled link: %d send_packet calls, max %.1fus, mean %.1fus" % (
+        requests, max(times) * 1e6, sum(times) / len(times) * 1e6)
+    print "  queue full for %d packets, try_send refused %d" % (len(full),
+                                                               refused)
+    print "  high watermark signalled: %s" % (
+        [h for (_, h) in high] == [True])
+
+    restarted = time.time()
+    cf.link.restart()
+    while cf.get_reply_stats()["pending"] and time.time() - restarted < 10:
+        time.sleep(0.01)
+    print "Link restarted: replies pending %d after %.2fs, signals %s" % (
+        cf.get_reply_stats()["pending"], time.time() - restarted,
+        [h for (_, h) in high])
+
+    cf.close_link()
+    radio.unplug()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Benchmark of the radio driver polling loop, using a simulated Crazyradio so
+no hardware is needed.
+
+A Crazyflie is connected to a simulated copter running the debug driver
+firmware emulation, a log block is started and the link statistics and the
+CPU time used by the process are reported for each polling policy.
+
+Usage: bench_simradio.py [loss] [usb latency in s]
+"""
+
+import sys
+sys.path.append("../lib")
+
+import os
+import time
+import logging
+
+logging.basicConfig(level=logging.ERROR)
+
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.log import LogConfig
+from cflib.drivers.simradio import SimulatedCrazyradio, SimulatedCopter
+
+DURATION = 3.0
+URI = "radio://0/80/2M"
+
+
+def run(policy, loss, latency):
+    radio = SimulatedCrazyradio(loss=loss, latency=latency, seed=1)
+    radio.add_copter(SimulatedCopter(channel=80))
+    radio.plug()
+
+    cf = Crazyflie()
+    connected = []
+    cf.connected.add_callback(connected.append)
+    start = time.time()
+    cf.open_link(URI)
+    cf.link.set_polling_policy(policy)
+    while not connected and time.time() - start < 30:
+        time.sleep(0.01)
+    connect_time = time.time() - start
+
+    received = []
+    lg = LogConfig("Stab", 10)
+    lg.add_variable("stabilizer.roll", "float")
+    lg.add_variable("stabilizer.pitch", "float")
+    cf.log.add_config(lg)
+    lg.data_received_cb.add_callback(lambda ts, data, conf:
+                                     received.append(ts))
+    lg.start()
+
+    cpu_start = sum(os.times()[:2])
+    time.sleep(DURATION)
+    cpu = sum(os.times()[:2]) - cpu_start
+    stats = cf.get_link_stats()
+    cf.close_link()
+    radio.unplug()
+
+    print "%-10s connect %.2fs  log %5.1f/s  polls %6.1f/s  ack rate %.3f" \
+          "  usb %4.1f%%  cpu %4.1f%%" % (
+              policy, connect_time, len(received) / DURATION,
+              stats["poll_rate"], stats["ack_rate"],
+              stats["usb_time"] * 100, cpu / DURATION * 100)
+
+
+if __name__ == "__main__":
+    loss = float(sys.argv[1]) if len(sys.argv) > 1 else 0.0
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0005
+    cflib.crtp.init_drivers()
+    print "Simulated link, loss %.2f, USB latency %.1fms" % (loss,
+                                                            latency * 1000)
+    for policy in ("lowlatency", "balanced", "lowcpu"):
+        run(policy, loss, latency)
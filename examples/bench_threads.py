@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Counts the threads started by the library while connecting to the debug
+driver (log and param TOC download) and writing parameters.
+
+Usage: bench_threads.py [debug URI]
+"""
+
+import sys
+sys.path.append("../lib")
+
+import threading
+import time
+import logging
+
+logging.basicConfig(level=logging.ERROR)
+
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+
+PARAM_WRITES = 200
+
+started = [0]
+peak = [0]
+_start = threading.Thread.start
+
+
+def counting_start(self):
+    started[0] += 1
+    _start(self)
+    peak[0] = max(peak[0], threading.active_count())
+
+threading.Thread.start = counting_start
+
+
+def phase(name, func):
+    started[0] = 0
+    peak[0] = threading.active_count()
+    t = time.time()
+    func()
+    print "%-14s %5d threads started, peak %3d alive, %.2fs" % (
+        name, started[0], peak[0], time.time() - t)
+
+
+if __name__ == "__main__":
+    uri = sys.argv[1] if len(sys.argv) > 1 else "debug://0/0"
+    cflib.crtp.init_drivers(enable_debug_driver=True)
+    cf = Crazyflie()
+
+    def connect():
+        done = threading.Event()
+        cf.connected.add_callback(lambda uri: done.set())
+        cf.open_link(uri)
+        done.wait(60)
+
+    def write_params():
+        updated = []
+        cf.param.add_update_callback(group="apid",
+                                     cb=lambda name, value:
+                                     updated.append(name))
+        for i in range(PARAM_WRITES):
+            cf.param.set_value("apid.prp", str(i % 10))
+        while len(updated) < PARAM_WRITES:
+            time.sleep(0.01)
+
+    phase("connect", connect)
+    phase("param writes", write_params)
+    cf.close_link()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Benchmark of loading TOCs from the cache, the JSON files shipped in
+lib/cflib/cache against the binary format they are imported to.
+
+Usage: bench_toccache.py [loads]
+"""
+
+import sys
+sys.path.append("../lib")
+
+import os
+import shutil
+import tempfile
+import timeit
+
+import cflib
+from cflib.crazyflie.toc import TocElement
+from cflib.crazyflie.toccache import TocCache
+
+DIST_CACHE = os.path.join(os.path.dirname(cflib.__file__), "cache")
+
+
+def crcs():
+    return [int(name[:8], 16) for name in sorted(os.listdir(DIST_CACHE))
+            if name.endswith(".json")]
+
+
+def same(a, b):
+    """Check that two TOCs have the same elements"""
+    if sorted(a.keys()) != sorted(b.keys()):
+        return False
+    for group in a:
+        for name, elem in a[group].items():
+            other = b[group].get(name)
+            if (other is None or other.__class__ != elem.__class__ or
+                    [getattr(other, s) for s in TocElement.__slots__] !=
+                    [getattr(elem, s) for s in TocElement.__slots__]):
+                return False
+    return True
+
+
+if __name__ == "__main__":
+    loads = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rw_cache = tempfile.mkdtemp()
+    try:
+        json_cache = TocCache(ro_cache=DIST_CACHE)
+        binary_cache = TocCache(ro_cache=DIST_CACHE, rw_cache=rw_cache)
+        for crc in crcs():
+            # The first fetch imports the JSON file to the binary format
+            assert same(binary_cache.fetch(crc), json_cache.fetch(crc))
+            assert same(binary_cache.fetch(crc), json_cache.fetch(crc))
+
+            size_json = os.path.getsize("%s/%08X.json" % (DIST_CACHE, crc))
+            size_binary = os.path.getsize("%s/%08X.toc" % (rw_cache, crc))
+            t_json = timeit.timeit(lambda: json_cache.fetch(crc),
+                                   number=loads) / loads
+            t_binary = timeit.timeit(lambda: binary_cache.fetch(crc),
+                                     number=loads) / loads
+            print ("%08X: %3d elements, JSON %5d bytes %7.1fus, "
+                   "binary %5d bytes %7.1fus (%.1fx)" % (
+                       crc, sum(len(g) for g in json_cache.fetch(crc).values()),
+                       size_json, t_json * 1e6, size_binary, t_binary * 1e6,
+                       t_json / t_binary))
+
+        t_open = timeit.timeit(
+            lambda: TocCache(ro_cache=DIST_CACHE, rw_cache=rw_cache),
+            number=loads) / loads
+        print "Opening the cache: %.1fus" % (t_open * 1e6)
+    finally:
+        shutil.rmtree(rw_cache)
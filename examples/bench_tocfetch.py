@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Benchmark of the TOC download time for different numbers of element
+requests in flight (the toc_window of Crazyflie). No TOC cache is used.
+
+Usage: bench_tocfetch.py [URI] [runs]
+
+The default URI, debug://0/3, adds random delays of up to 250ms to the
+param replies.
+"""
+
+import sys
+sys.path.append("../lib")
+
+import threading
+import logging
+
+logging.basicConfig(level=logging.ERROR)
+
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+
+WINDOWS = (1, 2, 4, 8, 16)
+
+
+def connect(cf, done, uri):
+    done.clear()
+    cf.open_link(uri)
+    done.wait(120)
+    timing = cf.get_connection_timing()
+    cf.close_link()
+    return timing
+
+
+if __name__ == "__main__":
+    uri = sys.argv[1] if len(sys.argv) > 1 else "debug://0/3"
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    cflib.crtp.init_drivers(enable_debug_driver=True)
+    # One Crazyflie is reused, like the client does, since the debug driver
+    # instance is shared between all connections
+    cf = Crazyflie()
+    done = threading.Event()
+    cf.connected.add_callback(lambda uri: done.set())
+    print "TOC download on %s, mean of %d runs" % (uri, runs)
+    for window in WINDOWS:
+        cf.toc_window = window
+        timings = [connect(cf, done, uri) for _ in range(runs)]
+        print "window %2d: log TOC %.3fs  param TOC %.3fs  connected %.3fs" % (
+            window,
+            sum(t["log_toc"] - t["link"] for t in timings) / runs,
+            sum(t["param_toc"] - t["link"] for t in timings) / runs,
+            sum(t["connected"] for t in timings) / runs)
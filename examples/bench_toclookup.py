@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Micro-benchmark of the TOC lookups, the indexed Toc against the full scans
+it used before. The TOCs from the cache shipped in lib/cflib/cache are used.
+
+Usage: bench_toclookup.py [lookups]
+"""
+
+import sys
+sys.path.append("../lib")
+
+import os
+import timeit
+
+import cflib
+from cflib.crazyflie.toc import Toc
+from cflib.crazyflie.toccache import TocCache
+
+DIST_CACHE = os.path.join(os.path.dirname(cflib.__file__), "cache")
+
+
+def scan_by_id(toc, ident):
+    """Lookup by id as done before the indexes"""
+    for group in toc.keys():
+        for name in toc[group].keys():
+            if toc[group][name].ident == ident:
+                return toc[group][name]
+    return None
+
+
+def scan_id(toc, complete_name):
+    """Lookup of the id of a complete name as done before the indexes"""
+    [group, name] = complete_name.split(".")
+    try:
+        return toc[group][name].ident
+    except KeyError:
+        return None
+
+
+def scan_by_complete_name(toc, complete_name):
+    """Lookup by complete name as done before the indexes"""
+    return scan_by_id(toc, scan_id(toc, complete_name))
+
+
+def scan_prefix(toc, prefix):
+    """Prefix search by scanning all the elements"""
+    return sorted(toc[g][n] for g in toc for n in toc[g]
+                  if ("%s.%s" % (g, n)).startswith(prefix))
+
+
+def bench(label, old, new, keys, number):
+    """Print the mean time of a lookup of each of the keys"""
+    t_old = timeit.timeit(lambda: [old(k) for k in keys], number=number)
+    t_new = timeit.timeit(lambda: [new(k) for k in keys], number=number)
+    n = number * len(keys)
+    print "  %-22s scan %6.2fus  indexed %6.2fus  (%.1fx)" % (
+        label, t_old / n * 1e6, t_new / n * 1e6, t_old / t_new)
+
+
+if __name__ == "__main__":
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    cache = TocCache(ro_cache=DIST_CACHE)
+    for filename in sorted(os.listdir(DIST_CACHE)):
+        toc = Toc()
+        toc.toc = cache.fetch(int(filename[:8], 16))
+        t = toc.toc
+        elements = [e for g in t.values() for e in g.values()]
+        ids = [e.ident for e in elements]
+        names = ["%s.%s" % (e.group, e.name) for e in elements]
+        prefixes = sorted(set(g + "." for g in t))
+        for e, name in zip(elements, names):
+            assert toc.get_element_by_id(e.ident) is e
+            assert toc.get_element_id(name) == e.ident
+            assert toc.get_element_by_complete_name(name) is e
+        for prefix in prefixes:
+            assert (sorted(toc.find_elements(prefix)) ==
+                    scan_prefix(t, prefix))
+
+        print "%s: %d elements in %d groups" % (filename, len(elements),
+                                                len(t))
+        bench("get_element_by_id", lambda k: scan_by_id(t, k),
+              toc.get_element_by_id, ids, number)
+        bench("get_element_id", lambda k: scan_id(t, k),
+              toc.get_element_id, names, number)
+        bench("by_complete_name", lambda k: scan_by_complete_name(t, k),
+              toc.get_element_by_complete_name, names, number)
+        bench("find_elements", lambda k: scan_prefix(t, k),
+              toc.find_elements, prefixes, number / 10)
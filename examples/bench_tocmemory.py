@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Report the memory used by the TOCs when several Crazyflies running the
+same firmware are connected, using simulated copters so no hardware is
+needed. No TOC cache is used, every Crazyflie downloads its TOCs.
+
+Usage: bench_tocmemory.py [number of copters]
+"""
+
+import sys
+sys.path.append("../lib")
+
+import time
+import logging
+
+logging.basicConfig(level=logging.ERROR)
+
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.toc import get_interned_stats
+from cflib.drivers.simradio import SimulatedCrazyradio, SimulatedCopter
+
+
+class DictElement:
+    """A TOC element with a per instance __dict__, like before the TOCs
+    were interned"""
+    def __init__(self, element):
+        for attr in ("ident", "group", "name", "ctype", "pytype", "access"):
+            setattr(self, attr, getattr(element, attr))
+
+
+def dict_element_size(toc):
+    """Size of the elements of a TOC if they had a __dict__ each"""
+    size = 0
+    for elements in toc.itervalues():
+        for element in elements.itervalues():
+            old = DictElement(element)
+            size += sys.getsizeof(old) + sys.getsizeof(old.__dict__)
+    return size
+
+
+if __name__ == "__main__":
+    copters = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    cflib.crtp.init_drivers()
+    radio = SimulatedCrazyradio()
+    for i in range(copters):
+        radio.add_copter(SimulatedCopter(channel=10 + i))
+    radio.plug()
+
+    cfs = []
+    connected = []
+    start = time.time()
+    for i in range(copters):
+        cf = Crazyflie()
+        cf.connected.add_callback(connected.append)
+        cf.open_link("radio://0/%d/2M" % (10 + i))
+        cfs.append(cf)
+    while len(connected) < copters and time.time() - start < 60:
+        time.sleep(0.01)
+    print "%d of %d copters connected in %.2fs" % (len(connected), copters,
+                                                  time.time() - start)
+
+    tocs = [cf.log._toc.toc for cf in cfs] + [cf.param.toc.toc for cf in cfs]
+    stats = get_interned_stats()
+    print "Distinct TOC objects used by the copters: %d" % len(
+        set(id(toc) for toc in tocs))
+    print "Interned: %d TOCs, %d elements, %d bytes" % (
+        stats["tocs"], stats["elements"], stats["bytes"])
+    print "One copy per copter would use %d bytes" % (
+        stats["bytes"] * copters)
+    print "Elements with __slots__ %d bytes, with a __dict__ %d bytes" % (
+        sum(sys.getsizeof(e) for toc in tocs[::copters]
+            for g in toc.itervalues() for e in g.itervalues()),
+        sum(dict_element_size(toc) for toc in tocs[::copters]))
+
+    for cf in cfs:
+        cf.close_link()
+    radio.unplug()
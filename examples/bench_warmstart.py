@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Benchmark of the time to first log data when reconnecting to a copter,
+with the TOCs in the cache (cold start) and with a warm start using the last
+TOCs known for the URI.
+
+Usage: bench_warmstart.py [URI] [connections]
+
+The default URI, debug://0/3, adds random delays of up to 250ms to the
+replies. With debug://0/5 the TOC CRCs change on every connection, so the
+warm start is always invalidated.
+"""
+
+import sys
+sys.path.append("../lib")
+
+import shutil
+import tempfile
+import threading
+import time
+import logging
+
+logging.basicConfig(level=logging.ERROR)
+
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.log import LogConfig
+
+
+class Consumer:
+    """Starts a log block when the Crazyflie is connected, like a UI would"""
+
+    def __init__(self, cf):
+        self.cf = cf
+        self.first_data = threading.Event()
+        self.invalidated = 0
+        cf.connected.add_callback(self._connected)
+        cf.warm_start_invalidated.add_callback(self._invalidated)
+
+    def _connected(self, uri):
+        lg = LogConfig("Stab", 10)
+        lg.add_variable("stabilizer.roll", "float")
+        self.cf.log.add_config(lg)
+        lg.data_received_cb.add_callback(
+            lambda ts, data, conf: self.first_data.set())
+        lg.start()
+
+    def _invalidated(self, uri):
+        self.invalidated += 1
+
+
+def connect(cf, consumer, uri):
+    consumer.first_data.clear()
+    start = time.time()
+    cf.open_link(uri)
+    consumer.first_data.wait(30)
+    first_data = time.time() - start
+    # Wait for the TOCs to be validated before closing
+    deadline = time.time() + 30
+    while cf._tocs_pending and time.time() < deadline:
+        time.sleep(0.01)
+    timing = cf.get_connection_timing()
+    cf.close_link()
+    return timing["connected"], first_data
+
+
+if __name__ == "__main__":
+    uri = sys.argv[1] if len(sys.argv) > 1 else "debug://0/3"
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    cflib.crtp.init_drivers(enable_debug_driver=True)
+
+    rw_cache = tempfile.mkdtemp()
+    try:
+        # One Crazyflie is reused, like the client does, since the debug
+        # driver instance is shared between all connections
+        cf = Crazyflie(rw_cache=rw_cache)
+        consumer = Consumer(cf)
+        # Fill the cache
+        connect(cf, consumer, uri)
+
+        print "Reconnecting to %s, mean of %d connections" % (uri,
+                                                            connections)
+        for warm_start in (False, True):
+            cf.warm_start = warm_start
+            consumer.invalidated = 0
+            times = [connect(cf, consumer, uri) for _ in range(connections)]
+            print "%-5s start: connected %.3fs  first log data %.3fs" \
+                  "  invalidated %d" % (
+                      "warm" if warm_start else "cold",
+                      sum(t[0] for t in times) / connections,
+                      sum(t[1] for t in times) / connections,
+                      consumer.invalidated)
+    finally:
+        shutil.rmtree(rw_cache)
@@ -30,6 +30,7 @@ Simple example that scans for available Crazyflies and lists them.
 """
 
 import sys
+import time
 sys.path.append("../lib")
 
 import cflib.crtp
@@ -38,8 +39,9 @@ import cflib.crtp
 cflib.crtp.init_drivers(enable_debug_driver=False)
 
 print "Scanning interfaces for Crazyflies..."
-available = cflib.crtp.scan_interfaces()
+start = time.time()
 print "Crazyflies found:"
-for i in available:
-    print i[0]
+for i in cflib.crtp.scan_interfaces_iter():
+    print "  %s (after %.3fs)" % (i[0], time.time() - start)
+print "Scan done in %.3fs" % (time.time() - start)
 
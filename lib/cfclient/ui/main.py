@@ -54,7 +54,7 @@ import cfclient.ui.toolboxes
 import cfclient.ui.tabs
 import cflib.crtp
 
-from cflib.crazyflie.log import Log, LogVariable, LogConfig
+from cflib.crazyflie.log import Log, LogVariable, LogSubscription
 
 from cfclient.ui.dialogs.bootloader import BootloaderDialog
 from cfclient.ui.dialogs.about import AboutDialog
@@ -98,9 +98,11 @@ class MainUI(QtGui.QMainWindow, main_window_class):
 
         self.cf = Crazyflie(ro_cache=sys.path[0] + "/cflib/cache",
                             rw_cache=sys.path[1] + "/cache")
+        self._battery_subscription = None
 
         cflib.crtp.init_drivers(enable_debug_driver=GuiConfig()
-                                                .get("enable_debug_driver"))
+                                                .get("enable_debug_driver"),
+                                scan_cache=sys.path[1] + "/scancache.json")
 
         # Create the connection dialogue
         self.connectDialogue = ConnectDialogue()
@@ -161,9 +163,7 @@ class MainUI(QtGui.QMainWindow, main_window_class):
                                               self.connectionDoneSignal.emit)
         self.connectionDoneSignal.connect(self.connectionDone)
         self.cf.disconnected.add_callback(self.disconnectedSignal.emit)
-        self.disconnectedSignal.connect(
-                        lambda linkURI: self.setUIState(UIState.DISCONNECTED,
-                                                        linkURI))
+        self.disconnectedSignal.connect(self.disconnected)
         self.cf.connection_lost.add_callback(self.connectionLostSignal.emit)
         self.connectionLostSignal.connect(self.connectionLost)
         self.cf.connection_requested.add_callback(
@@ -317,15 +317,23 @@ class MainUI(QtGui.QMainWindow, main_window_class):
 
         GuiConfig().set("link_uri", linkURI)
 
-        lg = LogConfig("Battery", 1000)
-        lg.add_variable("pm.vbat", "float")
-        self.cf.log.add_config(lg)
-        if lg.valid:
-            lg.data_received_cb.add_callback(self.batteryUpdatedSignal.emit)
-            lg.error_cb.add_callback(self._log_error_signal.emit)
-            lg.start()
-        else:
-            logger.warning("Could not setup loggingblock!")
+        if self._battery_subscription:
+            # Called again when a warm start is invalidated, the subscription
+            # is kept
+            return
+        self._battery_subscription = LogSubscription("Battery", 1000,
+                                                     [("pm.vbat", "float")])
+        self._battery_subscription.data_received_cb.add_callback(
+            self.batteryUpdatedSignal.emit)
+        self._battery_subscription.error_cb.add_callback(
+            self._log_error_signal.emit)
+        self.cf.log.subscribe(self._battery_subscription)
+
+    def disconnected(self, linkURI):
+        self.setUIState(UIState.DISCONNECTED, linkURI)
+        if self._battery_subscription:
+            self.cf.log.unsubscribe(self._battery_subscription)
+            self._battery_subscription = None
 
     def _logging_error(self, log_conf, msg):
         QMessageBox.about(self, "Log error", "Error when starting log config"
@@ -48,7 +48,7 @@ from cflib.crazyflie import Crazyflie
 from cfclient.ui.widgets.ai import AttitudeIndicator
 
 from cfclient.utils.guiconfig import GuiConfig
-from cflib.crazyflie.log import Log, LogVariable, LogConfig
+from cflib.crazyflie.log import Log, LogVariable, LogSubscription
 
 from cfclient.ui.tab import Tab
 
@@ -166,6 +166,7 @@ class FlightTab(Tab, flight_tab_class):
                 
         self.logBaro = None
         self.logAltHold = None
+        self._subscriptions = {}
 
         self.ai = AttitudeIndicator()
         self.verticalLayout_4.addWidget(self.ai)
@@ -230,37 +231,31 @@ class FlightTab(Tab, flight_tab_class):
 
     def connected(self, linkURI):
         # IMU & THRUST
-        lg = LogConfig("Stabalizer", GuiConfig().get("ui_update_period"))
-        lg.add_variable("stabilizer.roll", "float")
-        lg.add_variable("stabilizer.pitch", "float")
-        lg.add_variable("stabilizer.yaw", "float")
-        lg.add_variable("stabilizer.thrust", "uint16_t")
-
-        self.helper.cf.log.add_config(lg)
-        if (lg.valid):
-            lg.data_received_cb.add_callback(self._imu_data_signal.emit)
-            lg.error_cb.add_callback(self._log_error_signal.emit)
-            lg.start()
-        else:
-            logger.warning("Could not setup logconfiguration after "
-                           "connection!")
+        self._subscribe("Stabalizer", GuiConfig().get("ui_update_period"),
+                        [("stabilizer.roll", "float"),
+                         ("stabilizer.pitch", "float"),
+                         ("stabilizer.yaw", "float"),
+                         ("stabilizer.thrust", "uint16_t")],
+                        self._imu_data_signal.emit)
 
         # MOTOR
-        lg = LogConfig("Motors", GuiConfig().get("ui_update_period"))
-        lg.add_variable("motor.m1")
-        lg.add_variable("motor.m2")
-        lg.add_variable("motor.m3")
-        lg.add_variable("motor.m4")
-
-        self.helper.cf.log.add_config(lg)
-        if lg.valid:
-            lg.data_received_cb.add_callback(self._motor_data_signal.emit)
-            lg.error_cb.add_callback(self._log_error_signal.emit)
-            lg.start()
-        else:
-            logger.warning("Could not setup logconfiguration after "
-                           "connection!")
-            
+        self._subscribe("Motors", GuiConfig().get("ui_update_period"),
+                        ["motor.m1", "motor.m2", "motor.m3", "motor.m4"],
+                        self._motor_data_signal.emit)
+
+    def _subscribe(self, name, period, variables, data_cb):
+        """Subscribe to log variables until disconnected, the variables of
+        all the subscriptions are shared and packed into log blocks. connected
+        is called again when a warm start is invalidated, the subscriptions
+        are kept and repacked by the library then."""
+        if name not in self._subscriptions:
+            sub = LogSubscription(name, period, variables)
+            sub.data_received_cb.add_callback(data_cb)
+            sub.error_cb.add_callback(self._log_error_signal.emit)
+            self.helper.cf.log.subscribe(sub)
+            self._subscriptions[name] = sub
+        return self._subscriptions[name]
+
     def _set_available_sensors(self, name, available):
         logger.info("[%s]: %s", name, available)
         available = eval(available)
@@ -273,32 +268,12 @@ class FlightTab(Tab, flight_tab_class):
                 self.helper.inputDeviceReader.setAltHoldAvailable(available)
                 if (not self.logBaro and not self.logAltHold):
                     # The sensor is available, set up the logging
-                    self.logBaro = LogConfig("Baro", 200)
-                    self.logBaro.add_variable("baro.aslLong", "float")
-
-                    self.helper.cf.log.add_config(self.logBaro)
-                    if self.logBaro.valid:
-                        self.logBaro.data_received_cb.add_callback(
-                            self._baro_data_signal.emit)
-                        self.logBaro.error_cb.add_callback(
-                            self._log_error_signal.emit)
-                        self.logBaro.start()
-                    else:
-                        logger.warning("Could not setup logconfiguration after "
-                                       "connection!")            
-                    self.logAltHold = LogConfig("AltHold", 200)
-                    self.logAltHold.add_variable("altHold.target", "float")
-
-                    self.helper.cf.log.add_config(self.logAltHold)
-                    if self.logAltHold.valid:
-                        self.logAltHold.data_received_cb.add_callback(
-                            self._althold_data_signal.emit)
-                        self.logAltHold.error_cb.add_callback(
-                            self._log_error_signal.emit)
-                        self.logAltHold.start()
-                    else:
-                        logger.warning("Could not setup logconfiguration after "
-                                       "connection!")                        
+                    self.logBaro = self._subscribe(
+                        "Baro", 200, [("baro.aslLong", "float")],
+                        self._baro_data_signal.emit)
+                    self.logAltHold = self._subscribe(
+                        "AltHold", 200, [("altHold.target", "float")],
+                        self._althold_data_signal.emit)
 
     def disconnected(self, linkURI):
         self.ai.setRollPitch(0, 0)
@@ -316,6 +291,9 @@ class FlightTab(Tab, flight_tab_class):
         self.actualASL.setEnabled(False)
         self.logBaro = None
         self.logAltHold = None
+        for sub in self._subscriptions.itervalues():
+            self.helper.cf.log.unsubscribe(sub)
+        self._subscriptions = {}
 
     def minMaxThrustChanged(self):
         self.helper.inputDeviceReader.set_thrust_limits(
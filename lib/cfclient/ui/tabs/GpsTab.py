@@ -51,7 +51,7 @@ import datetime
 
 #from cfclient.ui.widgets.plotwidget import PlotWidget
 
-from cflib.crazyflie.log import Log, LogVariable, LogConfig
+from cflib.crazyflie.log import Log, LogVariable, LogSubscription
 
 from cfclient.ui.tab import Tab
 
@@ -91,6 +91,7 @@ class GpsTab(Tab, gps_tab_class):
         self.helper = helper
         self._cf = helper.cf
         self._got_home_point = False
+        self._subscription = None
         self._line = ""
 
         if not should_enable_tab:
@@ -156,26 +157,26 @@ class GpsTab(Tab, gps_tab_class):
         }
 
     def _connected(self, link_uri):
-        lg = LogConfig("GPS", 100)
-        lg.add_variable("gps.lat")
-        lg.add_variable("gps.lon")
-        lg.add_variable("gps.hMSL")
-        lg.add_variable("gps.heading")
-        lg.add_variable("gps.gSpeed")
-        lg.add_variable("gps.hAcc")
-        lg.add_variable("gps.fixType")
-        self._cf.log.add_config(lg)
-        if lg.valid:
-            lg.data_received_cb.add_callback(self._log_data_signal.emit)
-            lg.error_cb.add_callback(self._log_error_signal.emit)
-            lg.start()
-        else:
-            logger.warning("Could not setup logging block for GPS!")
+        if self._subscription:
+            # Called again when a warm start is invalidated, the subscription
+            # is kept
+            return
+        sub = LogSubscription("GPS", 100,
+                              ["gps.lat", "gps.lon", "gps.hMSL",
+                               "gps.heading", "gps.gSpeed", "gps.hAcc",
+                               "gps.fixType"])
+        sub.data_received_cb.add_callback(self._log_data_signal.emit)
+        sub.error_cb.add_callback(self._log_error_signal.emit)
+        self._cf.log.subscribe(sub)
+        self._subscription = sub
         self._max_speed = 0.0
 
     def _disconnected(self, link_uri):
         """Callback for when the Crazyflie has been disconnected"""
         self._got_home_point = False
+        if self._subscription:
+            self._cf.log.unsubscribe(self._subscription)
+            self._subscription = None
         return
 
     def _logging_error(self, log_conf, msg):
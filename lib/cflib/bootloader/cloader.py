@@ -184,6 +184,7 @@ class Cloader:
             if self.link.cradio.send_packet((0xff,)).ack:
                 logging.info("Bootloader set to radio address"
                              " {}".format(new_address))
+                self.link.set_address(new_address)
                 self.link.restart()
                 return True
 
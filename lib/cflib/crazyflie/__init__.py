@@ -44,17 +44,24 @@ import time
 import datetime
 from threading import Thread
 
-from threading import Timer, Lock
+from threading import Lock, RLock, Event
 
 from .commander import Commander
 from .console import Console
-from .param import Param
-from .log import Log
+from .param import Param, ParamTocElement
+from .log import Log, LogTocElement
+from .toc import Toc, lookup_toc, intern_toc
 from .toccache import TocCache
+from .replyindex import ReplyPatternIndex
+from .rttestimator import RttEstimator
+from .portworker import PortWorker, DROP_OLDEST
+from .log import CHAN_LOGDATA
 
 import cflib.crtp
+from cflib.crtp.crtpstack import CRTPPort
 
 from cflib.utils.callbacks import Caller
+from cflib.utils.scheduler import get_scheduler
 
 
 class State:
@@ -87,22 +94,64 @@ class Crazyflie():
     packet_sent = Caller()
     # Called when the link driver updates the link quality measurement
     link_quality_updated = Caller()
+    # Called when the TOCs used for a warm start turn out to be outdated,
+    # the log blocks have been removed and connected is called again once
+    # the new TOCs are fetched
+    warm_start_invalidated = Caller()
+
+    # Number of times a packet is resent while waiting for a reply
+    MAX_RETRIES = 10
+
+    # Send queue levels (0.0 - 1.0) for the send_queue_high signal
+    SEND_HIGH_WATERMARK = 0.75
+    SEND_LOW_WATERMARK = 0.25
+    # How often the send queue is checked while it is above the watermark
+    SEND_QUEUE_POLL = 0.01
 
     state = State.DISCONNECTED
 
-    def __init__(self, link=None, ro_cache=None, rw_cache=None):
+    def __init__(self, link=None, ro_cache=None, rw_cache=None,
+                 warm_start=False, toc_window=None):
         """
         Create the objects from this module and register callbacks.
 
         ro_cache -- Path to read-only cache (string)
         rw_cache -- Path to read-write cache (string)
+        warm_start -- Use the last TOCs known for a URI and call connected
+                      before they have been validated (bool)
+        toc_window -- Number of TOC element requests kept in flight while
+                      fetching the TOCs, TocFetcher.WINDOW if None (int)
         """
         self.link = link
+        self.toc_window = toc_window
+        # Called with the packet and the expected reply pattern when a
+        # packet has been resent MAX_RETRIES times without getting a reply.
+        # Per instance, the log and param objects of each Crazyflie listen
+        # to it.
+        self.reply_timeout = Caller()
+        # Called with the packet when it is not sent because the send queue
+        # of the link is full
+        self.send_queue_full = Caller()
+        # Called with True when the send queue of the link fills above
+        # SEND_HIGH_WATERMARK and with False when it is below
+        # SEND_LOW_WATERMARK again, so senders of this Crazyflie can hold
+        # back
+        self.send_queue_high = Caller()
         self._toc_cache = TocCache(ro_cache=ro_cache,
                                    rw_cache=rw_cache)
+        self.warm_start = warm_start
 
         self.incoming = _IncomingPacketHandler(self)
         self.incoming.setDaemon(True)
+        # Log data and console text are handled by worker threads, so slow
+        # consumers do not delay the other ports. Both drop the oldest
+        # packets when their consumers fall behind, BLOCK would stall the
+        # reception of all the ports again.
+        self.incoming.set_port_execution(CRTPPort.LOGGING, "worker",
+                                         channel=CHAN_LOGDATA,
+                                         policy=DROP_OLDEST)
+        self.incoming.set_port_execution(CRTPPort.CONSOLE, "worker",
+                                         policy=DROP_OLDEST)
         self.incoming.start()
 
         self.commander = Commander(self)
@@ -116,12 +165,32 @@ class Crazyflie():
         self.packet_received.add_callback(self._check_for_initial_packet_cb)
         self.packet_received.add_callback(self._check_for_answers)
 
-        self._answer_patterns = {}
+        self._answer_patterns = ReplyPatternIndex()
+        # Retries are scheduled on a shared scheduler thread, with a timeout
+        # based on the round trip time measured on each port
+        self._scheduler = get_scheduler()
+        self._rtt = {}
 
-        self._send_lock = Lock()
+        # Only protects the reply bookkeeping, packets are queued to the
+        # link without holding it
+        self._reply_lock = Lock()
+        self._send_queue_is_high = False
 
         self.connected_ts = None
 
+        # TOCs still being refreshed during the connection setup
+        self._tocs_pending = set()
+        # CRCs of the TOCs used for a warm start, until they are validated
+        self._warm_crcs = None
+        # True when connected has been called for the connection. The lock
+        # keeps the warm start and its validation, which run on different
+        # threads, from calling connected twice or out of order.
+        self._setup_announced = False
+        self._setup_lock = RLock()
+        # Time when the link was opened and the connection setup phases
+        self._open_time = None
+        self._connection_timing = {}
+
         # Connect callbacks to logger
         self.disconnected.add_callback(
             lambda uri: logger.info("Callback->Disconnected from [%s]", uri))
@@ -134,6 +203,10 @@ class Crazyflie():
         self.connection_failed.add_callback(
             lambda uri, errmsg: logger.info("Callback->Connected failed to"
                                             " [%s]: %s", uri, errmsg))
+        self.reply_timeout.add_callback(
+            lambda pk, pattern: logger.warning("No reply to %s after %d"
+                                               " retries", pattern,
+                                               self.MAX_RETRIES))
         self.connection_requested.add_callback(
             lambda uri: logger.info("Callback->Connection initialized[%s]",
                                     uri))
@@ -146,21 +219,124 @@ class Crazyflie():
         self.connected_ts = None
 
     def _start_connection_setup(self):
-        """Start the connection setup by refreshing the TOCs"""
+        """Start the connection setup by refreshing the TOCs. The log and
+        param TOCs are fetched at the same time."""
         logger.info("We are connected[%s], request connection setup",
                     self.link_uri)
-        self.log.refresh_toc(self._log_toc_updated_cb, self._toc_cache)
+        self._tocs_pending = set(["log", "param"])
+        warm_tocs = self._load_last_tocs() if self.warm_start else None
+        if warm_tocs:
+            log_toc, param_toc = warm_tocs
+            self._warm_crcs = {"log": log_toc.crc, "param": param_toc.crc}
+        else:
+            log_toc = param_toc = None
+            self._warm_crcs = None
+        self.log.refresh_toc(self._log_toc_updated_cb, self._toc_cache,
+                             warm_toc=log_toc, window=self.toc_window)
+        self.param.refresh_toc(self._param_toc_updated_cb, self._toc_cache,
+                               warm_toc=param_toc, window=self.toc_window)
+        if warm_tocs:
+            # The TOCs are validated in the background
+            logger.info("Warm start of [%s] with log TOC 0x%08X and param"
+                        " TOC 0x%08X", self.link_uri, log_toc.crc,
+                        param_toc.crc)
+            with self._setup_lock:
+                # Unless the validation has already finished the setup
+                if not self._setup_announced:
+                    self._setup_finished()
+
+    def _load_last_tocs(self):
+        """Return the last log and param TOCs used with the URI, or None if
+        they are not known or not cached any more"""
+        last = self._toc_cache.get_last(self.link_uri)
+        if not last:
+            return None
+        tocs = []
+        for name, element_class in (("log", LogTocElement),
+                                    ("param", ParamTocElement)):
+            crc = last.get(name)
+            if crc is None:
+                return None
+            toc = Toc()
+            toc.toc = lookup_toc(element_class, crc)
+            if toc.toc is None:
+                cache_data = self._toc_cache.fetch(crc)
+                if not cache_data:
+                    return None
+                toc.toc = intern_toc(element_class, crc, cache_data)
+            toc.crc = crc
+            tocs.append(toc)
+        return tocs
+
+    def _record_phase(self, phase):
+        """Record the time from opening the link until phase was done"""
+        self._connection_timing[phase] = time.time() - self._open_time
+
+    def _setup_finished(self):
+        """Called when the TOCs are ready, tells the users that they can
+        start using the Crazyflie"""
+        self._record_phase("connected")
+        logger.info("Connection setup of [%s] done in %.3fs: first packet"
+                    " %.3fs, log TOC %.3fs, param TOC %.3fs", self.link_uri,
+                    self._connection_timing["connected"],
+                    self._connection_timing.get("link", 0),
+                    self._connection_timing.get("log_toc", 0),
+                    self._connection_timing.get("param_toc", 0))
+        self.connected_ts = datetime.datetime.now()
+        self._setup_announced = True
+        self.connected.call(self.link_uri)
+
+    def _toc_updated(self, toc):
+        """Called when one of the TOCs has been fully updated, the
+        connection setup is finished when both are"""
+        self._record_phase(toc + "_toc")
+        self._tocs_pending.discard(toc)
+        if self._tocs_pending:
+            return
+        crcs = {"log": self.log._toc.crc, "param": self.param.toc.crc}
+        self._toc_cache.set_last(self.link_uri, crcs)
+
+        with self._setup_lock:
+            warm_crcs = self._warm_crcs
+            self._warm_crcs = None
+            if warm_crcs is None:
+                self._setup_finished()
+            elif warm_crcs == crcs:
+                self._record_phase("validated")
+                logger.info("Warm start TOCs of [%s] validated in %.3fs",
+                            self.link_uri,
+                            self._connection_timing["validated"])
+                if not self._setup_announced:
+                    # Validated before the warm start was announced
+                    self._setup_finished()
+            else:
+                logger.warning("TOCs of [%s] changed from %s to %s, warm"
+                               " start invalidated", self.link_uri,
+                               warm_crcs, crcs)
+                self.log.reset_blocks()
+                if self._setup_announced:
+                    self.warm_start_invalidated.call(self.link_uri)
+                self._setup_finished()
 
     def _param_toc_updated_cb(self):
         """Called when the param TOC has been fully updated"""
         logger.info("Param TOC finished updating")
-        self.connected_ts = datetime.datetime.now()
-        self.connected.call(self.link_uri)
+        self._toc_updated("param")
 
     def _log_toc_updated_cb(self):
         """Called when the log TOC has been fully updated"""
         logger.info("Log TOC finished updating")
-        self.param.refresh_toc(self._param_toc_updated_cb, self._toc_cache)
+        self._toc_updated("log")
+
+    def get_connection_timing(self):
+        """
+        Return the time in seconds from opening the link until each phase
+        of the last connection was done: "link" (first packet received),
+        "log_toc", "param_toc" and "connected". After a warm start
+        "connected" comes before the TOCs and "validated" is set if they
+        were the right ones.
+        """
+        return dict(self._connection_timing)
 
     def _link_error_cb(self, errmsg):
         """Called from the link driver when there's an error"""
@@ -177,10 +353,50 @@ class Crazyflie():
             self.connection_lost.call(self.link_uri, errmsg)
         self.state = State.DISCONNECTED
 
+    def _setup_failed(self, errmsg):
+        """Called when the connection setup can not be finished, for
+        instance when a TOC request is never answered"""
+        logger.warning("Connection setup of [%s] failed: %s", self.link_uri,
+                       errmsg)
+        if self.link is not None:
+            self.link.close()
+            self.link = None
+        with self._reply_lock:
+            for pending in self._answer_patterns.values():
+                pending.deadline.cancel()
+            self._answer_patterns.clear()
+        self.state = State.DISCONNECTED
+        if self._setup_announced:
+            # With a warm start the user has been told that we are connected
+            self.disconnected.call(self.link_uri)
+            self.connection_lost.call(self.link_uri, errmsg)
+        else:
+            self.connection_failed.call(self.link_uri, errmsg)
+
     def _link_quality_cb(self, percentage):
         """Called from link driver to report link quality"""
         self.link_quality_updated.call(percentage)
 
+    def get_link_stats(self):
+        """Return the statistics of the link (ack rate, retries, throughput
+        and so on) as a dict, empty if there is no link or the link driver
+        does not keep statistics"""
+        if self.link is not None:
+            return self.link.get_link_stats()
+        return {}
+
+    def _update_link_activity(self):
+        """Tell the link driver what data we expect from the copter so
+        drivers that poll for data can poll faster when needed"""
+        if self.link is not None:
+            logging_active = False
+            for block in self.log.log_blocks:
+                if block.started:
+                    logging_active = True
+                    break
+            self.link.set_link_activity(logging_active,
+                                        len(self._answer_patterns))
+
     def _check_for_initial_packet_cb(self, data):
         """
         Called when first packet arrives from Crazyflie.
@@ -189,6 +405,7 @@ class Crazyflie():
         answering.
         """
         self.state = State.CONNECTED
+        self._record_phase("link")
         self.link_established.call(self.link_uri)
         self.packet_received.remove_callback(self._check_for_initial_packet_cb)
 
@@ -200,6 +417,9 @@ class Crazyflie():
         self.connection_requested.call(link_uri)
         self.state = State.INITIALIZED
         self.link_uri = link_uri
+        self._open_time = time.time()
+        self._connection_timing = {}
+        self._setup_announced = False
         try:
             self.link = cflib.crtp.get_link_driver(link_uri,
                                                    self._link_quality_cb,
@@ -214,6 +434,7 @@ class Crazyflie():
                 # Add a callback so we can check that any data is comming
                 # back from the copter
                 self.packet_received.add_callback(self._check_for_initial_packet_cb)
+                self.incoming.link_opened()
 
                 self._start_connection_setup()
         except Exception as ex:  # pylint: disable=W0703
@@ -237,7 +458,10 @@ class Crazyflie():
         if (self.link is not None):
             self.link.close()
             self.link = None
-        self._answer_patterns = {}
+        with self._reply_lock:
+            for pending in self._answer_patterns.values():
+                pending.deadline.cancel()
+            self._answer_patterns.clear()
         self.disconnected.call(self.link_uri)
 
     def add_port_callback(self, port, cb):
@@ -248,11 +472,61 @@ class Crazyflie():
         """Remove the callback cb on port"""
         self.incoming.remove_port_callback(port, cb)
 
-    def _no_answer_do_retry(self, pk, pattern):
+    def set_port_execution(self, port, mode, channel=None, maxsize=100,
+                           policy=DROP_OLDEST):
+        """
+        Choose where the callbacks of a port (or of one channel of it) run.
+        "inline" runs them on the packet reception thread, "worker" queues
+        the packets to a thread of their own, with at most maxsize packets
+        waiting and the overflow policy "drop_oldest", "block" or "sample".
+        By default log data and console text are handled by workers.
+        """
+        self.incoming.set_port_execution(port, mode, channel, maxsize,
+                                         policy)
+
+    def get_dispatch_stats(self):
+        """Return the queue depth and dropped packets of the port workers,
+        keyed by (port, channel) where channel is None for all channels"""
+        return self.incoming.get_worker_stats()
+
+    def _get_rtt_estimator(self, port):
+        estimator = self._rtt.get(port)
+        if estimator is None:
+            estimator = self._rtt[port] = RttEstimator()
+        return estimator
+
+    def _no_answer_do_retry(self, pending):
         """Resend packets that we have not gotten answers to"""
-        logger.debug("Resending for pattern %s", pattern)
-        # Set the timer to None before trying to send again
-        self.send_packet(pk, expected_reply=pattern, resend=True)
+        with self._reply_lock:
+            pattern = pending.pattern
+            link = self.link
+            if (link is None or pattern not in self._answer_patterns or
+                    self._answer_patterns[pattern] is not pending):
+                # Answered or replaced in the meantime
+                return
+            timed_out = pending.retries >= self.MAX_RETRIES
+            if timed_out:
+                del self._answer_patterns[pattern]
+            else:
+                pending.retries += 1
+                self._schedule_retry(pending)
+        if timed_out:
+            self._update_link_activity()
+            self.reply_timeout.call(pending.pk, pattern)
+        else:
+            # If the queue is full the packet is sent at the next retry
+            self._queue_packet(link, pending.pk)
+
+    def _schedule_retry(self, pending, restart=True):
+        """Record the send time and schedule the next retry of a pending
+        reply. With restart False the send time is kept, for a reply that
+        is waited for again without the packet being resent."""
+        timeout = self._get_rtt_estimator(pending.pk.port).get_timeout(
+            pending.retries)
+        if restart:
+            pending.sent = time.time()
+        pending.deadline = self._scheduler.schedule(
+            timeout, self._no_answer_do_retry, pending)
 
     def _check_for_answers(self, pk):
         """
@@ -260,59 +534,148 @@ class Crazyflie():
         waiting for an answer on this port. If so, then cancel the retry
         timer.
         """
-        self._send_lock.acquire()
-        longest_match = ()
-        if len(self._answer_patterns) > 0:
-            data = (pk.header,) + pk.datat
-            for p in self._answer_patterns.keys():
-                logger.debug("Looking for pattern match on %s vs %s", p, data)
-                if len(p) <= len(data):
-                    if p == data[0:len(p)]:
-                        match = data[0:len(p)]
-                        if len(match) >= len(longest_match):
-                            logger.debug("Found new longest match %s", match)
-                            longest_match = match
-        if len(longest_match) > 0:
-            del self._answer_patterns[longest_match]
-        self._send_lock.release()
+        if len(self._answer_patterns) == 0:
+            return
+        with self._reply_lock:
+            match = self._answer_patterns.pop_match(pk.header, pk.datat)
+            if match is None:
+                return
+            pending = match[1]
+            pending.deadline.cancel()
+            if pending.retries == 0:
+                self._get_rtt_estimator(pk.port).sample(time.time() -
+                                                        pending.sent)
+        self._update_link_activity()
+
+    def get_reply_stats(self):
+        """Return the number of replies pending and how long the last
+        replies took to arrive (see ReplyPatternIndex.get_stats)"""
+        return self._answer_patterns.get_stats()
+
+    def get_rtt_stats(self):
+        """Return the round trip time statistics and retransmission timeout
+        per port (see RttEstimator.get_stats)"""
+        return dict((port, estimator.get_stats())
+                    for (port, estimator) in self._rtt.items())
 
     def send_packet(self, pk, expected_reply=(), resend=False):
         """
-        Send a packet through the link interface.
+        Send a packet through the link interface. The call does not block,
+        if the send queue of the link is full the packet is dropped and
+        send_queue_full is called. A packet that expects a reply is sent
+        again by the retries. Returns True if the packet was queued.
 
         pk -- Packet to send
-        expect_answer -- True if a packet from the Crazyflie is expected to
-                         be sent back, otherwise false
+        expected_reply -- Start of the data of the reply expected from the
+                          Crazyflie. The packet is resent until the reply
+                          arrives, at most MAX_RETRIES times
+        resend -- Only send the packet, without waiting for a reply
 
         """
-        self._send_lock.acquire()
-        if (self.link is not None):
-            self.link.send_packet(pk)
+        link = self.link
+        if link is None:
+            return False
+        if len(expected_reply) > 0 and not resend:
+            self._expect_reply(pk, expected_reply)
+        return self._queue_packet(link, pk)
+
+    def try_send(self, pk, expected_reply=()):
+        """
+        Send a packet only if there is room for it in the send queue of the
+        link, the call does not block. Returns False if the packet was not
+        sent, in that case no reply is waited for either.
+        """
+        link = self.link
+        if link is None:
+            return False
+        pending = replaced = None
+        if len(expected_reply) > 0:
+            pending, replaced = self._expect_reply(pk, expected_reply)
+        if self._queue_packet(link, pk):
+            return True
+        if pending is not None:
+            with self._reply_lock:
+                if (pending.pattern in self._answer_patterns and
+                        self._answer_patterns[pending.pattern] is pending):
+                    pending.deadline.cancel()
+                    if replaced is not None:
+                        # The earlier request keeps waiting for its reply
+                        self._answer_patterns[pending.pattern] = replaced
+                        self._schedule_retry(replaced, restart=False)
+                    else:
+                        del self._answer_patterns[pending.pattern]
+            self._update_link_activity()
+        return False
+
+    def is_send_queue_high(self):
+        """Return True if the send queue of the link is above
+        SEND_HIGH_WATERMARK and has not drained below SEND_LOW_WATERMARK"""
+        return self._send_queue_is_high
+
+    def _expect_reply(self, pk, expected_reply):
+        """Start waiting for the reply to a packet, before it is sent so the
+        reply can not arrive first. Returns the new pending reply and the one
+        it replaced, if any."""
+        pattern = (pk.header,) + tuple(expected_reply)
+        logger.debug("Sending packet and expecting the %s pattern back",
+                     pattern)
+        pending = _PendingReply(pk, pattern)
+        replaced = None
+        with self._reply_lock:
+            if pattern in self._answer_patterns:
+                # The new request replaces the one already waiting
+                replaced = self._answer_patterns[pattern]
+                replaced.deadline.cancel()
+            self._schedule_retry(pending)
+            self._answer_patterns[pattern] = pending
+        self._update_link_activity()
+        return (pending, replaced)
+
+    def _queue_packet(self, link, pk):
+        """Queue a packet to the link without blocking"""
+        if link.try_send_packet(pk):
             self.packet_sent.call(pk)
-            if len(expected_reply) > 0 and not resend:
-                pattern = (pk.header,) + expected_reply
-                logger.debug("Sending packet and expecting the %s pattern back",
-                             pattern)
-                new_timer = Timer(0.2,
-                                  lambda: self._no_answer_do_retry(pk, pattern))
-                self._answer_patterns[pattern] = new_timer
-                new_timer.start()
-            elif resend:
-                # Check if we have gotten an answer, if not try again
-                pattern = expected_reply
-                if pattern in self._answer_patterns:
-                    logger.debug("We want to resend and the pattern is there")
-                    if self._answer_patterns[pattern]:
-                        new_timer = Timer(0.2,
-                                          lambda:
-                                          self._no_answer_do_retry(
-                                              pk, pattern))
-                        self._answer_patterns[pattern] = new_timer
-                        new_timer.start()
-                else:
-                    logger.debug("Resend requested, but no pattern found: %s",
-                                 self._answer_patterns)
-        self._send_lock.release()
+            sent = True
+        else:
+            logger.debug("Send queue full, dropped %s", pk)
+            self.send_queue_full.call(pk)
+            sent = False
+        if (not self._send_queue_is_high and
+                link.get_send_queue_level() >= self.SEND_HIGH_WATERMARK):
+            with self._reply_lock:
+                signal = not self._send_queue_is_high
+                self._send_queue_is_high = True
+            if signal:
+                logger.info("Send queue above the high watermark")
+                self.send_queue_high.call(True)
+                self._scheduler.schedule(self.SEND_QUEUE_POLL,
+                                         self._poll_send_queue)
+        return sent
+
+    def _poll_send_queue(self):
+        """Check if the send queue has drained below the low watermark"""
+        link = self.link
+        if (link is not None and
+                link.get_send_queue_level() > self.SEND_LOW_WATERMARK):
+            self._scheduler.schedule(self.SEND_QUEUE_POLL,
+                                     self._poll_send_queue)
+            return
+        self._send_queue_is_high = False
+        logger.info("Send queue below the low watermark")
+        self.send_queue_high.call(False)
+
+class _PendingReply(object):
+    """A packet waiting for a reply"""
+
+    __slots__ = ('pk', 'pattern', 'retries', 'sent', 'deadline')
+
+    def __init__(self, pk, pattern):
+        self.pk = pk
+        self.pattern = pattern
+        self.retries = 0
+        self.sent = None
+        self.deadline = None
+
 
 class _IncomingPacketHandler(Thread):
     """Handles incoming packets and sends the data to the correct receivers"""
@@ -320,6 +683,17 @@ class _IncomingPacketHandler(Thread):
         Thread.__init__(self)
         self.cf = cf
         self.cb = []
+        self._cb_lock = Lock()
+        # Set when a link is opened so reception starts without delay
+        self._link_event = Event()
+        # Workers by (port, channel), channel None meaning all channels
+        self._workers = {}
+        # For each of the 256 headers a tuple of the callbacks to call, if
+        # any of them is not a catch-all callback and the worker running
+        # them (None to run them inline). Rebuilt, never modified, when the
+        # callbacks change so it can be used without locking while
+        # dispatching.
+        self._table = self._build_table(self.cb, self._workers)
 
     def add_port_callback(self, port, cb):
         """Add a callback for data that comes on a specific port"""
@@ -329,9 +703,10 @@ class _IncomingPacketHandler(Thread):
     def remove_port_callback(self, port, cb):
         """Remove a callback for data that comes on a specific port"""
         logger.debug("Removing callback on port [%d] to [%s]", port, cb)
-        for port_callback in self.cb:
-            if (port_callback[0] == port and port_callback[4] == cb):
-                self.cb.remove(port_callback)
+        with self._cb_lock:
+            self.cb = [c for c in self.cb if not (c[0] == port and
+                                                  c[4] == cb)]
+            self._table = self._build_table(self.cb, self._workers)
 
     def add_header_callback(self, cb, port, channel, port_mask=0xFF,
                             channel_mask=0xFF):
@@ -340,12 +715,101 @@ class _IncomingPacketHandler(Thread):
         possibility to add a mask for channel and port for multiple
         hits for same callback.
         """
-        self.cb.append([port, port_mask, channel, channel_mask, cb])
+        with self._cb_lock:
+            self.cb = self.cb + [[port, port_mask, channel, channel_mask,
+                                  cb]]
+            self._table = self._build_table(self.cb, self._workers)
+
+    def set_port_execution(self, port, mode, channel=None, maxsize=100,
+                           policy=DROP_OLDEST):
+        """Run the callbacks of port/channel inline or on a worker (see
+        Crazyflie.set_port_execution)"""
+        if mode not in ("inline", "worker"):
+            raise ValueError("Unknown execution mode %s" % mode)
+        worker = None
+        with self._cb_lock:
+            replaced = self._workers.pop((port, channel), None)
+            if mode == "worker":
+                name = "%d" % port
+                if channel is not None:
+                    name += ":%d" % channel
+                # Started once the packets of the replaced worker are
+                # handed over, so they are handled first
+                worker = PortWorker(name, self._call_callbacks, maxsize,
+                                    policy, start=False)
+                self._workers[(port, channel)] = worker
+            self._table = self._build_table(self.cb, self._workers)
+        # The replaced worker is stopped outside the lock, the callback it
+        # is running could be adding callbacks
+        if worker is not None:
+            backlog = ()
+            if replaced is not None:
+                backlog = replaced.stop(worker.put)
+            worker.start(backlog)
+        elif replaced is not None:
+            for pk in replaced.stop(self._call_callbacks):
+                self._call_callbacks(pk)
+
+    def get_worker_stats(self):
+        """Return the statistics of the workers by (port, channel)"""
+        return dict((key, worker.get_stats())
+                    for (key, worker) in self._workers.items())
+
+    @staticmethod
+    def _build_table(callbacks, workers):
+        """Return the dispatch table for the callbacks"""
+        table = []
+        for header in range(256):
+            port = (header & 0xF0) >> 4
+            channel = header & 0x03
+            matching = []
+            found = False
+            for cb in callbacks:
+                if cb[0] == port & cb[1] and cb[2] == channel & cb[3]:
+                    matching.append(cb[4])
+                    if cb[0] != 0xFF:
+                        found = True
+            worker = workers.get((port, channel), workers.get((port, None)))
+            table.append((tuple(matching), found, worker))
+        return table
+
+    def _dispatch(self, pk):
+        """Call the callbacks registered for the header of the packet, or
+        queue the packet to the worker of the port"""
+        worker = self._table[pk.header][2]
+        if worker is not None:
+            worker.put(pk)
+        else:
+            self._call_callbacks(pk)
+
+    def _call_callbacks(self, pk):
+        """Call the callbacks registered for the header of the packet"""
+        (callbacks, found, worker) = self._table[pk.header]
+        for cb in callbacks:
+            try:
+                cb(pk)
+            except Exception:  # pylint: disable=W0703
+                # Disregard pylint warning since we want to catch all
+                # exceptions and we can't know what will happen in
+                # the callbacks.
+                import traceback
+                logger.warning("Exception while doing callback on port"
+                               " [%d]\n\n%s", pk.port,
+                               traceback.format_exc())
+
+        if not found:
+            logger.warning("Got packet on header (%d,%d) but no callback "
+                           "to handle it", pk.port, pk.channel)
+
+    def link_opened(self):
+        """Start receiving from the new link of the Crazyflie"""
+        self._link_event.set()
 
     def run(self):
         while(True):
             if self.cf.link is None:
-                time.sleep(1)
+                self._link_event.wait(1)
+                self._link_event.clear()
                 continue
             pk = self.cf.link.receive_packet(1)
 
@@ -355,23 +819,4 @@ class _IncomingPacketHandler(Thread):
             #All-packet callbacks
             self.cf.packet_received.call(pk)
 
-            found = False
-            for cb in self.cb:
-                if (cb[0] == pk.port & cb[1] and
-                        cb[2] == pk.channel & cb[3]):
-                    try:
-                        cb[4](pk)
-                    except Exception:  # pylint: disable=W0703
-                        # Disregard pylint warning since we want to catch all
-                        # exceptions and we can't know what will happen in
-                        # the callbacks.
-                        import traceback
-                        logger.warning("Exception while doing callback on port"
-                                       " [%d]\n\n%s", pk.port,
-                                       traceback.format_exc())
-                    if (cb[0] != 0xFF):
-                        found = True
-
-            if not found:
-                logger.warning("Got packet on header (%d,%d) but no callback "
-                               "to handle it", pk.port, pk.channel)
+            self._dispatch(pk)
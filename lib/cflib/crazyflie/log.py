@@ -42,6 +42,9 @@ Terminology:
   Fetch as          - The size and type that a variable should be fetched as.
                       This does not have to be the same as the size and type
                       it's stored as.
+  Subscription      - Variables wanted by a consumer at a period. The
+                      variables of all the subscriptions are packed into
+                      shared log configurations.
 
 States of a configuration:
   Created on host - When a configuration is created the contents is checked
@@ -64,13 +67,16 @@ States of a configuration:
 """
 
 __author__ = 'Bitcraze AB'
-__all__ = ['Log', 'LogTocElement']
+__all__ = ['Log', 'LogTocElement', 'LogConfig', 'LogSubscription']
 
 import struct
 import errno
+from collections import namedtuple, OrderedDict
+from threading import Lock
 from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
 from cflib.utils.callbacks import Caller
-from .toc import Toc, TocFetcher
+from .toc import Toc, TocFetcher, TocElement
+from .logbatch import LogBatch
 
 # Channels used for the logging port
 CHAN_TOC = 0
@@ -97,9 +103,37 @@ GET_TOC_ELEMENT = "GET_TOC_ELEMENT"
 # The max size of a CRTP packet payload
 MAX_LOG_DATA_PACKET_SIZE = 30
 
+# Block id and 24 bit timestamp at the start of a log data packet
+_LOG_DATA_HEADER = struct.Struct("<BHB")
+
 import logging
 logger = logging.getLogger(__name__)
 
+
+def _pack_variables(keys, sizes):
+    """
+    Pack variables into as few log data packets as possible, first fit
+    decreasing. The keys are (name, fetch_as) and sizes maps them to their
+    size. A name is only used once in a packet. Returns a list of lists of
+    keys.
+    """
+    space = MAX_LOG_DATA_PACKET_SIZE - _LOG_DATA_HEADER.size
+    groups = []
+    # The sort is stable, so variables of the same size keep the order of the
+    # subscriptions and tend to end up together
+    for key in sorted(keys, key=lambda k: -sizes[k]):
+        for group in groups:
+            if group[0] >= sizes[key] and key[0] not in group[2]:
+                break
+        else:
+            group = [space, [], set()]
+            groups.append(group)
+        group[0] -= sizes[key]
+        group[1].append(key)
+        group[2].add(key[0])
+    return [group[1] for group in groups]
+
+
 class LogVariable():
     """A logging variable"""
 
@@ -140,9 +174,17 @@ class LogConfig(object):
     from the Crazyflie"""
     _config_id_counter = 1
 
+    # Forms the data is delivered in to data_received_cb, see set_delivery
+    DICT = "dict"
+    TUPLE = "tuple"
+    RECORD = "record"
+    ARRAY = "array"
+
     def __init__(self, name, period_in_ms):
         """Initialize the entry"""
         self.data_received_cb = Caller()
+        # Called with decoded NumPy arrays in batch mode, see Log.enable_batch
+        self.batch_received_cb = Caller()
         self.error_cb = Caller()
         self.started_cb = Caller()
         self.added_cb = Caller()
@@ -160,6 +202,15 @@ class LogConfig(object):
         self.default_fetch_as = []
         self.name = name
 
+        # Decoder for the data of the whole block, compiled when the block
+        # is added
+        self._struct = None
+        self._names = ()
+        self._record_type = None
+        self._delivery = LogConfig.DICT
+        self._target = None
+        self._batch = None
+
     def add_variable(self, name, fetch_as=None):
         """Add a new variable to the configuration.
 
@@ -170,6 +221,7 @@ class LogConfig(object):
         If no fetch_as type is supplied, then the stored as type will be used
         (i.e the type of the fetched variable is the same as it's stored in the
         Crazyflie)."""
+        self._struct = None
         if fetch_as:
             self.variables.append(LogVariable(name, fetch_as))
         else:
@@ -187,9 +239,62 @@ class LogConfig(object):
                     in the Crazyflie
         address - The address of the data
         """
+        self._struct = None
         self.variables.append(LogVariable(name, fetch_as, LogVariable.MEM_TYPE,
                                           stored_as, address))
 
+    def set_delivery(self, form, target=None):
+        """
+        Choose the form of the data passed to data_received_cb.
+
+        LogConfig.DICT - A new dict with the variable names as keys (default)
+        LogConfig.TUPLE - A tuple with the values in the order the variables
+                          were added
+        LogConfig.RECORD - A namedtuple, the fields are the variable names
+                           with "." replaced by "_"
+        LogConfig.ARRAY - The values are written to the start of target, a
+                          list or array.array supplied by the caller, and
+                          target is passed to the callbacks
+        """
+        if form not in (LogConfig.DICT, LogConfig.TUPLE, LogConfig.RECORD,
+                        LogConfig.ARRAY):
+            raise ValueError("Unknown delivery form [%s]" % form)
+        if form == LogConfig.ARRAY and target is None:
+            raise ValueError("A target is needed for the array delivery")
+        self._delivery = form
+        self._target = target
+
+    def compile(self):
+        """
+        Build the decoder for the data of the block, one struct.Struct for
+        all the variables. This is done when the block is added, and again
+        if variables are added later.
+        """
+        fmt = "".join(LogTocElement.get_unpack_string_from_id(var.fetch_as)[1:]
+                      for var in self.variables)
+        self._names = tuple(var.name for var in self.variables)
+        self._record_type = None
+        self._struct = struct.Struct("<" + fmt)
+        if self._batch is not None:
+            self._flush_batch()
+            self._batch = LogBatch(self, LogTocElement.types,
+                                   self._batch.count, self._batch.interval)
+
+    def _flush_batch(self):
+        """Deliver the packets waiting in the batch buffer"""
+        if self._batch is not None:
+            batch = self._batch.flush()
+            if batch is not None:
+                self.batch_received_cb.call(batch, self)
+
+    def _get_record_type(self):
+        """The namedtuple type used for the record delivery"""
+        if self._record_type is None:
+            self._record_type = namedtuple(
+                "LogRecord", [name.replace(".", "_") for name in self._names],
+                rename=True)
+        return self._record_type
+
     def _set_added(self, added):
         self._added = added
         self.added_cb.call(added)
@@ -210,7 +315,12 @@ class LogConfig(object):
     def start(self):
         """Start the logging for this entry"""
         if (self.cf.link is not None):
-            if (self._added is False):
+            if self.cf.log._reset_pending:
+                # Blocks added before the log reset would be removed by it
+                logger.debug("Log reset pending, block will be started later")
+                if self not in self.cf.log._deferred_starts:
+                    self.cf.log._deferred_starts.append(self)
+            elif (self._added is False):
                 logger.debug("First time block is started, add block")
                 pk = CRTPPacket()
                 pk.set_header(5, CHAN_SETTINGS)
@@ -243,7 +353,9 @@ class LogConfig(object):
     def stop(self):
         """Stop the logging for this entry"""
         if (self.cf.link is not None):
-            if (self.id is None):
+            if self in self.cf.log._deferred_starts:
+                self.cf.log._deferred_starts.remove(self)
+            elif (self.id is None):
                 logger.warning("Stopping block, but no block registered")
             else:
                 logger.debug("Sending stop logging for block id=%d", self.id)
@@ -265,25 +377,72 @@ class LogConfig(object):
                 pk.data = (CMD_DELETE_BLOCK, self.id)
                 self.cf.send_packet(pk, expected_reply=(CMD_DELETE_BLOCK, self.id))
 
-    def unpack_log_data(self, log_data, timestamp):
+    def unpack_log_data(self, log_data, timestamp, offset=0):
         """Unpack received logging data so it represent real values according
-        to the configuration in the entry"""
-        ret_data = {}
-        data_index = 0
-        for var in self.variables:
-            size = LogTocElement.get_size_from_id(var.fetch_as)
-            name = var.name
-            unpackstring = LogTocElement.get_unpack_string_from_id(
-                var.fetch_as)
-            value = struct.unpack(unpackstring,
-                                  log_data[data_index:data_index + size])[0]
-            data_index += size
-            ret_data[name] = value
-        self.data_received_cb.call(timestamp, ret_data, self)
-
-
-class LogTocElement:
+        to the configuration in the entry. The data starts at offset in
+        log_data."""
+        if self._struct is None:
+            self.compile()
+        values = self._struct.unpack_from(log_data, offset)
+        delivery = self._delivery
+        if delivery == LogConfig.DICT:
+            data = dict(zip(self._names, values))
+        elif delivery == LogConfig.TUPLE:
+            data = values
+        elif delivery == LogConfig.RECORD:
+            data = self._get_record_type()._make(values)
+        else:
+            data = self._target
+            if type(data) is list:
+                data[0:len(values)] = values
+            else:
+                for i, value in enumerate(values):
+                    data[i] = value
+        self.data_received_cb.call(timestamp, data, self)
+
+
+class LogSubscription(object):
+    """
+    A set of variables wanted at a period, see Log.subscribe.
+
+    The variables of all the subscriptions are packed into as few log blocks
+    as possible, and a variable wanted by several subscriptions at the same
+    period is only logged once. The data_received_cb is called with the
+    timestamp, a dict with the variables of this subscription only and the
+    subscription.
+    """
+
+    def __init__(self, name, period_in_ms, variables):
+        """
+        name -- Used in errors, like the name of a LogConfig
+        period_in_ms -- Period of the data
+        variables -- Complete names of the variables, or (name, fetch_as)
+                     pairs. Variables without fetch_as are fetched as they
+                     are stored.
+        """
+        self.data_received_cb = Caller()
+        self.error_cb = Caller()
+        self.name = name
+        self.period_in_ms = period_in_ms
+        self.variables = []
+        for var in variables:
+            if isinstance(var, basestring):
+                self.variables.append((var, None))
+            else:
+                self.variables.append(tuple(var))
+
+        # Set when the subscription is packed, the (name, fetch_as id) of the
+        # variables and the blocks they are in
+        self._toc = None
+        self._keys = ()
+        self._blocks = ()
+        self._arrived = set()
+        self._values = {}
+
+
+class LogTocElement(TocElement):
     """An element in the Log TOC."""
+    __slots__ = ()
     types = {0x01: ("uint8_t",  '<B', 1),
              0x02: ("uint16_t", '<H', 2),
              0x03: ("uint32_t", '<L', 4),
@@ -330,12 +489,13 @@ class LogTocElement:
 
     def __init__(self, data=None):
         """TocElement creator. Data is the binary payload of the element."""
+        TocElement.__init__(self)
 
         if (data):
             strs = struct.unpack("s" * len(data[2:]), data[2:])
             strs = ("{}" * len(strs)).format(*strs).split("\0")
-            self.group = strs[0]
-            self.name = strs[1]
+            self.group = intern(strs[0])
+            self.name = intern(strs[1])
 
             self.ident = ord(data[0])
 
@@ -374,6 +534,23 @@ class Log():
 
         self._refresh_callback = None
         self._toc_cache = None
+        self._toc_window = None
+        # Blocks are not added until the log reset has been acknowledged
+        self._reset_pending = False
+        # True if the TOC is fetched when the reset is acknowledged
+        self._fetch_after_reset = False
+        self._deferred_starts = []
+        self._warm_toc = None
+        self.toc_ready = False
+        self._toc_fetcher = None
+        self._reset_packet = None
+        self.cf.reply_timeout.add_callback(self._reply_timeout)
+
+        # Subscriptions and the blocks they are packed into, by period
+        self._subscriptions = []
+        self._packed_blocks = {}
+        self._routes = {}
+        self._subscription_lock = Lock()
 
     def add_config(self, logconf):
         """Add a log configuration to the logging framework.
@@ -424,22 +601,282 @@ class Log():
                 (logconf.period > 0 and logconf.period < 0xFF)):
             logconf.valid = True
             logconf.cf = self.cf
+            logconf.compile()
             self.log_blocks.append(logconf)
             self.block_added_cb.call(logconf)
         else:
             logconf.valid = False
 
-    def refresh_toc(self, refresh_done_callback, toc_cache):
-        """Start refreshing the table of loggale variables"""
+    def remove_config(self, logconf):
+        """Delete a log configuration in the Crazyflie and stop handling
+        its data"""
+        if logconf in self._deferred_starts:
+            self._deferred_starts.remove(logconf)
+        if logconf in self.log_blocks:
+            self.log_blocks.remove(logconf)
+            logconf._flush_batch()
+            logconf.delete()
+
+    def subscribe(self, subscription):
+        """
+        Start delivering the variables of a LogSubscription. The log blocks
+        of its period are repacked, only blocks whose variables change are
+        replaced. Subscriptions are kept when reconnecting until they are
+        unsubscribed.
+        """
+        period = subscription.period_in_ms / 10
+        if period <= 0 or period >= 0xFF:
+            raise ValueError("Period %dms not supported" %
+                             subscription.period_in_ms)
+        with self._subscription_lock:
+            if subscription not in self._subscriptions:
+                self._subscriptions.append(subscription)
+                self._repack(subscription.period_in_ms)
+
+    def unsubscribe(self, subscription):
+        """Stop delivering the variables of a LogSubscription"""
+        with self._subscription_lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+                self._repack(subscription.period_in_ms)
+
+    def _repack_all(self):
+        """Update the blocks of all the periods with subscriptions"""
+        with self._subscription_lock:
+            periods = set(sub.period_in_ms for sub in self._subscriptions)
+            periods.update(self._packed_blocks.keys())
+            for period_in_ms in periods:
+                self._repack(period_in_ms)
+
+    def _resolve(self, subscription):
+        """Find the (name, fetch_as id) of the variables of a subscription
+        in the TOC"""
+        keys = []
+        for name, fetch_as in subscription.variables:
+            element = self._toc.get_element_by_complete_name(name)
+            if element is None:
+                logger.warning("%s not in TOC, not logged for %s", name,
+                               subscription.name)
+                continue
+            key = (name, LogTocElement.get_id_from_cstring(
+                fetch_as or element.ctype))
+            if key not in keys:
+                keys.append(key)
+        subscription._toc = self._toc
+        subscription._keys = tuple(keys)
+
+    def _repack(self, period_in_ms):
+        """
+        Update the blocks of a period after the subscriptions have changed.
+        Blocks with only wanted variables are kept and the other wanted
+        variables are packed into new blocks, unless packing all of them
+        again gives fewer blocks.
+        """
+        if not self.toc_ready or self.cf.link is None:
+            return
+        sizes = OrderedDict()
+        for sub in self._subscriptions:
+            if sub.period_in_ms == period_in_ms:
+                if sub._toc is not self._toc:
+                    self._resolve(sub)
+                for key in sub._keys:
+                    sizes[key] = LogTocElement.get_size_from_id(key[1])
+
+        old = self._packed_blocks.get(period_in_ms, [])
+        kept = [block for block in old
+                if all((var.name, var.fetch_as) in sizes
+                       for var in block.variables)]
+        placed = set((var.name, var.fetch_as)
+                     for block in kept for var in block.variables)
+        groups = _pack_variables([key for key in sizes if key not in placed],
+                                 sizes)
+        if len(kept) + len(groups) > len(_pack_variables(sizes, sizes)):
+            kept = []
+            groups = _pack_variables(sizes, sizes)
+
+        for block in old:
+            if block not in kept:
+                self.remove_config(block)
+        blocks = kept
+        for keys in groups:
+            block = self._add_packed_block(period_in_ms, keys)
+            if block is not None:
+                blocks.append(block)
+        if blocks:
+            self._packed_blocks[period_in_ms] = blocks
+        else:
+            self._packed_blocks.pop(period_in_ms, None)
+        self._update_routes()
+
+    def _add_packed_block(self, period_in_ms, keys):
+        """Add and start a block with variables of subscriptions"""
+        block = LogConfig("Subscriptions %dms" % period_in_ms, period_in_ms)
+        for name, fetch_as in keys:
+            block.add_variable(name, LogTocElement.get_cstring_from_id(
+                fetch_as))
+        block.set_delivery(LogConfig.TUPLE)
+        block.data_received_cb.add_callback(self._packed_block_data)
+        block.error_cb.add_callback(self._packed_block_error)
+        self.add_config(block)
+        if not block.valid:
+            for sub in self._subscriptions:
+                if any(key in sub._keys for key in keys):
+                    sub.error_cb.call(sub, "Could not add log block")
+            return None
+        block.start()
+        return block
+
+    def _update_routes(self):
+        """Find the variables of each subscription in the blocks"""
+        routes = {}
+        for sub in self._subscriptions:
+            blocks = []
+            for block in self._packed_blocks.get(sub.period_in_ms, ()):
+                indexes = [(i, var.name)
+                           for i, var in enumerate(block.variables)
+                           if (var.name, var.fetch_as) in sub._keys]
+                if indexes:
+                    routes.setdefault(block, []).append((sub, indexes))
+                    blocks.append(block)
+            sub._blocks = blocks
+            sub._arrived = set()
+            sub._values = {}
+        self._routes = routes
+
+    def _packed_block_data(self, timestamp, values, block):
+        """Pass the data of a block to the subscriptions with variables in
+        it. A subscription spread over several blocks gets its data when all
+        of them have arrived."""
+        complete = []
+        # Runs on the log data worker while the subscriptions can be
+        # repacked by other threads, the callbacks are called unlocked
+        with self._subscription_lock:
+            for sub, indexes in self._routes.get(block, ()):
+                for i, name in indexes:
+                    sub._values[name] = values[i]
+                sub._arrived.add(block)
+                if len(sub._arrived) >= len(sub._blocks):
+                    sub._arrived = set()
+                    complete.append((sub, dict(sub._values)))
+        for sub, data in complete:
+            sub.data_received_cb.call(timestamp, data, sub)
+
+    def _packed_block_error(self, block, msg):
+        """Pass the errors of a block to its subscriptions"""
+        with self._subscription_lock:
+            routes = self._routes.get(block, ())
+        for sub, _ in routes:
+            sub.error_cb.call(sub, msg)
+
+    def refresh_toc(self, refresh_done_callback, toc_cache, warm_toc=None,
+                    window=None):
+        """
+        Start refreshing the table of loggale variables.
+
+        If warm_toc is supplied it is used until the TOC has been fetched,
+        and only replaced if the Crazyflie has a different one. window is
+        the number of element requests in flight, see TocFetcher.
+        """
 
         self._toc_cache = toc_cache
+        self._toc_window = window
         self._refresh_callback = refresh_done_callback
-        self._toc = None
+        if self._toc_fetcher is not None:
+            # Left from a connection that failed
+            self._toc_fetcher.stop()
+            self._toc_fetcher = None
+        self._toc = warm_toc
+        self._warm_toc = warm_toc
+        # The blocks of the last connection are removed by the reset
+        self.log_blocks = []
+        self._reset_pending = True
+        self._fetch_after_reset = True
+        self._deferred_starts = []
+        with self._subscription_lock:
+            self._packed_blocks = {}
+            self._routes = {}
+        self.toc_ready = warm_toc is not None
 
         pk = CRTPPacket()
         pk.set_header(CRTPPort.LOGGING, CHAN_SETTINGS)
         pk.data = (CMD_RESET_LOGGING, )
+        self._reset_packet = pk
+        self.cf.send_packet(pk, expected_reply=(CMD_RESET_LOGGING,))
+        # Started when the reset is acknowledged
+        self._repack_all()
+
+    def _reply_timeout(self, pk, pattern):
+        """The TOC is not fetched until the reset is acknowledged, so the
+        connection setup fails without it"""
+        if pk is self._reset_packet and self._reset_pending:
+            self._reset_packet = None
+            self.cf._setup_failed("No reply to the log reset")
+
+    def _toc_fetched(self, fetched):
+        """Called when the TOC has been fetched"""
+        self._toc_fetcher = None
+        if self._toc is None or fetched.crc != self._toc.crc:
+            self._toc = fetched
+        self._warm_toc = None
+        self.toc_ready = True
+        self._repack_all()
+        self._refresh_callback()
+
+    def enable_batch(self, logconf, count=256, interval=0.1):
+        """
+        Deliver the data of a log configuration in batches instead of once
+        per packet. The raw packets are buffered and decoded together into a
+        NumPy structured array, with a "timestamp" field and one field per
+        variable, that is passed to logconf.batch_received_cb. The
+        data_received_cb is not called while batch mode is enabled.
+
+        count -- Number of packets in a batch
+        interval -- Max time in seconds a packet is buffered. If the block
+                    stops sending the buffered packets are delivered from
+                    the scheduler thread, or earlier by flush_batches.
+
+        Batch mode requires NumPy.
+        """
+        if logconf._struct is None:
+            logconf.compile()
+        logconf._flush_batch()
+        logconf._batch = LogBatch(logconf, LogTocElement.types, count,
+                                  interval)
+
+    def disable_batch(self, logconf):
+        """Deliver the remaining batch and go back to per packet data"""
+        logconf._flush_batch()
+        logconf._batch = None
+
+    def flush_batches(self):
+        """Deliver the packets buffered for all the blocks in batch mode"""
+        for block in self.log_blocks:
+            block._flush_batch()
+
+    def reset_blocks(self):
+        """
+        Remove all the log blocks, both here and in the Crazyflie. Used when
+        the blocks were added using a TOC that turned out to be outdated.
+        """
+        for block in self.log_blocks:
+            block.started = False
+            block.added = False
+        self.log_blocks = []
+        self._reset_pending = True
+        self._fetch_after_reset = False
+        self._deferred_starts = []
+        with self._subscription_lock:
+            # No data is routed by the removed blocks until the repack
+            self._packed_blocks = {}
+            self._routes = {}
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.LOGGING, CHAN_SETTINGS)
+        pk.data = (CMD_RESET_LOGGING, )
+        self._reset_packet = pk
         self.cf.send_packet(pk, expected_reply=(CMD_RESET_LOGGING,))
+        # The subscriptions are packed again using the new TOC, the blocks
+        # are started when the reset is acknowledged
+        self._repack_all()
 
     def _find_block(self, id):
         for block in self.log_blocks:
@@ -450,8 +887,28 @@ class Log():
     def _new_packet_cb(self, packet):
         """Callback for newly arrived packets with TOC information"""
         chan = packet.channel
-        cmd = packet.datal[0]
-        payload = struct.pack("B" * (len(packet.datal) - 1), *packet.datal[1:])
+        if (chan == CHAN_LOGDATA):
+            # Handled first, this is the bulk of the traffic
+            data = packet.data
+            id, timestamp_low, timestamp_high = _LOG_DATA_HEADER.unpack_from(
+                data)
+            block = self._find_block(id)
+            if (block is not None):
+                if (block._batch is not None):
+                    # The timestamp is decoded with the rest of the batch
+                    batch = block._batch.append(data)
+                    if batch is not None:
+                        block.batch_received_cb.call(batch, block)
+                else:
+                    timestamp = timestamp_low | timestamp_high << 16
+                    block.unpack_log_data(data, timestamp,
+                                          _LOG_DATA_HEADER.size)
+            else:
+                logger.warning("Error no LogEntry to handle id=%d", id)
+            return
+
+        cmd = packet.datat[0]
+        payload = packet.data[1:]
 
         if (chan == CHAN_SETTINGS):
             id = ord(payload[0])
@@ -506,6 +963,7 @@ class Log():
                                 id)
                     if block:
                         block.started = False
+                        block._flush_batch()
 
             if (cmd == CMD_DELETE_BLOCK):
                 # Accept deletion of a block that isn't added. This could
@@ -516,28 +974,29 @@ class Log():
                     if block:
                         block.started = False
                         block.added = False
+                        block._flush_batch()
 
             if (cmd == CMD_RESET_LOGGING):
                 # Guard against multiple responses due to re-sending
-                if not self._toc:
-                    logger.debug("Logging reset, continue with TOC download")
-                    self.log_blocks = []
-
-                    self._toc = Toc()
-                    toc_fetcher = TocFetcher(self.cf, LogTocElement,
-                                             CRTPPort.LOGGING,
-                                             self._toc, self._refresh_callback,
-                                             self._toc_cache)
-                    toc_fetcher.start()
-
-        if (chan == CHAN_LOGDATA):
-            chan = packet.channel
-            id = packet.datal[0]
-            block = self._find_block(id)
-            timestamps = struct.unpack("<BBB", packet.data[1:4])
-            timestamp = (timestamps[0] | timestamps[1] << 8 | timestamps[2] << 16)
-            logdata = packet.data[4:]
-            if (block is not None):
-                block.unpack_log_data(logdata, timestamp)
-            else:
-                logger.warning("Error no LogEntry to handle id=%d", id)
+                if self._reset_pending:
+                    self._reset_pending = False
+                    if self._fetch_after_reset:
+                        logger.debug("Logging reset, continue with TOC"
+                                     " download")
+                        fetched = Toc()
+                        if self._warm_toc is None:
+                            self._toc = fetched
+                        self._toc_fetcher = TocFetcher(
+                            self.cf, LogTocElement, CRTPPort.LOGGING,
+                            fetched, lambda: self._toc_fetched(fetched),
+                            self._toc_cache, self._toc_window)
+                        self._toc_fetcher.start()
+
+                    # Blocks started before the reset was acknowledged
+                    deferred = self._deferred_starts
+                    self._deferred_starts = []
+                    for block in deferred:
+                        block.start()
+
+            # The started state of the blocks might have changed
+            self.cf._update_link_activity()
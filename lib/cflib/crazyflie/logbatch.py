@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Batch decoding of log data with NumPy.
+
+The log data packets of a block are kept in a preallocated ring of slots as
+they arrive. When it holds enough packets, or enough time has passed, all of
+them are decoded in one pass into a NumPy structured array with a
+"timestamp" field and one field per variable, which is passed to the
+batch_received_cb of the log configuration. The packets waiting when a block
+stops sending are delivered from the shared scheduler once the interval has
+passed. NumPy is only needed if batch mode is used.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['LogBatch']
+
+import time
+import logging
+from threading import Lock
+
+from cflib.utils.scheduler import get_scheduler
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+def _numpy_type(unpack_string, size):
+    """The NumPy type of a variable from its struct format and size in
+    LogTocElement.types"""
+    char = unpack_string[-1]
+    if char in "fd":
+        kind = "f"
+    elif char.isupper():
+        kind = "u"
+    else:
+        kind = "i"
+    return "<%s%d" % (kind, size)
+
+
+class LogBatch(object):
+    """
+    Buffers the log data packets of a block and decodes them in batches.
+    """
+
+    def __init__(self, block, types, count=256, interval=0.1):
+        """
+        block -- The LogConfig, it must be compiled
+        types -- LogTocElement.types
+        count -- Number of packets decoded together, also the number of slots
+        interval -- Max time in seconds a packet waits before it's decoded
+        """
+        if np is None:
+            raise Exception("NumPy is needed for batch decoding of log data")
+        self.block = block
+        self.count = count
+        self.interval = interval
+
+        names = [var.name for var in block.variables]
+        var_types = [_numpy_type(types[var.fetch_as][1],
+                                 types[var.fetch_as][2])
+                     for var in block.variables]
+        # Layout of a log data packet, without padding
+        self._raw_dtype = np.dtype(
+            [("block_id", "u1"), ("timestamp_low", "<u2"),
+             ("timestamp_high", "u1")] + zip(names, var_types))
+        # Layout of the decoded array
+        self.dtype = np.dtype([("timestamp", "<u4")] +
+                              zip(names, var_types))
+        self._names = names
+        self._packet_size = self._raw_dtype.itemsize
+
+        # The packets are only referenced here and copied together when
+        # decoded, that is cheaper than copying each of them on arrival
+        self._slots = [None] * count
+        self._queued = 0
+        self._first = None
+        # Increased for each batch, a scheduled flush of an older batch
+        # does nothing
+        self._generation = 0
+        self._lock = Lock()
+
+    def append(self, data):
+        """
+        Add the data of a log data packet. Returns the decoded batch if it's
+        ready, otherwise None. Bytes after the variables are ignored, like
+        when the packets are decoded one at a time.
+        """
+        if len(data) < self._packet_size:
+            logger.warning("Log data for id=%d is %d bytes, expected %d",
+                           self.block.id, len(data), self._packet_size)
+            return None
+        if len(data) > self._packet_size:
+            data = data[:self._packet_size]
+        with self._lock:
+            self._slots[self._queued] = data
+            self._queued += 1
+            if self._queued < self.count:
+                now = time.time()
+                if self._first is None:
+                    self._first = now
+                    get_scheduler().schedule(self.interval, self._expired,
+                                             self._generation)
+                if now - self._first < self.interval:
+                    return None
+            return self._decode()
+
+    def flush(self):
+        """Decode the packets in the slots, None if there are none"""
+        with self._lock:
+            if self._queued == 0:
+                return None
+            return self._decode()
+
+    def _expired(self, generation):
+        """Deliver the batch the first packet of which has waited interval
+        seconds, if it has not been delivered yet"""
+        with self._lock:
+            if generation != self._generation or self._queued == 0:
+                return
+            batch = self._decode()
+        self.block.batch_received_cb.call(batch, self.block)
+
+    def _decode(self):
+        """Decode all the queued packets, in one pass per field"""
+        raw = np.frombuffer("".join(self._slots[:self._queued]),
+                            dtype=self._raw_dtype)
+        batch = np.empty(self._queued, dtype=self.dtype)
+        batch["timestamp"] = raw["timestamp_high"]
+        batch["timestamp"] <<= 16
+        batch["timestamp"] |= raw["timestamp_low"]
+        for name in self._names:
+            batch[name] = raw[name]
+        self._slots[:self._queued] = [None] * self._queued
+        self._queued = 0
+        self._first = None
+        self._generation += 1
+        return batch
@@ -40,7 +40,7 @@ __all__ = ['Param', 'ParamTocElement']
 from cflib.utils.callbacks import Caller
 import struct
 from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
-from .toc import Toc, TocFetcher
+from .toc import Toc, TocFetcher, TocElement
 from threading import Thread, Lock
 
 from Queue import Queue
@@ -65,8 +65,9 @@ TOC_GETCRC32 = 2
 
 
 # One element entry in the TOC
-class ParamTocElement:
+class ParamTocElement(TocElement):
     """An element in the Log TOC."""
+    __slots__ = ()
 
     RW_ACCESS = 0
     RO_ACCESS = 1
@@ -85,11 +86,12 @@ class ParamTocElement:
 
     def __init__(self, data=None):
         """TocElement creator. Data is the binary payload of the element."""
+        TocElement.__init__(self)
         if (data):
             strs = struct.unpack("s" * len(data[2:]), data[2:])
             strs = ("{}" * len(strs)).format(*strs).split("\0")
-            self.group = strs[0]
-            self.name = strs[1]
+            self.group = intern(strs[0])
+            self.name = intern(strs[1])
 
             self.ident = ord(data[0])
 
@@ -112,22 +114,26 @@ class Param():
     Used to read and write parameter values in the Crazyflie.
     """
 
-    toc = Toc()
-
     def __init__(self, crazyflie):
         self.cf = crazyflie
+        self.toc = Toc()
         self.param_update_callbacks = {}
         self.group_update_callbacks = {}
         self.param_updater = None
+        # Called with the complete name of a parameter when a read or write
+        # of it was not answered
+        self.update_failed = Caller()
+        self._toc_fetcher = None
 
-        self.param_updater = _ParamUpdater(self.cf, self._param_updated)
+        self.param_updater = _ParamUpdater(self.cf, self._param_updated,
+                                           self._param_update_failed)
         self.param_updater.start()
 
         self.cf.disconnected.add_callback(self.param_updater.close)
 
     def _param_updated(self, pk):
         """Callback with data for an updated parameter"""
-        var_id = pk.datal[0]
+        var_id = pk.datat[0]
         element = self.toc.get_element_by_id(var_id)
         if element:
             s = struct.unpack(element.pytype, pk.data[1:])[0]
@@ -141,6 +147,18 @@ class Param():
         else:
             logger.debug("Variable id [%d] not found in TOC", var_id)
 
+    def _param_update_failed(self, pk):
+        """Callback for a parameter request that was not answered"""
+        var_id = pk.datat[0]
+        element = self.toc.get_element_by_id(var_id)
+        if element:
+            complete_name = "%s.%s" % (element.group, element.name)
+            logger.warning("No reply when updating parameter [%s]",
+                           complete_name)
+            self.update_failed.call(complete_name)
+        else:
+            logger.debug("Variable id [%d] not found in TOC", var_id)
+
     def remove_update_callback(self, group, name=None, cb=None):
         """Remove the supplied callback for a group or a group.name"""
         if not cb:
@@ -169,15 +187,35 @@ class Param():
                 self.param_update_callbacks[paramname] = Caller()
             self.param_update_callbacks[paramname].add_callback(cb)
 
-    def refresh_toc(self, refresh_done_callback, toc_cache):
+    def refresh_toc(self, refresh_done_callback, toc_cache, warm_toc=None,
+                    window=None):
         """
         Initiate a refresh of the parameter TOC.
+
+        If warm_toc is supplied it is used until the TOC has been fetched,
+        and only replaced if the Crazyflie has a different one. window is
+        the number of element requests in flight, see TocFetcher.
         """
-        self.toc = Toc()
-        toc_fetcher = TocFetcher(self.cf, ParamTocElement,
-                                CRTPPort.PARAM, self.toc,
-                                refresh_done_callback, toc_cache)
-        toc_fetcher.start()
+        if self._toc_fetcher is not None:
+            # Left from a connection that failed
+            self._toc_fetcher.stop()
+        if warm_toc is not None:
+            self.toc = warm_toc
+            fetched = Toc()
+        else:
+            self.toc = Toc()
+            fetched = self.toc
+
+        def toc_fetched():
+            self._toc_fetcher = None
+            if fetched.crc != self.toc.crc:
+                self.toc = fetched
+            refresh_done_callback()
+
+        self._toc_fetcher = TocFetcher(self.cf, ParamTocElement,
+                                       CRTPPort.PARAM, fetched,
+                                       toc_fetched, toc_cache, window)
+        self._toc_fetcher.start()
 
     def disconnected(self, uri):
         """Disconnected callback from Crazyflie API"""
@@ -213,17 +251,20 @@ class Param():
 class _ParamUpdater(Thread):
     """This thread will update params through a queue to make sure that we
     get back values"""
-    def __init__(self, cf, updated_callback):
+    def __init__(self, cf, updated_callback, failed_callback):
         """Initialize the thread"""
         Thread.__init__(self)
         self.setDaemon(True)
         self.wait_lock = Lock()
         self.cf = cf
         self.updated_callback = updated_callback
+        self.failed_callback = failed_callback
         self.request_queue = Queue()
         self.cf.add_port_callback(CRTPPort.PARAM, self._new_packet_cb)
+        self.cf.reply_timeout.add_callback(self._reply_timeout)
         self._should_close = False
         self._req_param = -1
+        self._req_packet = None
 
     def close(self, uri):
         # First empty the queue from all packets
@@ -244,16 +285,29 @@ class _ParamUpdater(Thread):
     def _new_packet_cb(self, pk):
         """Callback for newly arrived packets"""
         if pk.channel == READ_CHANNEL or pk.channel == WRITE_CHANNEL:
-            var_id = pk.datal[0]
+            var_id = pk.datat[0]
             if (pk.channel != TOC_CHANNEL and self._req_param == var_id
                 and pk is not None):
                 self.updated_callback(pk)
                 self._req_param = -1
+                self._req_packet = None
                 try:
                     self.wait_lock.release()
                 except:
                     pass
 
+    def _reply_timeout(self, pk, pattern):
+        """Give up on a request that was not answered, so the following
+        requests are not blocked"""
+        if pk is self._req_packet:
+            self._req_param = -1
+            self._req_packet = None
+            self.failed_callback(pk)
+            try:
+                self.wait_lock.release()
+            except:
+                pass
+
     def request_param_update(self, var_id):
         """Place a param update request on the queue"""
         pk = CRTPPacket()
@@ -267,7 +321,8 @@ class _ParamUpdater(Thread):
             pk = self.request_queue.get()  # Wait for request update
             self.wait_lock.acquire()
             if self.cf.link:
-                self._req_param = pk.datal[0]
+                self._req_param = pk.datat[0]
+                self._req_packet = pk
                 self.cf.send_packet(pk, expected_reply=(pk.datat[0:2]))
             else:
                 self.wait_lock.release()
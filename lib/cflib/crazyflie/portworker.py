@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Worker threads running the callbacks of a port, so a slow consumer (for
+instance writing log data to file or updating plots) does not delay the
+packets of the other ports.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['PortWorker', 'DROP_OLDEST', 'BLOCK', 'SAMPLE']
+
+import collections
+import threading
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Overflow policies, used when the queue of a worker is full
+# Drop the oldest packet in the queue to make room for the new one
+DROP_OLDEST = "drop_oldest"
+# Wait for the worker, stalling the reception of all the packets
+BLOCK = "block"
+# Keep only one packet out of sample_every once the queue is half full,
+# dropping the oldest packet if the queue is full anyway
+SAMPLE = "sample"
+
+
+class PortWorker(object):
+    """A bounded queue of packets and the thread passing them to a
+    callback"""
+
+    def __init__(self, name, callback, maxsize=100, policy=DROP_OLDEST,
+                 sample_every=4, start=True):
+        if policy not in (DROP_OLDEST, BLOCK, SAMPLE):
+            raise ValueError("Unknown overflow policy %s" % policy)
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.sample_every = sample_every
+        self._callback = callback
+        self._queue = collections.deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._sample_ctr = 0
+        # Set when the worker is stopped, packets are then passed to it
+        self._handover = None
+
+        self._max_depth = 0
+        self._queued = 0
+        self._dropped = 0
+
+        self._thread = threading.Thread(target=self._run,
+                                        name="PortWorker %s" % name)
+        self._thread.setDaemon(True)
+        if start:
+            self._thread.start()
+
+    def start(self, backlog=()):
+        """Start the thread of a worker created with start False, backlog
+        being packets to handle before the ones already queued"""
+        with self._cond:
+            self._queue.extendleft(reversed(list(backlog)))
+            if self.policy != BLOCK:
+                while len(self._queue) > self.maxsize:
+                    self._queue.popleft()
+                    self._dropped += 1
+        self._thread.start()
+
+    def stop(self, handover):
+        """
+        Stop the worker and pass the packets put from now on to handover.
+        Waits for the callback being run to return, unless called from it,
+        and returns the packets that were still queued.
+        """
+        with self._cond:
+            self._handover = handover
+            self._cond.notify_all()
+        if (self._thread.is_alive() and
+                threading.current_thread() is not self._thread):
+            self._thread.join()
+        with self._cond:
+            backlog = list(self._queue)
+            self._queue.clear()
+        return backlog
+
+    def put(self, pk):
+        """Queue a packet, applying the overflow policy. Once the worker is
+        stopped the packet is passed to the handover callback instead."""
+        with self._cond:
+            queue = self._queue
+            if self.policy == SAMPLE and len(queue) >= self.maxsize // 2:
+                self._sample_ctr += 1
+                if self._sample_ctr < self.sample_every:
+                    self._dropped += 1
+                    return
+                self._sample_ctr = 0
+            if len(queue) >= self.maxsize and self._handover is None:
+                if self.policy == BLOCK:
+                    while (len(queue) >= self.maxsize and
+                           self._handover is None):
+                        self._cond.wait()
+                else:
+                    queue.popleft()
+                    self._dropped += 1
+            handover = self._handover
+            if handover is None:
+                queue.append(pk)
+                self._queued += 1
+                if len(queue) > self._max_depth:
+                    self._max_depth = len(queue)
+                self._cond.notify_all()
+                return
+        handover(pk)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and self._handover is None:
+                    self._cond.wait()
+                if self._handover is not None:
+                    return
+                pk = self._queue.popleft()
+                if self.policy == BLOCK:
+                    self._cond.notify_all()
+            self._callback(pk)
+
+    def get_stats(self):
+        """Return the current and max depth of the queue and the number of
+        packets queued and dropped"""
+        return {"policy": self.policy,
+                "depth": len(self._queue),
+                "max_depth": self._max_depth,
+                "queued": self._queued,
+                "dropped": self._dropped}
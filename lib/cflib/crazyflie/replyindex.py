@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Index of the replies expected from the Crazyflie.
+
+Packets that expect a reply are registered with the start of the reply
+(header and first bytes of data). Every received packet is then matched
+against the index, so it has to be fast: patterns are stored in a trie per
+header and a match only walks as many bytes as the longest pattern.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['ReplyPatternIndex']
+
+import collections
+import time
+
+# Key of the value in a trie node, the other keys are data bytes
+_VALUE = None
+
+
+class ReplyPatternIndex(object):
+    """
+    Map of pattern -> value where a pattern is a tuple (header, byte, ...).
+    It can be used like a dict and the longest pattern matching a packet is
+    found with match().
+    """
+
+    # Number of reply latencies kept for the statistics
+    LATENCY_SAMPLES = 100
+
+    def __init__(self):
+        # header -> trie node, a node is a dict of byte -> node where the
+        # _VALUE key holds (value, time added) for a pattern ending there
+        self._headers = {}
+        self._count = 0
+        self._matched = 0
+        self._latencies = collections.deque(maxlen=self.LATENCY_SAMPLES)
+
+    def _find(self, pattern, create=False):
+        """Return the node of pattern, or None"""
+        node = self._headers.get(pattern[0])
+        if node is None:
+            if not create:
+                return None
+            node = self._headers[pattern[0]] = {}
+        for byte in pattern[1:]:
+            child = node.get(byte)
+            if child is None:
+                if not create:
+                    return None
+                child = node[byte] = {}
+            node = child
+        return node
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, pattern):
+        node = self._find(pattern)
+        return node is not None and _VALUE in node
+
+    def __getitem__(self, pattern):
+        node = self._find(pattern)
+        if node is None or _VALUE not in node:
+            raise KeyError(pattern)
+        return node[_VALUE][0]
+
+    def __setitem__(self, pattern, value):
+        """Add a pattern, or replace its value keeping the time it was
+        added"""
+        node = self._find(pattern, True)
+        if _VALUE in node:
+            node[_VALUE] = (value, node[_VALUE][1])
+        else:
+            node[_VALUE] = (value, time.time())
+            self._count += 1
+
+    def __delitem__(self, pattern):
+        # Keep the path to prune the nodes that become empty
+        path = [(self._headers, pattern[0])]
+        node = self._headers.get(pattern[0])
+        for byte in pattern[1:]:
+            if node is None:
+                break
+            path.append((node, byte))
+            node = node.get(byte)
+        if node is None or _VALUE not in node:
+            raise KeyError(pattern)
+        del node[_VALUE]
+        self._count -= 1
+        for (parent, key) in reversed(path):
+            if parent[key]:
+                break
+            del parent[key]
+
+    def match(self, header, data):
+        """
+        Return the longest pattern that the packet with header and data
+        (tuple of bytes) starts with, or None
+        """
+        node = self._headers.get(header)
+        if node is None:
+            return None
+        found = 0 if _VALUE in node else -1
+        depth = 0
+        for byte in data:
+            node = node.get(byte)
+            if node is None:
+                break
+            depth += 1
+            if _VALUE in node:
+                found = depth
+        if found < 0:
+            return None
+        return (header,) + tuple(data[:found])
+
+    def pop_match(self, header, data):
+        """Remove the longest pattern matching the packet, record how long
+        the reply took and return (pattern, value), or None"""
+        pattern = self.match(header, data)
+        if pattern is None:
+            return None
+        (value, added) = self._find(pattern)[_VALUE]
+        self._latencies.append(time.time() - added)
+        self._matched += 1
+        del self[pattern]
+        return (pattern, value)
+
+    def values(self):
+        """Return a list of the values of all the patterns"""
+        values = []
+        nodes = list(self._headers.values())
+        while nodes:
+            node = nodes.pop()
+            for (key, child) in node.items():
+                if key is _VALUE:
+                    values.append(child[0])
+                else:
+                    nodes.append(child)
+        return values
+
+    def clear(self):
+        """Remove all the patterns"""
+        self._headers = {}
+        self._count = 0
+
+    def get_stats(self):
+        """
+        Return the number of pending replies, the number of replies matched
+        and the mean/max time in seconds it took to get the last replies.
+        """
+        latencies = list(self._latencies)
+        stats = {"pending": self._count,
+                 "matched": self._matched,
+                 "mean_latency": 0.0,
+                 "max_latency": 0.0}
+        if latencies:
+            stats["mean_latency"] = sum(latencies) / len(latencies)
+            stats["max_latency"] = max(latencies)
+        return stats
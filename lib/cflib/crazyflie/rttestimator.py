@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Round trip time estimation used to decide when to resend a packet that has
+not been answered, the same way TCP does it (RFC 6298).
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['RttEstimator']
+
+import collections
+
+
+class RttEstimator(object):
+    """
+    Smoothed round trip time (SRTT) and its variation (RTTVAR) of the
+    replies on one port, giving the retransmission timeout (RTO).
+    """
+
+    ALPHA = 1.0 / 8
+    BETA = 1.0 / 4
+    K = 4
+    # Timeout used before the first measurement, in seconds
+    INITIAL_RTO = 0.2
+    MIN_RTO = 0.05
+    MAX_RTO = 2.0
+    # Number of round trip times kept for the percentiles
+    SAMPLES = 200
+
+    def __init__(self):
+        self.srtt = None
+        self.rttvar = None
+        self.rto = self.INITIAL_RTO
+        self._samples = collections.deque(maxlen=self.SAMPLES)
+
+    def sample(self, rtt):
+        """
+        Add a round trip time measurement in seconds. Only replies to
+        packets that were not resent should be measured (Karn's algorithm)
+        since it is not known which of the sendings was answered.
+        """
+        self._samples.append(rtt)
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = ((1 - self.BETA) * self.rttvar +
+                           self.BETA * abs(self.srtt - rtt))
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.rto = min(max(self.srtt + self.K * self.rttvar, self.MIN_RTO),
+                       self.MAX_RTO)
+
+    def get_timeout(self, retries=0):
+        """Return the timeout before resending for the retries:th time,
+        doubled for every retry"""
+        return min(self.rto * (2 ** retries), self.MAX_RTO)
+
+    def get_stats(self):
+        """
+        Return the SRTT, RTTVAR, RTO and the 50/90/99th percentiles of the
+        last round trip times, all in seconds.
+        """
+        samples = sorted(self._samples)
+        stats = {"srtt": self.srtt,
+                 "rttvar": self.rttvar,
+                 "rto": self.rto,
+                 "samples": len(samples)}
+        for p in (50, 90, 99):
+            value = None
+            if samples:
+                value = samples[min(len(samples) - 1,
+                                    len(samples) * p // 100)]
+            stats["p%d" % p] = value
+        return stats
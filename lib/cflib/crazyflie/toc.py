@@ -29,13 +29,21 @@
 """
 A generic TableOfContents module that is used to fetch, store and minipulate
 a TOC for logging or parameters.
+
+TOCs are interned by element class and CRC, so all the Crazyflies running
+the same firmware share one read-only copy of each TOC.
 """
 
 __author__ = 'Bitcraze AB'
-__all__ = ['TocElement', 'Toc', 'TocFetcher']
+__all__ = ['TocElement', 'Toc', 'TocFetcher', 'intern_toc', 'lookup_toc',
+           'get_interned_stats']
 
 from cflib.crtp.crtpstack import CRTPPacket
 import struct
+import sys
+import weakref
+from bisect import bisect_left, insort
+from threading import Lock
 
 import logging
 logger = logging.getLogger(__name__)
@@ -52,51 +60,160 @@ GET_TOC_INFO = "GET_TOC_INFO"
 GET_TOC_ELEMENT = "GET_TOC_ELEMENT"
 
 
-class TocElement:
+class TocElement(object):
     """An element in the TOC."""
     RW_ACCESS = 0
     RO_ACCESS = 1
 
-    ident = 0
-    group = ""
-    name = ""
-    ctype = ""
-    pytype = ""
-    access = RO_ACCESS
+    # Elements are shared between Crazyflies, so keep them small
+    __slots__ = ('ident', 'group', 'name', 'ctype', 'pytype', 'access')
+
+    def __init__(self):
+        self.ident = 0
+        self.group = ""
+        self.name = ""
+        self.ctype = ""
+        self.pytype = ""
+        self.access = TocElement.RO_ACCESS
+
+
+class _TocIndex(object):
+    """Id and complete name indexes of the elements in a TOC"""
+    __slots__ = ('by_id', 'by_name', 'names')
+
+    def __init__(self, toc):
+        self.by_id = {}
+        self.by_name = {}
+        for group, elements in toc.iteritems():
+            for name, element in elements.iteritems():
+                self.by_id[element.ident] = element
+                self.by_name["%s.%s" % (group, name)] = element
+        # Sorted complete names for the prefix search
+        self.names = sorted(self.by_name)
+
+    def add(self, element):
+        """Add a new element to the indexes"""
+        complete_name = "%s.%s" % (element.group, element.name)
+        if complete_name not in self.by_name:
+            insort(self.names, complete_name)
+        self.by_id[element.ident] = element
+        self.by_name[complete_name] = element
+
+
+class _InternedToc(dict):
+    """The group dictionary of an interned TOC, the indexes are built once
+    and shared too"""
+    __slots__ = ('__weakref__', 'index')
+
+
+# (element class, CRC) -> TOC, a TOC is dropped when no Crazyflie uses it
+_interned = weakref.WeakValueDictionary()
+_interned_lock = Lock()
+
 
+def lookup_toc(element_class, crc):
+    """Return the interned TOC with the CRC or None"""
+    return _interned.get((element_class, crc))
 
-class Toc:
+
+def intern_toc(element_class, crc, toc):
+    """
+    Return the shared copy of a TOC with the CRC, the supplied TOC becomes
+    the shared copy if there is none. The returned TOC is shared between
+    Crazyflies and must not be modified.
+    """
+    with _interned_lock:
+        shared = _interned.get((element_class, crc))
+        if shared is None:
+            shared = _InternedToc()
+            for group, elements in toc.iteritems():
+                shared[intern(str(group))] = elements
+            _interned[(element_class, crc)] = shared
+        return shared
+
+
+def _toc_size(toc):
+    """Approximate size in bytes of a TOC, the strings are interned and
+    not counted"""
+    size = sys.getsizeof(toc)
+    for elements in toc.itervalues():
+        size += sys.getsizeof(elements)
+        for element in elements.itervalues():
+            size += sys.getsizeof(element)
+            if hasattr(element, "__dict__"):
+                size += sys.getsizeof(element.__dict__)
+    return size
+
+
+def get_interned_stats():
+    """
+    Return the number of interned TOCs, their total number of elements and
+    their approximate size in bytes.
+    """
+    with _interned_lock:
+        tocs = _interned.values()
+    return {"tocs": len(tocs),
+            "elements": sum(len(e) for toc in tocs for e in toc.itervalues()),
+            "bytes": sum(_toc_size(toc) for toc in tocs)}
+
+
+class Toc(object):
     """Container for TocElements."""
 
     def __init__(self):
-        self.toc = {}
+        self._toc = {}
+        self._index = None
+        # CRC of the TOC in the Crazyflie, set when the TOC is fetched
+        self.crc = None
+
+    def _get_toc(self):
+        """Get the group dictionary of the TOC"""
+        return self._toc
+
+    def _set_toc(self, toc):
+        """Replace the group dictionary, the indexes are rebuilt when they
+        are needed"""
+        self._toc = toc
+        self._index = None
+
+    toc = property(_get_toc, _set_toc)
+
+    def _get_index(self):
+        """Get the indexes of the elements, building them if needed"""
+        index = self._index
+        if index is None:
+            index = getattr(self._toc, "index", None)
+            if index is None:
+                index = _TocIndex(self._toc)
+                if isinstance(self._toc, _InternedToc):
+                    self._toc.index = index
+            self._index = index
+        return index
 
     def clear(self):
         """Clear the TOC"""
         self.toc = {}
+        self.crc = None
 
     def add_element(self, element):
         """Add a new TocElement to the TOC container."""
         try:
-            self.toc[element.group][element.name] = element
+            self._toc[element.group][element.name] = element
         except KeyError:
-            self.toc[element.group] = {}
-            self.toc[element.group][element.name] = element
+            self._toc[element.group] = {}
+            self._toc[element.group][element.name] = element
+        if self._index is not None:
+            self._index.add(element)
 
     def get_element_by_complete_name(self, complete_name):
         """Get a TocElement element identified by complete name from the
         container."""
-        try:
-            return self.get_element_by_id(self.get_element_id(complete_name))
-        except ValueError:
-            # Item not found
-            return None
+        return self._get_index().by_name.get(complete_name)
 
     def get_element_id(self, complete_name):
         """Get the TocElement element id-number of the element with the
         supplied name."""
-        [group, name] = complete_name.split(".")
-        element = self._get_element(group, name)
+        element = self._get_index().by_name.get(complete_name)
         if element:
             return element.ident
         else:
@@ -107,24 +224,53 @@ class Toc:
         """Get a TocElement element identified by name and group from the
         container."""
         try:
-            return self.toc[group][name]
+            return self._toc[group][name]
         except KeyError:
             return None
 
     def get_element_by_id(self, ident):
         """Get a TocElement element identified by index number from the
         container."""
-        for group in self.toc.keys():
-            for name in self.toc[group].keys():
-                if self.toc[group][name].ident == ident:
-                    return self.toc[group][name]
-        return None
+        return self._get_index().by_id.get(ident)
+
+    def get_groups(self):
+        """Get the names of the groups in the TOC, sorted"""
+        return sorted(self._toc)
+
+    def get_group_elements(self, group):
+        """Get the TocElements of a group sorted by name, or an empty list
+        if there is no such group"""
+        elements = self._toc.get(group, {})
+        return [elements[name] for name in sorted(elements)]
+
+    def find_elements(self, prefix):
+        """Get the TocElements with a complete name ("group.name") starting
+        with prefix, sorted by complete name."""
+        index = self._get_index()
+        names = index.names
+        found = []
+        i = bisect_left(names, prefix)
+        while i < len(names) and names[i].startswith(prefix):
+            found.append(index.by_name[names[i]])
+            i += 1
+        return found
 
 
 class TocFetcher:
-    """Fetches TOC entries from the Crazyflie"""
+    """
+    Fetches TOC entries from the Crazyflie.
+
+    Up to window element requests are kept in flight. The replies can come
+    in any order and are stored in a slot per index, each request is resent
+    by the Crazyflie until its reply arrives so only the missing elements
+    are requested again. The fetch is finished when all the slots are full.
+    """
+
+    # Default number of element requests in flight
+    WINDOW = 8
+
     def __init__(self, crazyflie, element_class, port, toc_holder,
-                 finished_callback, toc_cache):
+                 finished_callback, toc_cache, window=None):
         self.cf = crazyflie
         self.port = port
         self._crc = 0
@@ -135,23 +281,52 @@ class TocFetcher:
         self._toc_cache = toc_cache
         self.finished_callback = finished_callback
         self.element_class = element_class
+        self.window = window or self.WINDOW
+        # Payload of the element replies by index, None until received
+        self._slots = None
+        self._received = 0
+        # The requests sent, to recognize their reply timeouts
+        self._requests = set()
 
     def start(self):
         """Initiate fetching of the TOC."""
         logger.debug("[%d]: Start fetching...", self.port)
         # Register callback in this class for the port
         self.cf.add_port_callback(self.port, self._new_packet_cb)
+        self.cf.reply_timeout.add_callback(self._reply_timeout)
 
         # Request the TOC CRC
         self.state = GET_TOC_INFO
         pk = CRTPPacket()
         pk.set_header(self.port, TOC_CHANNEL)
         pk.data = (CMD_TOC_INFO, )
+        self._requests.add(pk)
         self.cf.send_packet(pk, expected_reply=(CMD_TOC_INFO,))
 
+    def stop(self):
+        """Stop handling replies, the fetch is not finished"""
+        self.state = IDLE
+        self._requests = set()
+        self.cf.remove_port_callback(self.port, self._new_packet_cb)
+        try:
+            self.cf.reply_timeout.remove_callback(self._reply_timeout)
+        except ValueError:
+            # Already stopped
+            pass
+
+    def _reply_timeout(self, pk, pattern):
+        """Fail the connection if one of our requests is never answered"""
+        if pk in self._requests:
+            logger.warning("[%d]: No reply to TOC request %s", self.port,
+                           pattern)
+            self.stop()
+            self.cf._setup_failed("No reply to TOC request on port %d" %
+                                  self.port)
+
     def _toc_fetch_finished(self):
         """Callback for when the TOC fetching is finished"""
-        self.cf.remove_port_callback(self.port, self._new_packet_cb)
+        self.toc.crc = self._crc
+        self.stop()
         logger.debug("[%d]: Done!", self.port)
         self.finished_callback()
 
@@ -160,38 +335,65 @@ class TocFetcher:
         chan = packet.channel
         if (chan != 0):
             return
-        payload = struct.pack("B" * (len(packet.datal) - 1), *packet.datal[1:])
+        payload = packet.data[1:]
 
         if (self.state == GET_TOC_INFO):
+            if packet.datat[0] != CMD_TOC_INFO:
+                # Late element reply from an earlier fetch
+                return
             [self.nbr_of_items, self._crc] = struct.unpack("<BI", payload[:5])
             logger.debug("[%d]: Got TOC CRC, %d items and crc=0x%08X",
                          self.port, self.nbr_of_items, self._crc)
 
+            shared = lookup_toc(self.element_class, self._crc)
+            if shared is not None:
+                self.toc.toc = shared
+                logger.info("TOC for port [%s] shared with another Crazyflie",
+                            self.port)
+                self._toc_fetch_finished()
+                return
+
             cache_data = self._toc_cache.fetch(self._crc)
             if (cache_data):
-                self.toc.toc = cache_data
+                self.toc.toc = intern_toc(self.element_class, self._crc,
+                                          cache_data)
                 logger.info("TOC for port [%s] found in cache" % self.port)
                 self._toc_fetch_finished()
+            elif self.nbr_of_items == 0:
+                self._toc_cache.insert(self._crc, self.toc.toc)
+                self.toc.toc = intern_toc(self.element_class, self._crc,
+                                          self.toc.toc)
+                self._toc_fetch_finished()
             else:
                 self.state = GET_TOC_ELEMENT
-                self.requested_index = 0
-                self._request_toc_element(self.requested_index)
+                self._slots = [None] * self.nbr_of_items
+                self._received = 0
+                self.requested_index = -1
+                for _ in range(min(self.window, self.nbr_of_items)):
+                    self.requested_index += 1
+                    self._request_toc_element(self.requested_index)
 
         elif (self.state == GET_TOC_ELEMENT):
-            # Always add new element, but only request new if it's not the
-            # last one.
-            if self.requested_index != ord(payload[0]):
+            if packet.datat[0] != CMD_TOC_ELEMENT:
+                return
+            index = ord(payload[0])
+            if index >= self.nbr_of_items or self._slots[index] is not None:
+                # Duplicate reply to a resent request
                 return
-            self.toc.add_element(self.element_class(payload))
-            logger.debug("Added element [%s]",
-                         self.element_class(payload).ident)
-            if (self.requested_index < (self.nbr_of_items - 1)):
-                logger.debug("[%d]: More variables, requesting index %d",
-                             self.port, self.requested_index + 1)
-                self.requested_index = self.requested_index + 1
+            self._slots[index] = payload
+            self._received += 1
+            if self.requested_index < self.nbr_of_items - 1:
+                self.requested_index += 1
                 self._request_toc_element(self.requested_index)
-            else:  # No more variables in TOC
+            elif self._received == self.nbr_of_items:
+                # All the slots are full, add the elements in index order
+                for element in self._slots:
+                    self.toc.add_element(self.element_class(element))
+                self.state = IDLE
+                self._slots = None
                 self._toc_cache.insert(self._crc, self.toc.toc)
+                self.toc.toc = intern_toc(self.element_class, self._crc,
+                                          self.toc.toc)
                 self._toc_fetch_finished()
 
     def _request_toc_element(self, index):
@@ -200,4 +402,5 @@ class TocFetcher:
         pk = CRTPPacket()
         pk.set_header(self.port, TOC_CHANNEL)
         pk.data = (CMD_TOC_ELEMENT, index)
+        self._requests.add(pk)
         self.cf.send_packet(pk, expected_reply=(CMD_TOC_ELEMENT, index))
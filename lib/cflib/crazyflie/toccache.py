@@ -29,6 +29,17 @@
 """
 Access the TOC cache for reading/writing. It supports both user
 cache and dist cache.
+
+The TOCs are stored in a compact binary format, one file per CRC named
+%08X.toc. The cache directories are listed once when the cache is created
+and a CRC to file index is kept in memory, the files are only read when
+a TOC is fetched. Files in the older JSON format are still read and are
+imported into the read-write cache the first time they are used.
+
+Binary format (little endian):
+  header:  magic "CFTC", version (B), crc (I), number of elements (H)
+  element: class (B), ident (H), access (B), length of strings (H) and
+           group, name, ctype and pytype separated by \\0
 """
 
 __author__ = 'Bitcraze AB'
@@ -36,14 +47,38 @@ __all__ = ['TocCache']
 
 import os
 import json
-from glob import glob
+import struct
+from threading import Lock
+from contextlib import contextmanager
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, only threads are serialized there
+    fcntl = None
 
 import logging
 logger = logging.getLogger(__name__)
 
-from .log import LogTocElement  # pylint: disable=W0611
-from .param import ParamTocElement  # pylint: disable=W0611
- 
+from cflib.utils.atomicfile import write_atomic
+from .log import LogTocElement
+from .param import ParamTocElement
+
+MAGIC = "CFTC"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sBIH")
+_ELEMENT = struct.Struct("<BHBH")
+
+# Class codes used in the binary format
+_CLASSES = (LogTocElement, ParamTocElement)
+_CLASS_NAMES = dict((c.__name__, c) for c in _CLASSES)
+
+# File in the read-write cache with the CRCs of the last TOCs used by URI
+LAST_FILE = "last.json"
+# Locked while LAST_FILE is updated, by all processes using the cache
+LAST_LOCK_FILE = "last.lock"
 
 
 class TocCache():
@@ -51,74 +86,264 @@ class TocCache():
     Access to TOC cache. To turn of the cache functionality
     don't supply any directories.
     """
-    def __init__(self, ro_cache=None, rw_cache=None):
-        self._cache_files = []
+
+    # Max number of TOCs kept in the read-write cache, the least recently
+    # used ones are removed first
+    MAX_ENTRIES = 64
+
+    def __init__(self, ro_cache=None, rw_cache=None, max_entries=None):
+        # CRC -> path of the cache file, the read-write cache is listed
+        # last so its entries are used before the read-only ones
+        self._index = {}
+        # CRC -> path of the file in the read-only cache, used again when
+        # the copy in the read-write cache is removed
+        self._ro_index = {}
+        # Files in the read-write cache, the least recently used first
+        self._rw_entries = OrderedDict()
+        # Held while the index is changed, the log and param TOCs are
+        # fetched at the same time
+        self._index_lock = Lock()
+        self._max_entries = max_entries or self.MAX_ENTRIES
+        # URI -> CRCs of the last TOCs used, also saved in LAST_FILE
+        self._last = {}
+        self._last_lock = Lock()
+
         if (ro_cache):
-            self._cache_files += glob(ro_cache + "/*.json")
+            self._ro_index = self._add_dir(ro_cache)
         if (rw_cache):
-            self._cache_files += glob(rw_cache + "/*.json")
             if not os.path.exists(rw_cache):
                 os.makedirs(rw_cache)
+            self._add_dir(rw_cache, lru=True)
 
         self._rw_cache = rw_cache
 
+    def _add_dir(self, path, lru=False):
+        """Add the cache files in a directory to the index and return them
+        by CRC"""
+        try:
+            names = os.listdir(path)
+        except OSError:
+            return {}
+        entries = {}
+        for name in names:
+            base, ext = os.path.splitext(name)
+            if ext not in (".toc", ".json") or len(base) != 8:
+                continue
+            try:
+                crc = int(base, 16)
+            except ValueError:
+                continue
+            # Prefer the binary file if there is one of each
+            if ext == ".toc" or crc not in entries:
+                entries[crc] = os.path.join(path, name)
+        self._index.update(entries)
+
+        if lru:
+            found = []
+            for crc, filename in entries.iteritems():
+                if filename.endswith(".toc"):
+                    try:
+                        found.append((os.path.getmtime(filename), crc))
+                    except OSError:
+                        pass
+            for _, crc in sorted(found):
+                self._rw_entries[crc] = entries[crc]
+        return entries
+
     def fetch(self, crc):
         """ Try to get a hit in the cache, return None otherwise """
-        cache_data = None
-        pattern = "%08X.json" % crc
-        hit = None
+        with self._index_lock:
+            hit = self._index.get(crc)
+        if not hit:
+            return None
 
-        for name in self._cache_files:
-            if (name.endswith(pattern)):
-                hit = name
-
-        if (hit):
-            try:
-                cache = open(hit)
-                cache_data = json.load(cache,
-                                       object_hook=self._decoder)
-                cache.close()
-            except Exception as exp:
-                logger.warning("Error while parsing cache file [%s]:%s",
-                               hit, str(exp))
+        try:
+            if hit.endswith(".toc"):
+                cache_data = self._load(hit, crc)
+                self._touch(crc)
+            else:
+                cache_data = self._load_json(hit)
+                # Import the old format into the read-write cache
+                if self._rw_cache:
+                    self.insert(crc, cache_data)
+        except Exception as exp:
+            logger.warning("Error while parsing cache file [%s]:%s",
+                           hit, str(exp))
+            return None
 
         return cache_data
 
     def insert(self, crc, toc):
         """ Save a new cache to file """
         if self._rw_cache:
+            filename = os.path.join(self._rw_cache, "%08X.toc" % crc)
             try:
-                filename = "%s/%08X.json" % (self._rw_cache, crc)
-                cache = open(filename, 'w')
-                cache.write(json.dumps(toc, indent=2,
-                            default=self._encoder))
-                cache.close()
+                write_atomic(filename, self._encode(crc, toc))
                 logger.info("Saved cache to [%s]", filename)
-                self._cache_files += [filename]
             except Exception as exp:
                 logger.warning("Could not save cache to file [%s]: %s",
                                filename, str(exp))
+                return
+            with self._index_lock:
+                self._index[crc] = filename
+                self._rw_entries.pop(crc, None)
+                self._rw_entries[crc] = filename
+                self._prune()
         else:
             logger.warning("Could not save cache, no writable directory")
 
-    def _encoder(self, obj):
-        """ Encode a toc element leaf-node """
-        return {'__class__': obj.__class__.__name__,
-                'ident': obj.ident,
-                'group': obj.group,
-                'name': obj.name,
-                'ctype': obj.ctype,
-                'pytype': obj.pytype,
-                'access': obj.access}
-        raise TypeError(repr(obj) + ' is not JSON serializable')
+    def get_last(self, uri):
+        """
+        Return the CRCs of the last TOCs used with a URI as a dict with the
+        TOC names as keys, or None if they are not known.
+        """
+        if self._rw_cache:
+            # Other processes might have connected since the last time
+            self._last.update(self._read_last())
+        last = self._last.get(uri)
+        return dict(last) if last else None
+
+    def set_last(self, uri, crcs):
+        """
+        Save the CRCs of the TOCs used with a URI. The file is read again
+        and merged while it's locked, so the URIs saved by other processes
+        are kept.
+        """
+        crcs = dict(crcs)
+        if not self._rw_cache:
+            self._last[uri] = crcs
+            return
+        filename = os.path.join(self._rw_cache, LAST_FILE)
+        with self._last_lock:
+            try:
+                with self._lock_last():
+                    last = self._read_last()
+                    if last.get(uri) != crcs:
+                        last[uri] = crcs
+                        write_atomic(filename, json.dumps(last))
+                self._last.update(last)
+            except Exception as exp:
+                self._last[uri] = crcs
+                logger.warning("Could not save last TOCs to file [%s]: %s",
+                               filename, str(exp))
+
+    def _read_last(self):
+        """Return the CRCs saved in LAST_FILE, an empty dict if there are
+        none"""
+        try:
+            with open(os.path.join(self._rw_cache, LAST_FILE)) as f:
+                last = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        return last if isinstance(last, dict) else {}
+
+    @contextmanager
+    def _lock_last(self):
+        """Hold the lock of LAST_FILE shared with other processes"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self._rw_cache, LAST_LOCK_FILE), "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _touch(self, crc):
+        """Mark a TOC in the read-write cache as recently used"""
+        with self._index_lock:
+            filename = self._rw_entries.pop(crc, None)
+            if filename:
+                self._rw_entries[crc] = filename
+        if filename:
+            try:
+                # Keep the order for the next time the cache is opened
+                os.utime(filename, None)
+            except OSError:
+                pass
+
+    def _prune(self):
+        """Remove the least recently used TOCs above the size limit, called
+        with the index lock held"""
+        while len(self._rw_entries) > self._max_entries:
+            crc, filename = self._rw_entries.popitem(last=False)
+            if self._index.get(crc) == filename:
+                if crc in self._ro_index:
+                    # Still shipped with the client
+                    self._index[crc] = self._ro_index[crc]
+                else:
+                    del self._index[crc]
+            try:
+                os.remove(filename)
+                logger.info("Removed [%s] from cache", filename)
+            except OSError:
+                pass
+
+    def _encode(self, crc, toc):
+        """Encode a TOC to the binary format"""
+        elements = [e for group in toc.values() for e in group.values()]
+        data = [_HEADER.pack(MAGIC, VERSION, crc, len(elements))]
+        for elem in elements:
+            strs = "\0".join((elem.group, elem.name, elem.ctype,
+                              elem.pytype))
+            data.append(_ELEMENT.pack(_CLASSES.index(elem.__class__),
+                                      elem.ident, elem.access, len(strs)))
+            data.append(strs)
+        return "".join(data)
+
+    def _load(self, filename, crc):
+        """Read a TOC from a file in the binary format"""
+        with open(filename, "rb") as f:
+            data = f.read()
+        magic, version, file_crc, count = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or file_crc != crc:
+            raise ValueError("Not a TOC cache file for CRC %08X" % crc)
+
+        toc = {}
+        offset = _HEADER.size
+        unpack = _ELEMENT.unpack_from
+        for _ in xrange(count):
+            cls, ident, access, length = unpack(data, offset)
+            offset += _ELEMENT.size
+            group, name, ctype, pytype = data[offset:offset + length].split(
+                "\0")
+            offset += length
+            # All the attributes are set, so __init__ is not needed
+            elem = _CLASSES[cls].__new__(_CLASSES[cls])
+            elem.ident = ident
+            elem.access = access
+            elem.group = intern(group)
+            elem.name = intern(name)
+            elem.ctype = ctype
+            elem.pytype = pytype
+            try:
+                toc[elem.group][elem.name] = elem
+            except KeyError:
+                toc[elem.group] = {elem.name: elem}
+        return toc
+
+    def _load_json(self, filename):
+        """Read a TOC from a file in the old JSON format"""
+        with open(filename) as cache:
+            data = json.load(cache, object_hook=self._decoder)
+        # The keys are unicode, use the interned names of the elements
+        toc = {}
+        for elements in data.itervalues():
+            for elem in elements.itervalues():
+                try:
+                    toc[elem.group][elem.name] = elem
+                except KeyError:
+                    toc[elem.group] = {elem.name: elem}
+        return toc
 
     def _decoder(self, obj):
         """ Decode a toc element leaf-node """
         if '__class__' in obj:
-            elem = eval(obj['__class__'])()
+            elem = _CLASS_NAMES[obj['__class__']]()
             elem.ident = obj['ident']
-            elem.group = str(obj['group'])
-            elem.name = str(obj['name'])
+            elem.group = intern(str(obj['group']))
+            elem.name = intern(str(obj['name']))
             elem.ctype = str(obj['ctype'])
             elem.pytype = str(obj['pytype'])
             elem.access = obj['access']
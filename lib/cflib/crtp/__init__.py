@@ -35,7 +35,11 @@ __all__ = []
 import logging
 logger = logging.getLogger(__name__)
 
-from .radiodriver import RadioDriver
+import threading
+import time
+import Queue
+
+from .radiodriver import RadioDriver, set_scan_cache
 from .udpdriver import UdpDriver
 from .serialdriver import SerialDriver
 from .debugdriver import DebugDriver
@@ -45,8 +49,11 @@ DRIVERS = [RadioDriver, SerialDriver, UdpDriver, DebugDriver]
 INSTANCES = []
 
 
-def init_drivers(enable_debug_driver=False):
-    """Initialize all the drivers."""
+def init_drivers(enable_debug_driver=False, scan_cache=None):
+    """Initialize all the drivers. If scan_cache is a file name the links
+    found by scans are saved to it and probed first by the next scans."""
+    if scan_cache:
+        set_scan_cache(scan_cache)
     for driver in DRIVERS:
         try:
             if driver != DebugDriver or enable_debug_driver:
@@ -55,18 +62,59 @@ def init_drivers(enable_debug_driver=False):
             continue
 
 
-def scan_interfaces():
-    """ Scan all the interfaces for available Crazyflies """
+def scan_interfaces(found_cb=None):
+    """ Scan all the interfaces for available Crazyflies. The interfaces are
+    scanned in parallel and found_cb([uri, description]) is called for each
+    Crazyflie as soon as it is found. """
     available = []
-    found = []
-    for instance in INSTANCES:
+    for found in scan_interfaces_iter():
+        available.append(found)
+        if found_cb:
+            found_cb(found)
+    return available
+
+
+def scan_interfaces_iter():
+    """ Scan all the interfaces in parallel and yield [uri, description] for
+    each Crazyflie as soon as it is found. Closing the generator early stops
+    the scan. """
+    start_time = time.time()
+    results = Queue.Queue()
+    stop = threading.Event()
+    errors = []
+    done = object()
+
+    def scan(instance):
         logger.debug("Scanning: %s", instance)
         try:
-            found = instance.scan_interface()
-            available += found
-        except Exception:
-            raise
-    return available
+            instance.scan_interface_stream(results.put, stop)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            results.put(done)
+
+    for instance in INSTANCES:
+        thread = threading.Thread(target=scan, args=(instance,))
+        thread.daemon = True
+        thread.start()
+
+    running = len(INSTANCES)
+    count = 0
+    try:
+        while running > 0:
+            found = results.get()
+            if found is done:
+                running -= 1
+            else:
+                count += 1
+                yield found
+    finally:
+        stop.set()
+
+    logger.info("Scan found %d Crazyflies in %.3fs", count,
+                time.time() - start_time)
+    if errors:
+        raise errors[0]
 
 
 def get_interfaces_status():
@@ -86,6 +134,10 @@ def get_link_driver(uri, link_quality_callback=None, link_error_callback=None):
     driver."""
     for instance in INSTANCES:
         try:
+            if isinstance(instance, RadioDriver):
+                # Several radio links can be open at the same time (sharing
+                # the dongles), so each link gets its own driver
+                instance = RadioDriver()
             instance.connect(uri, link_quality_callback, link_error_callback)
             return instance
         except WrongUriType:
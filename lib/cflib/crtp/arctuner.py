@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Auto-retransmit tuning for the Crazyradio.
+
+The radio resends a packet up to ARC times, waiting ARD between the tries,
+until it is acked. A high ARC delivers more packets on a bad link but an
+old setpoint can then hold the link for a long time, and a long ARD makes
+every retry slower. The tuner adjusts both once per statistics window: it
+keeps the delivery ratio above a target and, when the target is met, lowers
+ARC towards the retries actually needed and probes shorter ARDs, keeping
+them only if the measured transaction time improves.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['RetransmitTuner', 'parse_arc', 'parse_ard']
+
+import re
+
+import logging
+logger = logging.getLogger(__name__)
+
+AUTO = "auto"
+
+
+def parse_arc(value):
+    """Parse an ARC setting: a number of retries (0-15) or "auto" """
+    if value == AUTO:
+        return AUTO
+    arc = int(value)
+    if arc < 0 or arc > 15:
+        raise ValueError("ARC shall be between 0 and 15")
+    return arc
+
+
+def parse_ard(value):
+    """
+    Parse an ARD setting: "auto", <n>b to wait for an ack with n bytes of
+    payload or <n>us to wait n microseconds. Returns "auto" or a tuple
+    ("b"|"us", n).
+    """
+    if value == AUTO:
+        return AUTO
+    if type(value) == tuple:
+        return value
+    ard = re.match("^([0-9]+)(b|us)$", str(value))
+    if not ard:
+        raise ValueError("ARD shall be auto, <bytes>b or <microseconds>us")
+    return (ard.group(2), int(ard.group(1)))
+
+
+class RetransmitTuner(object):
+    """
+    Adjusts ARC and ARD from the link statistics. Values passed as fixed
+    are never changed.
+    """
+
+    ARC_MIN = 3
+    ARC_MAX = 15
+    # Retries kept above the ones needed by 99% of the packets
+    ARC_MARGIN = 2
+    # ARD steps tried, in bytes of ack payload to wait for
+    ARD_STEPS = (0, 8, 16, 32)
+    # Transactions needed in a window before changing anything
+    MIN_TRANSACTIONS = 50
+    # Windows between two attempts to shorten the ARD
+    PROBE_INTERVAL = 10
+    # A shorter ARD is kept unless transactions get this much slower
+    PROBE_TOLERANCE = 1.05
+
+    def __init__(self, name, arc=AUTO, ard=AUTO, target_delivery=0.99):
+        """
+        @param name Name of the link, used in the log messages
+        @param arc Fixed ARC or "auto" to tune it
+        @param ard Fixed ARD (see parse_ard) or "auto" to tune it
+        @param target_delivery Ratio of the packets that shall be acked
+        """
+        self.name = name
+        self.target_delivery = target_delivery
+        self.tune_arc = arc == AUTO
+        self.tune_ard = ard == AUTO
+        self.arc = 10 if self.tune_arc else arc
+        self.ard = ("b", 32) if self.tune_ard else ard
+        self._next_update = 0
+        self._windows = 0
+        # (previous ARD, transaction time with it) while probing
+        self._probe = None
+
+    def is_active(self):
+        """Return True if anything is tuned"""
+        return self.tune_arc or self.tune_ard
+
+    def update_due(self, now, window):
+        """Return True once per statistics window"""
+        if now >= self._next_update:
+            self._next_update = now + window
+            return True
+        return False
+
+    def _set_arc(self, arc, reason):
+        logger.info("%s: ARC %d -> %d (%s)", self.name, self.arc, arc, reason)
+        self.arc = arc
+
+    def _set_ard(self, ard, reason):
+        logger.info("%s: ARD %d%s -> %d%s (%s)", self.name, self.ard[1],
+                    self.ard[0], ard[1], ard[0], reason)
+        self.ard = ard
+
+    def _retry_percentile(self, histogram, ratio):
+        """Return the retries needed by ratio of the transactions"""
+        total = sum(histogram)
+        needed = total * ratio
+        count = 0
+        for (retry, n) in enumerate(histogram):
+            count += n
+            if count >= needed:
+                return retry
+        return len(histogram) - 1
+
+    def _ard_step(self, direction):
+        """Return the next ARD step in direction (-1 or 1), or None"""
+        steps = self.ARD_STEPS
+        current = self.ard[1] if self.ard[0] == "b" else steps[-1]
+        if direction < 0:
+            lower = [s for s in steps if s < current]
+            return ("b", lower[-1]) if lower else None
+        higher = [s for s in steps if s > current]
+        return ("b", higher[0]) if higher else None
+
+    def update(self, stats):
+        """
+        Look at the statistics of the last window and change ARC/ARD if
+        needed. Returns True if something was changed.
+        """
+        if stats["transactions"] < self.MIN_TRANSACTIONS:
+            return False
+        self._windows += 1
+        delivery = stats["ack_rate"]
+        time = stats["transaction_time"]
+
+        if self._probe:
+            (previous, previous_time) = self._probe
+            self._probe = None
+            if (delivery < self.target_delivery or
+                    time > previous_time * self.PROBE_TOLERANCE):
+                self._set_ard(previous, "shorter ARD did not help, %.2fms"
+                              " per transaction instead of %.2fms" %
+                              (time * 1000, previous_time * 1000))
+                return True
+
+        if delivery < self.target_delivery:
+            reason = "delivery %.3f below %.3f" % (delivery,
+                                                   self.target_delivery)
+            if self.tune_arc and self.arc < self.ARC_MAX:
+                self._set_arc(min(self.arc + 2, self.ARC_MAX), reason)
+                return True
+            ard = self._ard_step(1)
+            if self.tune_ard and ard:
+                self._set_ard(ard, reason)
+                return True
+            return False
+
+        if self.tune_arc:
+            retries = self._retry_percentile(stats["retry_histogram"], 0.99)
+            if max(retries + self.ARC_MARGIN, self.ARC_MIN) < self.arc:
+                self._set_arc(self.arc - 1, "99%% of the packets need %d"
+                              " retries or less" % retries)
+                return True
+
+        if self.tune_ard and self._windows % self.PROBE_INTERVAL == 0:
+            ard = self._ard_step(-1)
+            if ard:
+                self._probe = (self.ard, time)
+                self._set_ard(ard, "probing, %.2fms per transaction" %
+                              (time * 1000))
+                return True
+        return False
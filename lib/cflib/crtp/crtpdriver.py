@@ -57,6 +57,17 @@ class CRTPDriver:
     def send_packet(self, pk):
         """Send a CRTP packet"""
 
+    def try_send_packet(self, pk):
+        """Send a CRTP packet without blocking. Returns False if the packet
+        could not be queued because the send queue is full. Drivers without
+        a send queue send the packet directly."""
+        self.send_packet(pk)
+        return True
+
+    def get_send_queue_level(self):
+        """Return how full the send queue is, from 0.0 to 1.0"""
+        return 0.0
+
     def receive_packet(self, wait=0):
         """Receive a CRTP packet.
 
@@ -65,6 +76,22 @@ class CRTPDriver:
         @return One CRTP packet or None if no packet has been received.
         """
 
+    def set_link_activity(self, logging_active, replies_pending):
+        """Hint about the data expected from the copter. Drivers that have
+        to poll the copter can use this to poll faster when data is expected.
+
+        @param logging_active True if at least one log block is started
+        @param replies_pending Number of packets waiting for a reply
+        """
+
+    def get_link_stats(self):
+        """
+        Return a dict with the statistics of the link (see
+        cflib.crtp.linkstats.LinkStatistics.get_stats), empty if the driver
+        does not keep statistics.
+        """
+        return {}
+
     def get_status(self):
         """
         Return a status string from the interface.
@@ -81,6 +108,18 @@ class CRTPDriver:
         witha them.
         """
 
+    def scan_interface_stream(self, found_cb, stop=None):
+        """
+        Scan interface for available Crazyflie quadcopters and call
+        found_cb([uri, description]) for each one as soon as it is found.
+        Drivers that can report results early override this.
+
+        @param found_cb Callback called for each Crazyflie found
+        @param stop threading.Event that ends the scan early when set
+        """
+        for found in self.scan_interface():
+            found_cb(found)
+
     def enum(self):
         """Enumerate, and return a list, of the available link URI on this
         system
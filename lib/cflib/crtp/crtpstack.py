@@ -53,21 +53,32 @@ class CRTPPort:
 class CRTPPacket(object):
     """
     A packet that can be sent via the CRTP.
+
+    The payload is stored as an immutable string and the tuple/list views of
+    it are only built the first time they are accessed. Since a packet is
+    created for every message in both directions the class uses __slots__ to
+    keep allocation cheap.
     """
 
+    __slots__ = ('header', '_port', '_channel', '_data', '_datat')
+
     def __init__(self, header=0, data=None):
         """
         Create an empty packet with default values.
         """
-        self.size = 0
-        self._data = ""
         # The two bits in position 3 and 4 needs to be set for legacy
         # support of the bootloader
         self.header = header | 0x3 << 2
         self._port = (header & 0xF0) >> 4
         self._channel = header & 0x03
-        if data:
+        if type(data) == str:
+            self._data = data
+            self._datat = None
+        elif data:
             self._set_data(data)
+        else:
+            self._data = ""
+            self._datat = ()
 
     def _get_channel(self):
         """Get the packet channel"""
@@ -89,7 +100,6 @@ class CRTPPacket(object):
 
     def get_header(self):
         """Get the header"""
-        self._update_header()
         return self.header
 
     def set_header(self, port, channel):
@@ -97,7 +107,7 @@ class CRTPPacket(object):
         Set the port and channel for this packet.
         """
         self._port = port
-        self.channel = channel
+        self._channel = channel
         self._update_header()
 
     def _update_header(self):
@@ -105,7 +115,11 @@ class CRTPPacket(object):
         # The two bits in position 3 and 4 needs to be set for legacy
         # support of the bootloader
         self.header = ((self._port & 0x0f) << 4 | 3 << 2 |
-                       (self.channel & 0x03))
+                       (self._channel & 0x03))
+
+    def _get_size(self):
+        """Get the size of the payload"""
+        return len(self._data)
 
     #Some python madness to access different format of the data
     def _get_data(self):
@@ -116,27 +130,29 @@ class CRTPPacket(object):
         """Set the packet data"""
         if type(data) == str:
             self._data = data
-        elif type(data) == list or type(data) == tuple:
-            if len(data) == 1:
-                self._data = struct.pack("B", data[0])
-            elif len(data) > 1:
-                self._data = struct.pack("B" * len(data), *data)
-            else:
-                self._data = ""
+            self._datat = None
+        elif type(data) == tuple:
+            self._data = struct.pack("B" * len(data), *data)
+            self._datat = data
+        elif type(data) == list:
+            self._data = struct.pack("B" * len(data), *data)
+            self._datat = tuple(data)
         else:
             raise Exception("Data shall be of str, tupple or list type")
 
     def _get_data_l(self):
-        """Get the data in the packet as a list"""
+        """Get the data in the packet as a new list"""
         return list(self._get_data_t())
 
     def _get_data_t(self):
         """Get the data in the packet as a tuple"""
-        return struct.unpack("B" * len(self._data), self._data)
+        if self._datat is None:
+            self._datat = struct.unpack("B" * len(self._data), self._data)
+        return self._datat
 
     def __str__(self):
         """Get a string representation of the packet"""
-        return "{}:{} {}".format(self._port, self.channel, self.datat)
+        return "{}:{} {}".format(self._port, self._channel, self.datat)
 
     data = property(_get_data, _set_data)
     datal = property(_get_data_l, _set_data)
@@ -144,3 +160,4 @@ class CRTPPacket(object):
     datas = property(_get_data, _set_data)
     port = property(_get_port, _set_port)
     channel = property(_get_channel, _set_channel)
+    size = property(_get_size)
@@ -51,6 +51,7 @@ import struct
 from datetime import datetime
 from cflib.crazyflie.log import LogTocElement
 from cflib.crazyflie.param import ParamTocElement
+from cflib.utils.scheduler import get_scheduler
 import random
 import string
 import errno
@@ -281,6 +282,13 @@ class DebugDriver (CRTPDriver):
         self._packet_handler.linkErrorCallback = linkErrorCallback
         self._packet_handler.linkQualityCallback = linkQualityCallback
 
+        # Drop answers left over from a previous connection
+        while not self.queue.empty():
+            try:
+                self.queue.get(False)
+            except Queue.Empty:
+                break
+
         # Debug-options for this driver that
         # is set by using different connection URIs
         self._packet_handler.inhibitAnswers = False
@@ -631,8 +639,11 @@ class _PacketHandlingThread(Thread):
             # Calculate a delay between 0ms and 250ms
             delay = random.randint(0, 250)/1000.0
             logger.debug("Delaying answer %.2fms", delay*1000)
-            time.sleep(delay)
-        self.queue.put(pk)
+            # The delay is latency on the link, so the following requests
+            # are still handled while this answer is on its way
+            get_scheduler().schedule(delay, self.queue.put, pk)
+        else:
+            self.queue.put(pk)
 
 class _FakeLoggingDataThread (Thread):
     """Thread that will send back fake logging data via CRTP"""
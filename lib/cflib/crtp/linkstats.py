@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Rolling statistics of a link, aggregated over a time window.
+
+Drivers record every transaction with the copter and publish the link
+quality at a bounded rate instead of once per transaction. The full
+statistics can be pulled at any time with get_stats().
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['LinkStatistics']
+
+import collections
+import time
+
+# Index of the counters in a bucket
+_TRANSACTIONS = 0
+_ACKED = 1
+_EMPTY_ACKS = 2
+_DATA_ACKS = 3
+_UP_PACKETS = 4
+_UP_BYTES = 5
+_DOWN_PACKETS = 6
+_DOWN_BYTES = 7
+_USB_TIME = 8
+_QUALITY = 9
+_RETRY = 10
+# The retry count of the Crazyradio is 4 bits
+_RETRY_SLOTS = 16
+
+
+class LinkStatistics(object):
+    """
+    Statistics over the last window seconds. The window is split in BUCKETS
+    buckets so it rolls smoothly instead of restarting from zero.
+    """
+
+    BUCKETS = 10
+
+    def __init__(self, window=1.0, publish_rate=10.0):
+        """
+        @param window Time in seconds the statistics are computed over
+        @param publish_rate Maximum number of times per second publish_due()
+               returns True
+        """
+        self._buckets = collections.deque()
+        self._bucket = None
+        self._bucket_end = 0
+        self._next_publish = 0
+        self.set_window(window)
+        self.set_publish_rate(publish_rate)
+
+    def set_window(self, window):
+        """Set the time in seconds the statistics are computed over"""
+        self.window = float(window)
+        self._bucket_length = self.window / self.BUCKETS
+
+    def set_publish_rate(self, publish_rate):
+        """Set the maximum rate in Hz of publish_due() returning True"""
+        self._publish_interval = 1.0 / publish_rate
+
+    def _new_bucket(self, now):
+        self._bucket = [0] * (_RETRY + _RETRY_SLOTS)
+        self._bucket_end = now + self._bucket_length
+        self._buckets.append((now, self._bucket))
+        limit = now - self.window
+        while self._buckets[0][0] < limit:
+            self._buckets.popleft()
+
+    def transaction(self, now, sent, acked, retry, received, usb_time):
+        """
+        Record a transaction with the copter.
+
+        @param now Time when the transaction was done
+        @param sent Number of bytes sent, 1 for a null packet
+        @param acked True if the packet was acked by the copter
+        @param retry Number of retries needed
+        @param received Number of bytes in the ack
+        @param usb_time Time in seconds spent in the USB call
+        """
+        if now >= self._bucket_end:
+            self._new_bucket(now)
+        bucket = self._bucket
+        bucket[_TRANSACTIONS] += 1
+        bucket[_USB_TIME] += usb_time
+        bucket[_RETRY + min(retry, _RETRY_SLOTS - 1)] += 1
+        if not acked:
+            return
+        bucket[_ACKED] += 1
+        bucket[_QUALITY] += max(0, (10 - retry) * 10)
+        if sent > 1:
+            bucket[_UP_PACKETS] += 1
+            bucket[_UP_BYTES] += sent
+        if received > 0:
+            bucket[_DATA_ACKS] += 1
+            bucket[_DOWN_PACKETS] += 1
+            bucket[_DOWN_BYTES] += received
+        else:
+            bucket[_EMPTY_ACKS] += 1
+
+    def publish_due(self, now):
+        """Return True if it is time to publish the statistics again"""
+        if now >= self._next_publish:
+            self._next_publish = now + self._publish_interval
+            return True
+        return False
+
+    def get_link_quality(self, now=None):
+        """Return the link quality in percent over the window"""
+        if now is None:
+            now = time.time()
+        limit = now - self.window
+        transactions = 0
+        quality = 0
+        for (start, bucket) in list(self._buckets):
+            if start >= limit:
+                transactions += bucket[_TRANSACTIONS]
+                quality += bucket[_QUALITY]
+        if transactions == 0:
+            return 0
+        return quality / transactions
+
+    def get_stats(self, now=None):
+        """
+        Return a dict with the statistics over the window: ack rate, retry
+        histogram (list indexed by the retry count), empty and data acks,
+        uplink/downlink packets and bytes per second, the fraction of the
+        time spent in USB calls, the mean time of a transaction and the link
+        quality in percent.
+        """
+        if now is None:
+            now = time.time()
+        limit = now - self.window
+        total = [0] * (_RETRY + _RETRY_SLOTS)
+        first = now
+        for (start, bucket) in list(self._buckets):
+            if start >= limit:
+                first = min(first, start)
+                for i in range(len(total)):
+                    total[i] += bucket[i]
+        elapsed = max(now - first, self._bucket_length)
+        transactions = total[_TRANSACTIONS]
+
+        stats = {"window": self.window,
+                 "transactions": transactions,
+                 "ack_rate": 0.0,
+                 "retry_histogram": total[_RETRY:],
+                 "empty_acks": total[_EMPTY_ACKS],
+                 "data_acks": total[_DATA_ACKS],
+                 "uplink_packets_per_s": total[_UP_PACKETS] / elapsed,
+                 "uplink_bytes_per_s": total[_UP_BYTES] / elapsed,
+                 "downlink_packets_per_s": total[_DOWN_PACKETS] / elapsed,
+                 "downlink_bytes_per_s": total[_DOWN_BYTES] / elapsed,
+                 "usb_time": total[_USB_TIME] / elapsed,
+                 "transaction_time": 0.0,
+                 "link_quality": 0}
+        if transactions > 0:
+            stats["ack_rate"] = total[_ACKED] / float(transactions)
+            stats["transaction_time"] = total[_USB_TIME] / transactions
+            stats["link_quality"] = total[_QUALITY] / transactions
+        return stats
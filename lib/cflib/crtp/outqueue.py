@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Outgoing packet queue used by link drivers.
+
+Packets are sorted in three classes that are scheduled differently:
+  commander - Setpoints (port 3). Only the latest setpoint is kept (a newer
+              setpoint replaces one that has not been sent yet) and it is
+              sent before anything else.
+  control   - Param, log and link control traffic. Guaranteed a share of the
+              link even when setpoints are sent continuously.
+  bulk      - Everything else, for instance the bootloader. Each port can
+              optionally be rate limited with a token bucket.
+
+The queue has the same put/get interface as Queue.Queue and raises
+Queue.Full/Queue.Empty in the same way, so it can be used as a drop-in
+replacement for the driver out queues.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['OutgoingPacketQueue']
+
+import collections
+import threading
+import time
+import Queue
+
+from .crtpstack import CRTPPort
+
+COMMANDER = "commander"
+CONTROL = "control"
+BULK = "bulk"
+
+# Ports that are not listed here are handled as bulk traffic
+PORT_CLASSES = {CRTPPort.COMMANDER: COMMANDER,
+                CRTPPort.PARAM: CONTROL,
+                CRTPPort.LOGGING: CONTROL,
+                CRTPPort.LINKCTRL: CONTROL}
+
+
+class _TokenBucket(object):
+    """Token bucket limiting the packet rate of a port"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(max(burst, 1))
+        self._tokens = self.burst
+        self._last = time.time()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst,
+                           self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def take(self, now):
+        """Take a token, return False if there is none available"""
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def time_to_token(self, now):
+        """Return the time in seconds until a token is available"""
+        self._refill(now)
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+
+class OutgoingPacketQueue(object):
+    """
+    Multi-class queue for outgoing packets, see the module documentation.
+    """
+
+    def __init__(self, maxsize=50, control_share=2):
+        """
+        maxsize is the maximum number of queued packets for the control and
+        bulk class each. When setpoints are sent continuously the control
+        class is guaranteed to be served at least once every control_share+1
+        packets.
+        """
+        self.maxsize = maxsize
+        self.control_share = control_share
+        self._cond = threading.Condition(threading.Lock())
+
+        self._setpoint = None
+        self._control = collections.deque()
+        self._bulk = {}
+        self._bulk_size = 0
+        self._bulk_ports = collections.deque()
+        self._rate_limits = {}
+        self._control_starved = 0
+
+        self._sent = {COMMANDER: 0, CONTROL: 0, BULK: 0}
+        self._dropped = {COMMANDER: 0, CONTROL: 0, BULK: 0}
+
+        # Event set every time a packet is queued, used by drivers serving
+        # several queues from one thread
+        self.wakeup = None
+
+    def set_rate_limit(self, port, rate, burst=1):
+        """
+        Limit the number of packets per second sent on a port handled as bulk
+        traffic. A rate of None removes the limit.
+        """
+        with self._cond:
+            if rate is None:
+                self._rate_limits.pop(port, None)
+            else:
+                self._rate_limits[port] = _TokenBucket(rate, burst)
+            self._cond.notify_all()
+
+    def _class_size(self, cls):
+        if cls == CONTROL:
+            return len(self._control)
+        if cls == BULK:
+            return self._bulk_size
+        return 1 if self._setpoint is not None else 0
+
+    def put(self, pk, block=True, timeout=None):
+        """
+        Queue a packet. Setpoints never block, a pending setpoint is replaced
+        by the new one. For the other classes the call blocks while the class
+        is full (see Queue.Queue.put) and raises Queue.Full if no room is
+        made in time. Every time this happens it is counted as a drop.
+        """
+        cls = PORT_CLASSES.get(pk.port, BULK)
+        with self._cond:
+            if cls == COMMANDER:
+                if self._setpoint is not None:
+                    self._dropped[COMMANDER] += 1
+                self._setpoint = pk
+                self._cond.notify_all()
+                if self.wakeup:
+                    self.wakeup.set()
+                return
+
+            if self._class_size(cls) >= self.maxsize:
+                if not block:
+                    self._dropped[cls] += 1
+                    raise Queue.Full
+                endtime = None
+                if timeout is not None:
+                    endtime = time.time() + timeout
+                while self._class_size(cls) >= self.maxsize:
+                    if endtime is None:
+                        self._cond.wait()
+                    else:
+                        remaining = endtime - time.time()
+                        if remaining <= 0.0:
+                            self._dropped[cls] += 1
+                            raise Queue.Full
+                        self._cond.wait(remaining)
+
+            if cls == CONTROL:
+                self._control.append(pk)
+            else:
+                if pk.port not in self._bulk:
+                    self._bulk[pk.port] = collections.deque()
+                    self._bulk_ports.append(pk.port)
+                self._bulk[pk.port].append(pk)
+                self._bulk_size += 1
+            self._cond.notify_all()
+            if self.wakeup:
+                self.wakeup.set()
+
+    def _pop(self, now):
+        """
+        Return the next packet to send and the time to wait before trying
+        again if no packet can be sent now (None means until a new packet is
+        queued).
+        """
+        if self._setpoint is not None and (
+                not self._control or
+                self._control_starved < self.control_share):
+            pk = self._setpoint
+            self._setpoint = None
+            if self._control:
+                self._control_starved += 1
+            self._sent[COMMANDER] += 1
+            return (pk, None)
+
+        if self._control:
+            self._control_starved = 0
+            self._sent[CONTROL] += 1
+            return (self._control.popleft(), None)
+
+        retry = None
+        for _ in range(len(self._bulk_ports)):
+            port = self._bulk_ports[0]
+            self._bulk_ports.rotate(-1)
+            queue = self._bulk[port]
+            if not queue:
+                continue
+            bucket = self._rate_limits.get(port)
+            if bucket is None or bucket.take(now):
+                self._bulk_size -= 1
+                self._sent[BULK] += 1
+                return (queue.popleft(), None)
+            wait = bucket.time_to_token(now)
+            if retry is None or wait < retry:
+                retry = wait
+        return (None, retry)
+
+    def get(self, block=True, timeout=None):
+        """
+        Remove and return the next packet to send. Raises Queue.Empty if no
+        packet can be sent within the timeout (see Queue.Queue.get).
+        """
+        with self._cond:
+            endtime = None
+            if block and timeout is not None:
+                endtime = time.time() + timeout
+            while True:
+                now = time.time()
+                (pk, retry) = self._pop(now)
+                if pk is not None:
+                    self._cond.notify_all()
+                    return pk
+                if not block:
+                    raise Queue.Empty
+                wait = retry
+                if endtime is not None:
+                    remaining = endtime - now
+                    if remaining <= 0.0:
+                        raise Queue.Empty
+                    if wait is None or remaining < wait:
+                        wait = remaining
+                self._cond.wait(wait)
+
+    def next_send_time(self, now=None):
+        """
+        Return the time when the next packet can be sent, now if one can be
+        sent right away, or None if no packets are queued. Rate limited bulk
+        packets can be sent when their port gets a token.
+        """
+        if now is None:
+            now = time.time()
+        with self._cond:
+            if self._setpoint is not None or self._control:
+                return now
+            next_time = None
+            for port, queue in self._bulk.iteritems():
+                if not queue:
+                    continue
+                bucket = self._rate_limits.get(port)
+                if bucket is None:
+                    return now
+                send_time = now + bucket.time_to_token(now)
+                if next_time is None or send_time < next_time:
+                    next_time = send_time
+            return next_time
+
+    def qsize(self):
+        """Return the total number of queued packets"""
+        with self._cond:
+            return (self._class_size(COMMANDER) + len(self._control) +
+                    self._bulk_size)
+
+    def empty(self):
+        """Return True if no packets are queued"""
+        return self.qsize() == 0
+
+    def full(self):
+        """Return True if the control or bulk class is full"""
+        with self._cond:
+            return (len(self._control) >= self.maxsize or
+                    self._bulk_size >= self.maxsize)
+
+    def fill_level(self):
+        """Return how full the fullest of the control and bulk classes is,
+        from 0.0 (empty) to 1.0 (full)"""
+        with self._cond:
+            return float(max(len(self._control),
+                             self._bulk_size)) / self.maxsize
+
+    def get_stats(self):
+        """
+        Return the queue depth and the number of sent and dropped packets
+        for each class. Dropped setpoints are the ones that were replaced by
+        a newer setpoint before being sent.
+        """
+        with self._cond:
+            stats = {}
+            for cls in (COMMANDER, CONTROL, BULK):
+                stats[cls] = {"depth": self._class_size(cls),
+                              "sent": self._sent[cls],
+                              "dropped": self._dropped[cls]}
+            return stats
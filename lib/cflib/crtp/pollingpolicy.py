@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Polling policies for link drivers that have to poll the Crazyflie for data.
+
+The Crazyradio can only receive data from the Crazyflie in the ack of a packet
+sent to it. When there is nothing to send the driver sends null packets to
+poll the copter and the policy decides how long to wait for outgoing data
+before sending the next one. Polling fast gives low downlink latency but costs
+CPU and USB bandwidth.
+
+The Crazyflie object tells the driver when log blocks are started or replies
+are outstanding (see CRTPDriver.set_link_activity) and the policy then
+polls faster.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['PollingPolicy', 'LowLatencyPolicy', 'BalancedPolicy',
+           'LowCpuPolicy', 'POLLING_POLICIES', 'get_polling_policy']
+
+import time
+
+
+class PollingPolicy(object):
+    """
+    Base class for polling policies. A policy waits IDLE_WAIT seconds for
+    outgoing data before polling once EMPTY_BEFORE_RELAX empty acks have been
+    received in a row. While data is expected from the copter ACTIVE_WAIT is
+    used instead.
+    """
+
+    NAME = "custom"
+    EMPTY_BEFORE_RELAX = 10
+    IDLE_WAIT = 0.01
+    ACTIVE_WAIT = 0.0
+    # Time in seconds over which the statistics are measured
+    STATS_WINDOW = 1.0
+
+    def __init__(self):
+        """Create the policy"""
+        self.logging_active = False
+        self.replies_pending = 0
+        self._empty_ctr = 0
+
+        self._window_start = time.time()
+        self._polls = 0
+        self._wait_sum = 0.0
+        self._wait_max = 0.0
+        self._stats = {"poll_rate": 0.0,
+                       "added_latency": 0.0,
+                       "max_added_latency": 0.0}
+
+    def set_link_activity(self, logging_active, replies_pending):
+        """Update what kind of downlink traffic is expected"""
+        self.logging_active = logging_active
+        self.replies_pending = replies_pending
+
+    def is_active(self):
+        """Return True if data is expected from the copter"""
+        return self.logging_active or self.replies_pending > 0
+
+    def get_wait_time(self, got_data):
+        """
+        Return the time in seconds to wait for an outgoing packet before
+        polling again. got_data is True if the last ack contained data.
+        """
+        if got_data:
+            self._empty_ctr = 0
+            return 0
+
+        if self._empty_ctr < self.EMPTY_BEFORE_RELAX:
+            self._empty_ctr += 1
+            return 0
+
+        if self.is_active():
+            return self.ACTIVE_WAIT
+        return self.IDLE_WAIT
+
+    def poll_sent(self, waited):
+        """
+        Record that a packet has been sent to the copter. waited is the time
+        in seconds that was spent waiting since the last ack, which is the
+        latency added to the downlink by the policy.
+        """
+        self._polls += 1
+        self._wait_sum += waited
+        if waited > self._wait_max:
+            self._wait_max = waited
+
+        now = time.time()
+        elapsed = now - self._window_start
+        if elapsed >= self.STATS_WINDOW:
+            self._stats = {"poll_rate": self._polls / elapsed,
+                           "added_latency": self._wait_sum / self._polls,
+                           "max_added_latency": self._wait_max}
+            self._window_start = now
+            self._polls = 0
+            self._wait_sum = 0.0
+            self._wait_max = 0.0
+
+    def get_stats(self):
+        """
+        Return the statistics of the last measurement window as a dict with
+        the poll rate in Hz and the mean/max added downlink latency in
+        seconds.
+        """
+        stats = dict(self._stats)
+        stats["policy"] = self.NAME
+        stats["active"] = self.is_active()
+        return stats
+
+
+class LowLatencyPolicy(PollingPolicy):
+    """Poll without waiting while data is expected and wait at most 1ms for
+    outgoing data when idle, so 1000Hz plus the USB round trip when idle"""
+    NAME = "lowlatency"
+    IDLE_WAIT = 0.001
+    ACTIVE_WAIT = 0.0
+
+
+class BalancedPolicy(PollingPolicy):
+    """Relax to 100Hz when idle but poll fast when data is expected"""
+    NAME = "balanced"
+    IDLE_WAIT = 0.01
+    ACTIVE_WAIT = 0.002
+
+
+class LowCpuPolicy(PollingPolicy):
+    """Relax quickly and poll slowly, for many links or slow computers"""
+    NAME = "lowcpu"
+    EMPTY_BEFORE_RELAX = 2
+    IDLE_WAIT = 0.05
+    ACTIVE_WAIT = 0.01
+
+
+POLLING_POLICIES = {LowLatencyPolicy.NAME: LowLatencyPolicy,
+                    BalancedPolicy.NAME: BalancedPolicy,
+                    LowCpuPolicy.NAME: LowCpuPolicy}
+
+
+def get_polling_policy(policy):
+    """
+    Return a polling policy instance. policy can be the name of one of the
+    built in policies, a PollingPolicy class or an instance.
+    """
+    if isinstance(policy, PollingPolicy):
+        return policy
+    if isinstance(policy, type) and issubclass(policy, PollingPolicy):
+        return policy()
+    try:
+        return POLLING_POLICIES[policy]()
+    except KeyError:
+        raise KeyError("Polling policy [%s] not found, available policies are"
+                       " %s" % (policy, ", ".join(POLLING_POLICIES.keys())))
@@ -31,10 +31,19 @@ Crazyradio CRTP link driver.
 
 This driver is used to communicate with the Crazyflie using the Crazyradio
 USB dongle.
+
+All the links opened on the same dongle share it. One thread per dongle
+serves the links in turn, reconfiguring the channel, datarate and address
+of the radio only when they differ from the previous link. This makes it
+possible to fly several Crazyflies with one dongle.
+
+All the attached dongles are handled as a pool. Links opened with * as
+dongle number (i.e radio://*/80/2M) are placed on the least loaded dongle
+and moved to another dongle if their dongle stops working.
 """
 
 __author__ = 'Bitcraze AB'
-__all__ = ['RadioDriver']
+__all__ = ['RadioDriver', 'set_scan_cache']
 
 import logging
 logger = logging.getLogger(__name__)
@@ -42,12 +51,17 @@ logger = logging.getLogger(__name__)
 from cflib.crtp.crtpdriver import CRTPDriver
 from .crtpstack import CRTPPacket
 from .exceptions import WrongUriType
+from .pollingpolicy import BalancedPolicy, get_polling_policy
+from .outqueue import OutgoingPacketQueue
+from .scancache import ScanCache
+from .linkstats import LinkStatistics
+from .arctuner import RetransmitTuner, parse_arc, parse_ard
 import threading
 import Queue
 import re
-import array
+import time
 
-from cflib.drivers.crazyradio import Crazyradio
+from cflib.drivers.crazyradio import Crazyradio, find_devices
 from usb import USBError
 
 
@@ -56,18 +70,122 @@ class RadioDriver(CRTPDriver):
     def __init__(self):
         """ Create the link driver """
         CRTPDriver.__init__(self)
-        self.cradio = None
         self.uri = ""
         self.link_error_callback = None
         self.link_quality_callback = None
         self.in_queue = None
         self.out_queue = None
-        self._thread = None
+        self._link = None
+        self._polling_policy = BalancedPolicy()
+        self._rate_limits = {}
+        self._weight = 1
+        self._stats_window = 1.0
+        self._stats_publish_rate = 10.0
+        self._arc = 10
+        self._ard = ("b", 32)
+
+    def set_polling_policy(self, policy):
+        """
+        Set the policy deciding how often the copter is polled for data. The
+        policy can be the name of a built in policy ("lowlatency", "balanced"
+        or "lowcpu") or a PollingPolicy instance. Takes effect immediately,
+        also on an open link.
+        """
+        self._polling_policy = get_polling_policy(policy)
+        if self._link:
+            self._link.polling_policy = self._polling_policy
+
+    def get_polling_stats(self):
+        """Return the poll rate and added latency measured by the policy"""
+        return self._polling_policy.get_stats()
+
+    def set_port_rate_limit(self, port, rate, burst=1):
+        """
+        Limit the number of packets per second sent on a bulk traffic port
+        (i.e not commander, param, log or link control). A rate of None
+        removes the limit.
+        """
+        self._rate_limits[port] = (rate, burst)
+        if self.out_queue:
+            self.out_queue.set_rate_limit(port, rate, burst)
+
+    def get_queue_stats(self):
+        """Return the depth and sent/dropped counters of the out queue"""
+        if self.out_queue:
+            return self.out_queue.get_stats()
+        return {}
+
+    def set_link_weight(self, weight):
+        """
+        Set the share of the dongle this link gets when the dongle is shared
+        with other links. A link with weight 2 is served twice as often as a
+        link with weight 1 when both have data to send.
+        """
+        self._weight = weight
+        if self._link:
+            self._link.weight = weight
+
+    def set_address(self, address):
+        """Change the radio address used for this link"""
+        if self._link:
+            self._link.address = tuple(address)
+
+    def set_stats_window(self, window, publish_rate=None):
+        """
+        Set the time in seconds the link statistics are computed over and
+        optionally the maximum rate in Hz of the link quality callback.
+        """
+        self._stats_window = window
+        if publish_rate:
+            self._stats_publish_rate = publish_rate
+        if self._link:
+            self._link.stats.set_window(window)
+            self._link.stats.set_publish_rate(self._stats_publish_rate)
+
+    def set_retransmit(self, arc=None, ard=None):
+        """
+        Set the auto retransmit count (0-15) and delay of the radio for the
+        links opened after this call. The delay is <n>b to wait for an ack
+        with n bytes of payload or <n>us. Either can be "auto" to let a tuner
+        adjust it to the link conditions. The URI options ?arc=..&ard=..
+        override these settings. Defaults to 10 retries and 32 bytes.
+        """
+        if arc is not None:
+            self._arc = parse_arc(arc)
+        if ard is not None:
+            self._ard = parse_ard(ard)
+
+    def get_link_stats(self):
+        """
+        Return the rolling statistics of the link (see
+        LinkStatistics.get_stats) together with the latency it gets from the
+        dongle (the time between two polls of the link) and the current
+        auto retransmit settings.
+        """
+        if self._link:
+            stats = self._link.get_stats()
+            stats["arc"] = self._link.arc
+            stats["ard"] = "%d%s" % (self._link.ard[1], self._link.ard[0])
+            if self._link.radio:
+                stats["links_on_dongle"] = len(self._link.radio.links)
+            return stats
+        return {}
+
+    def set_link_activity(self, logging_active, replies_pending):
+        """Poll faster while log blocks are started or replies pending"""
+        self._polling_policy.set_link_activity(logging_active,
+                                               replies_pending)
 
     def connect(self, uri, link_quality_callback, link_error_callback):
         """
         Connect the link driver to a specified URI of the format:
-        radio://<dongle nbr>/<radio channel>/[250K,1M,2M]
+        radio://<dongle nbr>/<radio channel>/[250K,1M,2M]/[address]
+                [?arc=<retries|auto>&ard=<n>b|<n>us|auto]
+
+        The dongle number can be * to let the driver place the link on the
+        least loaded dongle. The address is 5 bytes written as 10 hexadecimal
+        digits, it defaults to E7E7E7E7E7. The options set the auto
+        retransmit of the radio, see set_retransmit.
 
         The callback for linkQuality can be called at any moment from the
         driver to report back the link quality in percentage. The
@@ -80,13 +198,15 @@ class RadioDriver(CRTPDriver):
             raise WrongUriType("Not a radio URI")
 
         # Open the USB dongle
-        if not re.search("^radio://([0-9]+)((/([0-9]+))(/(250K|1M|2M))?)?$",
-                         uri):
+        uri_data = re.search("^radio://([0-9]+|\\*)((/([0-9]+))"
+                             "(/(250K|1M|2M))?(/([A-Fa-f0-9]{10}))?)?"
+                             "(\\?(.*))?$",
+                             uri)
+        if not uri_data:
             raise WrongUriType('Wrong radio URI format!')
 
-        uri_data = re.search("^radio://([0-9]+)((/([0-9]+))"
-                             "(/(250K|1M|2M))?)?$",
-                             uri)
+        if self._link is not None:
+            raise Exception("Link already open!")
 
         self.uri = uri
 
@@ -102,33 +222,55 @@ class RadioDriver(CRTPDriver):
         if uri_data.group(6) == "2M":
             datarate = Crazyradio.DR_2MPS
 
-        if self.cradio is None:
-            self.cradio = Crazyradio(devid=int(uri_data.group(1)))
-        else:
-            raise Exception("Link already open!")
-
-        if self.cradio.version >= 0.4:
-            self.cradio.set_arc(10)
-        else:
-            logger.warning("Radio version <0.4 will be obsoleted soon!")
-
-        self.cradio.set_channel(channel)
+        address = _DEFAULT_ADDRESS
+        if uri_data.group(8):
+            addr = uri_data.group(8)
+            address = tuple(int(addr[i:i + 2], 16) for i in range(0, 10, 2))
 
-        self.cradio.set_data_rate(datarate)
+        arc = self._arc
+        ard = self._ard
+        if uri_data.group(10):
+            try:
+                for option in uri_data.group(10).split("&"):
+                    (name, value) = option.split("=", 1)
+                    if name == "arc":
+                        arc = parse_arc(value)
+                    elif name == "ard":
+                        ard = parse_ard(value)
+                    else:
+                        raise ValueError("Unknown option " + name)
+            except ValueError as e:
+                raise WrongUriType("Wrong radio URI options: {}".format(e))
 
         # Prepare the inter-thread communication queue
         self.in_queue = Queue.Queue()
-        # Limited size out queue to avoid "ReadBack" effect
-        self.out_queue = Queue.Queue(50)
-
-        # Launch the comm thread
-        self._thread = _RadioDriverThread(self.cradio, self.in_queue,
-                                          self.out_queue,
-                                          link_quality_callback,
-                                          link_error_callback)
-        self._thread.start()
+        # Limited size out queue to avoid "ReadBack" effect. Setpoints are
+        # sent first and only the latest one is kept.
+        self.out_queue = OutgoingPacketQueue(50)
+        for port, (rate, burst) in self._rate_limits.items():
+            self.out_queue.set_rate_limit(port, rate, burst)
 
         self.link_error_callback = link_error_callback
+        self.link_quality_callback = link_quality_callback
+
+        self._link = _RadioLink(channel, datarate, address, self.in_queue,
+                                self.out_queue, link_quality_callback,
+                                link_error_callback, self._polling_policy,
+                                self._weight)
+        self._link.stats.set_window(self._stats_window)
+        self._link.stats.set_publish_rate(self._stats_publish_rate)
+        tuner = RetransmitTuner(uri, arc, ard)
+        self._link.arc = tuner.arc
+        self._link.ard = tuner.ard
+        if tuner.is_active():
+            self._link.tuner = tuner
+
+        # Open the dongle, or share it if it is already used by other links
+        if uri_data.group(1) == "*":
+            self._link.auto_placed = True
+            _pool.place_link(self._link)
+        else:
+            _pool.get_radio(int(uri_data.group(1))).add_link(self._link)
 
     def receive_packet(self, time=0):
         """
@@ -155,7 +297,7 @@ class RadioDriver(CRTPDriver):
         """ Send the packet pk though the link """
         # if self.out_queue.full():
         #    self.out_queue.get()
-        if (self.cradio is None):
+        if (self._link is None):
             return
 
         try:
@@ -165,189 +307,678 @@ class RadioDriver(CRTPDriver):
                 self.link_error_callback("RadioDriver: Could not send packet"
                                          " to copter")
 
+    def try_send_packet(self, pk):
+        """Queue the packet pk without blocking, False if the queue is
+        full"""
+        if (self._link is None):
+            return False
+        try:
+            self.out_queue.put(pk, False)
+        except Queue.Full:
+            return False
+        return True
+
+    def get_send_queue_level(self):
+        """Return how full the send queue is, from 0.0 to 1.0"""
+        if self.out_queue is None:
+            return 0.0
+        return self.out_queue.fill_level()
+
+    def _get_cradio(self):
+        """The Crazyradio used by the link, None if the link is closed"""
+        if self._link and self._link.radio:
+            return self._link.radio.cradio
+        return None
+
+    cradio = property(_get_cradio)
+
     def pause(self):
-        self._thread.stop()
-        self._thread = None
+        """Stop using the dongle so it can be accessed directly with
+        self.cradio. This pauses all the links using the dongle."""
+        self._link.radio.pause()
 
     def restart(self):
-        if self._thread:
-            return
-
-        self._thread = _RadioDriverThread(self.cradio, self.in_queue,
-                                          self.out_queue,
-                                          self.link_quality_callback,
-                                          self.link_error_callback)
-        self._thread.start()
+        """Start using the dongle again after a pause"""
+        self._link.radio.restart()
 
     def close(self):
         """ Close the link. """
-        # Stop the comm thread
-        self._thread.stop()
+        # Remove the link from the dongle, the dongle is closed when the
+        # last link using it is removed
+        if self._link and self._link.radio:
+            self._link.radio.remove_link(self._link)
+        self._link = None
+
+    def scan_interface(self):
+        """ Scan interface for Crazyflies """
+        found = []
+        self.scan_interface_stream(found.append)
+        return found
+
+    def scan_interface_stream(self, found_cb, stop=None):
+        """
+        Scan for Crazyflies and call found_cb([uri, description]) for each
+        one as soon as it is found. The links seen by the last scans are
+        probed first, then the channels are split between all the dongles
+        that are not used by links, so the open links are not disturbed.
+        Setting the stop event ends the scan early.
+        """
+        start_time = time.time()
+        idle = _pool.reserve_idle(_pool.get_dongle_count())
+        if not idle:
+            if _pool.get_dongle_count() > 0:
+                logger.warning("All Crazyradios are used by links, cannot"
+                               " scan")
+            return
+
+        if stop is None:
+            stop = threading.Event()
+        scanners = []
+        try:
+            for (devid, device) in idle:
+                try:
+                    scanners.append(_Scanner(devid,
+                                             Crazyradio(device=device)))
+                except Exception as e:
+                    logger.warning("Cannot open Crazyradio %d: %s", devid, e)
+            if not scanners:
+                return
+
+            reported = set()
+            lock = threading.Lock()
+
+            def found(scanner, channel, datarate, address):
+                key = _scan_key(channel, datarate, address)
+                with lock:
+                    if key in reported:
+                        return
+                    reported.add(key)
+                _scan_cache.seen(key)
+                uri = "radio://{}/{}".format(scanner.devid, key)
+                if address == _DEFAULT_ADDRESS:
+                    uri = "radio://{}/{}/{}".format(scanner.devid, channel,
+                                                    _DATARATE_NAMES[datarate])
+                found_cb([uri, ""])
+
+            # Links seen recently are most likely still there
+            scanners[0].probe(_scan_cache.recent(), found, stop)
+
+            # Then scan all the channels, split between the dongles
+            chunks = []
+            for datarate in (Crazyradio.DR_250KPS, Crazyradio.DR_1MPS,
+                             Crazyradio.DR_2MPS):
+                step = (_MAX_CHANNEL + len(scanners)) // len(scanners)
+                for first in range(0, _MAX_CHANNEL + 1, step):
+                    chunks.append((datarate, first,
+                                   min(first + step - 1, _MAX_CHANNEL)))
+            for (i, scanner) in enumerate(scanners):
+                scanner.chunks = chunks[i::len(scanners)]
+                scanner.start(found, stop)
+            for scanner in scanners:
+                scanner.join()
+        finally:
+            for scanner in scanners:
+                scanner.close()
+            _pool.release(idle)
+            _scan_cache.save()
+
+        logger.info("Radio scan found %d Crazyflies in %.3fs using %d"
+                    " dongles", len(reported), time.time() - start_time,
+                    len(scanners))
+
+    def get_status(self):
+        radio = _pool.get_open_radio()
+        if radio:
+            return "Crazyradio version {} ({} dongles, {} links)".format(
+                radio.cradio.version, _pool.get_dongle_count(),
+                _pool.get_link_count())
+
+        try:
+            cradio = Crazyradio()
+        except USBError as e:
+            return "Cannot open Crazyradio. Permission problem?"\
+                   " ({})".format(str(e))
+        except Exception as e:
+            return str(e)
+
+        version = cradio.version
+        cradio.close()
+        return "Crazyradio version {}".format(version)
+
+    def get_name(self):
+        return "radio"
+
+
+# Sent to poll the copter for data when there is nothing else to send
+_NULL_PACKET = "\xff"
+
+# Radio address used by the Crazyflie if nothing else is configured
+_DEFAULT_ADDRESS = (0xE7,) * 5
+_MAX_CHANNEL = 125
+# URI names of the datarates, indexed by Crazyradio.DR_*
+_DATARATE_NAMES = ["250K", "1M", "2M"]
+
+
+def _device_key(device):
+    """Return a key identifying a dongle as long as it stays plugged in"""
+    return (getattr(device, "bus", None), getattr(device, "address", None),
+            getattr(device, "filename", None))
+
+
+class _DonglePool(object):
+    """
+    All the Crazyradio dongles attached to the computer. The dongles are
+    opened when the first link using them is added and closed when the last
+    link is removed. Dongles are numbered in the order they are found on the
+    USB bus.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Opened dongles, by device key
+        self._radios = {}
+        # Keys of the dongles reserved for scanning
+        self._reserved = set()
+
+    def _devices(self):
+        """Return a list of (key, device) for all the attached dongles"""
+        try:
+            return [(_device_key(d), d) for d in find_devices()]
+        except Exception:
+            return []
+
+    def _open(self, key, device):
+        radio = self._radios.get(key)
+        if radio is None:
+            radio = _SharedRadio(self, key, device)
+            self._radios[key] = radio
+        return radio
+
+    def get_radio(self, devid):
+        """Return the shared radio for a dongle number, opening it if
+        needed"""
+        with self._lock:
+            devices = self._devices()
+            if devid >= len(devices):
+                raise Exception("Cannot find a Crazyradio Dongle")
+            (key, device) = devices[devid]
+            if key in self._reserved:
+                raise Exception("Crazyradio {} is used for scanning".format(
+                    devid))
+            return self._open(key, device)
+
+    def place_link(self, link, exclude=None):
+        """Add a link to the dongle with the fewest links"""
+        with self._lock:
+            best = None
+            best_load = None
+            for (key, device) in self._devices():
+                if key in self._reserved or key == exclude:
+                    continue
+                radio = self._radios.get(key)
+                load = len(radio.links) if radio else 0
+                if best is None or load < best_load:
+                    best = (key, device)
+                    best_load = load
+            if best is None:
+                raise Exception("Cannot find a Crazyradio Dongle")
+            radio = self._open(*best)
+            radio.add_link(link)
+            return radio
+
+    def remove(self, radio):
+        """Forget about a dongle that has been closed"""
+        with self._lock:
+            if self._radios.get(radio.key) is radio:
+                del self._radios[radio.key]
+
+    def reserve_idle(self, count):
+        """
+        Reserve up to count dongles that are not used by any link, so that
+        no links are placed on them. Returns a list of (devid, device).
+        """
+        reserved = []
+        with self._lock:
+            for (devid, (key, device)) in enumerate(self._devices()):
+                if len(reserved) >= count:
+                    break
+                if key in self._radios or key in self._reserved:
+                    continue
+                self._reserved.add(key)
+                reserved.append((devid, device))
+        return reserved
+
+    def release(self, reserved):
+        """Release dongles reserved with reserve_idle"""
+        with self._lock:
+            for (devid, device) in reserved:
+                self._reserved.discard(_device_key(device))
+
+    def get_open_radio(self):
+        """Return one of the dongles used by links or None"""
+        with self._lock:
+            for radio in self._radios.values():
+                return radio
+        return None
+
+    def get_dongle_count(self):
+        """Return the number of attached dongles"""
+        return len(self._devices())
+
+    def get_link_count(self):
+        """Return the number of links using the dongles"""
+        with self._lock:
+            return sum(len(r.links) for r in self._radios.values())
+
+
+class _SharedRadio(object):
+    """
+    A Crazyradio dongle and the thread serving the links that use it. There
+    is only one instance per dongle, get it from the pool.
+    """
+
+    def __init__(self, pool, key, device):
+        """Open the dongle"""
+        self.pool = pool
+        self.key = key
+        self.cradio = Crazyradio(device=device)
+        if self.cradio.version < 0.4:
+            logger.warning("Radio version <0.4 will be obsoleted soon!")
+
+        # Copy on write list of the links, so the thread never needs a lock
+        self.links = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add_link(self, link):
+        """Start serving a link"""
+        with self._lock:
+            self.links = self.links + [link]
+            link.radio = self
+            link.out_queue.wakeup = self._wakeup
+            if self._thread is None:
+                self._start_thread()
+        self._wakeup.set()
+
+    def remove_link(self, link):
+        """Stop serving a link, the dongle is closed after the last one"""
+        with self._lock:
+            self.links = [l for l in self.links if l is not link]
+            link.radio = None
+            if self.links:
+                return
+
+        self.pool.remove(self)
+        self.pause()
 
         # Close the USB dongle
         try:
-            if self.cradio:
-                self.cradio.close()
+            self.cradio.close()
         except:
             # If we pull out the dongle we will not make this call
             pass
-        self.cradio = None
 
-    def _scan_radio_channels(self, start=0, stop=125):
-        """ Scan for Crazyflies between the supplied channels. """
-        return list(self.cradio.scan_channels(start, stop, (0xff,)))
+    def failed(self, message):
+        """
+        Called by the thread when the dongle stops working. Links that were
+        placed automatically are moved to another dongle, the other ones get
+        a link error.
+        """
+        logger.warning("Crazyradio failed: %s", message)
+        self.pool.remove(self)
+        with self._lock:
+            links = self.links
+            self.links = []
+            if self._thread:
+                # Called from the thread, it will stop by itself
+                self._thread.sp = True
+                self._thread = None
 
-    def scan_interface(self):
-        """ Scan interface for Crazyflies """
-        if self.cradio is None:
-            try:
-                self.cradio = Crazyradio()
-            except Exception:
-                return []
-        else:
-            raise Exception("Cannot scann for links while the link is open!")
+        try:
+            self.cradio.close()
+        except:
+            pass
 
-        # FIXME: implements serial number in the Crazyradio driver!
-        serial = "N/A"
+        for link in links:
+            link.radio = None
+            if link.auto_placed:
+                try:
+                    self.pool.place_link(link, exclude=self.key)
+                    logger.info("Moved link to another Crazyradio")
+                    continue
+                except Exception as e:
+                    logger.warning("Could not move link: %s", e)
+            if link.link_error_callback is not None:
+                link.link_error_callback(message)
 
-        logger.info("v%s dongle with serial %s found", self.cradio.version,
-                    serial)
-        found = []
+    def pause(self):
+        """Stop the thread using the dongle"""
+        thread = self._thread
+        self._thread = None
+        if thread:
+            thread.stop()
 
-        self.cradio.set_arc(1)
+    def restart(self):
+        """Restart the thread after a pause"""
+        with self._lock:
+            if self._thread is None and self.links:
+                self._start_thread()
+
+    def _start_thread(self):
+        # The dongle might have been reconfigured while we did not use it
+        self._thread = _RadioDriverThread(self.cradio, self, self._wakeup)
+        self._thread.start()
 
-        self.cradio.set_data_rate(self.cradio.DR_250KPS)
-        found += map(lambda c: ["radio://0/{}/250K".format(c), ""],
-                     self._scan_radio_channels())
-        self.cradio.set_data_rate(self.cradio.DR_1MPS)
-        found += map(lambda c: ["radio://0/{}/1M".format(c), ""],
-                     self._scan_radio_channels())
-        self.cradio.set_data_rate(self.cradio.DR_2MPS)
-        found += map(lambda c: ["radio://0/{}/2M".format(c), ""],
-                     self._scan_radio_channels())
 
-        self.cradio.close()
-        self.cradio = None
+_pool = _DonglePool()
 
-        return found
+# Where Crazyflies have been found by the previous scans
+_scan_cache = ScanCache()
 
-    def get_status(self):
-        if self.cradio is None:
+
+def set_scan_cache(filename):
+    """Persist the links found by scans to filename, so the next scans
+    probe them first"""
+    global _scan_cache
+    _scan_cache = ScanCache(filename)
+
+
+def _scan_key(channel, datarate, address):
+    """Return the part of the radio URI after the dongle number"""
+    return "{}/{}/{}".format(channel, _DATARATE_NAMES[datarate],
+                             "".join("%02X" % a for a in address))
+
+
+class _Scanner(object):
+    """Scan for Crazyflies with one dongle"""
+
+    def __init__(self, devid, cradio):
+        self.devid = devid
+        self.cradio = cradio
+        # List of (datarate, first channel, last channel) to scan
+        self.chunks = []
+        self._thread = None
+        self.cradio.set_arc(1)
+        self._address = None
+
+    def _set_address(self, address):
+        if address != self._address:
+            self.cradio.set_address(address)
+            self._address = address
+
+    def probe(self, keys, found, stop):
+        """Ping the links in keys (see _scan_key) and report the ones that
+        answer"""
+        for key in keys:
+            if stop.is_set():
+                return
             try:
-                self.cradio = Crazyradio()
-            except USBError as e:
-                return "Cannot open Crazyradio. Permission problem?"\
-                       " ({})".format(str(e))
-            except Exception as e:
-                return str(e)
+                (channel, datarate, address) = key.split("/")
+                channel = int(channel)
+                datarate = _DATARATE_NAMES.index(datarate)
+                address = tuple(int(address[i:i + 2], 16)
+                                for i in range(0, 10, 2))
+            except ValueError:
+                continue
+            self._set_address(address)
+            self.cradio.set_data_rate(datarate)
+            self.cradio.set_channel(channel)
+            status = self.cradio.send_packet((0xff,))
+            if status and status.ack:
+                found(self, channel, datarate, address)
+
+    def run(self, found, stop):
+        """Scan the chunks, checking the stop event between chunks"""
+        self._set_address(_DEFAULT_ADDRESS)
+        for (datarate, first, last) in self.chunks:
+            if stop.is_set():
+                return
+            self.cradio.set_data_rate(datarate)
+            for channel in self.cradio.scan_channels(first, last, (0xff,),
+                                                     True):
+                found(self, channel, datarate, _DEFAULT_ADDRESS)
+
+    def start(self, found, stop):
+        self._thread = threading.Thread(target=self.run, args=(found, stop))
+        self._thread.daemon = True
+        self._thread.start()
 
-        return "Crazyradio version {}".format(self.cradio.version)
+    def join(self):
+        if self._thread:
+            self._thread.join()
+
+    def close(self):
+        try:
+            self.cradio.close()
+        except Exception:
+            pass
 
-    def get_name(self):
-        return "radio"
+
+class _RadioLink(object):
+    """The state of one link on a shared dongle"""
+
+    RETRYCOUNT_BEFORE_DISCONNECT = 10
+
+    def __init__(self, channel, datarate, address, in_queue, out_queue,
+                 link_quality_callback, link_error_callback, polling_policy,
+                 weight=1):
+        self.channel = channel
+        self.datarate = datarate
+        self.address = address
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.link_quality_callback = link_quality_callback
+        self.link_error_callback = link_error_callback
+        self.polling_policy = polling_policy
+        self.weight = weight
+        # The shared radio serving the link
+        self.radio = None
+        # True if the link can be moved to another dongle
+        self.auto_placed = False
+        # Auto retransmit count and delay, and the tuner changing them
+        self.arc = 10
+        self.ard = ("b", 32)
+        self.tuner = None
+
+        self.retry_before_disconnect = self.RETRYCOUNT_BEFORE_DISCONNECT
+        # Data that has to be resent since it was not acked
+        self.data_out = None
+        # Time of the next poll if there is nothing to send
+        self.next_poll = 0
+        # Time when the last transaction was finished
+        self.last_done = time.time()
+        # Current value for the smooth weighted round robin
+        self.current_weight = 0
+        self.stats = LinkStatistics()
+
+    def is_ready(self, now):
+        """Return True if the link should be served now"""
+        if self.data_out is not None or self.next_poll <= now:
+            return True
+        send_time = self.out_queue.next_send_time(now)
+        return send_time is not None and send_time <= now
+
+    def get_stats(self):
+        """Return the link statistics and the poll interval of the link"""
+        stats = self.stats.get_stats()
+        polling = self.polling_policy.get_stats()
+        stats["poll_rate"] = polling["poll_rate"]
+        stats["latency"] = polling["added_latency"]
+        stats["max_latency"] = polling["max_added_latency"]
+        return stats
 
 
 # Transmit/receive radio thread
 class _RadioDriverThread (threading.Thread):
     """
-    Radio link receiver thread used to read data from the
-    Crazyradio USB driver. """
+    Radio link thread used to send and receive data with the Crazyradio USB
+    driver for all the links using the dongle. """
 
-    RETRYCOUNT_BEFORE_DISCONNECT = 10
-
-    def __init__(self, cradio, inQueue, outQueue, link_quality_callback,
-                 link_error_callback):
+    def __init__(self, cradio, shared_radio, wakeup):
         """ Create the object """
         threading.Thread.__init__(self)
+        self.setDaemon(True)
         self.cradio = cradio
-        self.in_queue = inQueue
-        self.out_queue = outQueue
+        self.radio = shared_radio
+        self.wakeup = wakeup
         self.sp = False
-        self.link_error_callback = link_error_callback
-        self.link_quality_callback = link_quality_callback
-        self.retryBeforeDisconnect = self.RETRYCOUNT_BEFORE_DISCONNECT
+        # Last configuration sent to the dongle, None means unknown
+        self._channel = None
+        self._datarate = None
+        self._address = None
+        self._arc = None
+        self._ard = None
+        # Auto retransmit is only supported from version 0.4
+        self._has_retransmit = cradio.version >= 0.4
 
     def stop(self):
         """ Stop the thread """
         self.sp = True
+        self.wakeup.set()
         try:
             self.join()
         except Exception:
             pass
 
-    def run(self):
-        """ Run the receiver thread """
-        dataOut = array.array('B', [0xFF])
-        waitTime = 0
-        emptyCtr = 0
+    def _configure(self, link):
+        """Configure the dongle for the link, only sending what changed"""
+        if link.datarate != self._datarate:
+            self.cradio.set_data_rate(link.datarate)
+            self._datarate = link.datarate
+        if link.channel != self._channel:
+            self.cradio.set_channel(link.channel)
+            self._channel = link.channel
+        if link.address != self._address:
+            self.cradio.set_address(link.address)
+            self._address = link.address
+        if self._has_retransmit:
+            if link.arc != self._arc:
+                self.cradio.set_arc(link.arc)
+                self._arc = link.arc
+            if link.ard != self._ard:
+                if link.ard[0] == "b":
+                    self.cradio.set_ard_bytes(link.ard[1])
+                else:
+                    self.cradio.set_ard_time(link.ard[1])
+                self._ard = link.ard
+
+    def _pick_link(self, links, now):
+        """
+        Pick the next link to serve among the ones that are ready, using a
+        smooth weighted round robin.
+        """
+        best = None
+        total = 0
+        for link in links:
+            if link.is_ready(now):
+                link.current_weight += link.weight
+                total += link.weight
+                if best is None or link.current_weight > best.current_weight:
+                    best = link
+        if best:
+            best.current_weight -= total
+        return best
+
+    def _transfer(self, link):
+        """Do one USB transaction for the link"""
+        if link.data_out is None:
+            try:
+                outPacket = link.out_queue.get(False)
+                # print "-> " + outPacket.__str__()
+                link.data_out = chr(outPacket.header) + outPacket.data
+            except Queue.Empty:
+                link.data_out = _NULL_PACKET
+
+        start = time.time()
+        link.polling_policy.poll_sent(start - link.last_done)
 
+        ackStatus = None
+        try:
+            self._configure(link)
+            usb_start = time.time()
+            ackStatus = self.cradio.send_packet(link.data_out)
+        except Exception as e:
+            import traceback
+            self.radio.failed("Error communicating with crazy radio"
+                              " ,it has probably been unplugged!\n"
+                              "Exception:%s\n\n%s" % (e,
+                              traceback.format_exc()))
+            return
+
+        link.last_done = time.time()
+
+        # Analise the in data packet ...
+        if ackStatus is None:
+            self.radio.failed("Dongle communication error"
+                              " (ackStatus==None)")
+            return
+
+        data = ackStatus.data
+        stats = link.stats
+        stats.transaction(link.last_done, len(link.data_out), ackStatus.ack,
+                          ackStatus.retry, len(data),
+                          link.last_done - usb_start)
+        # The link quality is published at a bounded rate, averaged over the
+        # statistics window
+        if (link.link_quality_callback is not None and
+                stats.publish_due(link.last_done)):
+            link.link_quality_callback(stats.get_link_quality(link.last_done))
+        tuner = link.tuner
+        if (tuner and tuner.update_due(link.last_done, stats.window) and
+                tuner.update(stats.get_stats(link.last_done))):
+            link.arc = tuner.arc
+            link.ard = tuner.ard
+
+        # If no copter, retry
+        if ackStatus.ack is False:
+            link.retry_before_disconnect -= 1
+            if (link.retry_before_disconnect == 0 and
+                    link.link_error_callback is not None):
+                link.link_error_callback("Too many packets lost")
+            return
+        link.retry_before_disconnect = link.RETRYCOUNT_BEFORE_DISCONNECT
+
+        link.data_out = None
+
+        # If there is a copter in range, the packet is analysed and the
+        # next packet to send is prepared
+        if (len(data) > 0):
+            inPacket = CRTPPacket(data[0], data[1:].tostring())
+            # print "<- " + inPacket.__str__()
+            link.in_queue.put(inPacket)
+
+        # Relax for the time decided by the polling policy, unless there is
+        # something to send
+        link.next_poll = (link.last_done +
+                          link.polling_policy.get_wait_time(len(data) > 0))
+
+    def run(self):
+        """ Run the radio thread """
         while(True):
             if (self.sp):
                 break
 
-            try:
-                ackStatus = self.cradio.send_packet(dataOut)
-            except Exception as e:
-                import traceback
-                self.link_error_callback("Error communicating with crazy radio"
-                                         " ,it has probably been unplugged!\n"
-                                         "Exception:%s\n\n%s" % (e,
-                                         traceback.format_exc()))
-
-            # Analise the in data packet ...
-            if ackStatus is None:
-                if (self.link_error_callback is not None):
-                    self.link_error_callback("Dongle communication error"
-                                             " (ackStatus==None)")
+            links = self.radio.links
+            now = time.time()
+            link = self._pick_link(links, now)
+            if link:
+                self._transfer(link)
                 continue
 
-            if (self.link_quality_callback is not None):
-                self.link_quality_callback((10 - ackStatus.retry) * 10)
-
-            # If no copter, retry
-            if ackStatus.ack is False:
-                self.retryBeforeDisconnect = self.retryBeforeDisconnect - 1
-                if (self.retryBeforeDisconnect == 0 and
-                        self.link_error_callback is not None):
-                    self.link_error_callback("Too many packets lost")
-                continue
-            self.retryBeforeDisconnect = self.RETRYCOUNT_BEFORE_DISCONNECT
-
-            data = ackStatus.data
-
-            # If there is a copter in range, the packet is analysed and the
-            # next packet to send is prepared
-            if (len(data) > 0):
-                inPacket = CRTPPacket(data[0], list(data[1:]))
-                # print "<- " + inPacket.__str__()
-                self.in_queue.put(inPacket)
-                waitTime = 0
-                emptyCtr = 0
-            else:
-                emptyCtr += 1
-                if (emptyCtr > 10):
-                    emptyCtr = 10
-                    # Relaxation time if the last 10 packet where empty
-                    waitTime = 0.01
+            # Nothing to do, wait for the next poll or for a new packet
+            self.wakeup.clear()
+            next_poll = None
+            for l in links:
+                # Rate limited packets wait for their token, not the poll
+                send_time = l.out_queue.next_send_time(now)
+                if send_time is not None and send_time < l.next_poll:
+                    wake = send_time
                 else:
-                    waitTime = 0
-
-            # get the next packet to send of relaxation (wait 10ms)
-            outPacket = None
-            try:
-                outPacket = self.out_queue.get(True, waitTime)
-            except Queue.Empty:
-                outPacket = None
-
-            dataOut = array.array('B')
-
-            if outPacket:
-                # print "-> " + outPacket.__str__()
-                dataOut.append(outPacket.header)
-                for X in outPacket.data:
-                    if type(X) == int:
-                        dataOut.append(X)
-                    else:
-                        dataOut.append(ord(X))
-            else:
-                dataOut.append(0xFF)
+                    wake = l.next_poll
+                if next_poll is None or wake < next_poll:
+                    next_poll = wake
+            if next_poll is None:
+                self.wakeup.wait()
+            elif next_poll > now:
+                self.wakeup.wait(next_poll - now)
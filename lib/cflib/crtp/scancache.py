@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Remember where Crazyflies were found by the last scans so they can be
+probed first by the next scan.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['ScanCache']
+
+import os
+import json
+import time
+import threading
+
+from cflib.utils.atomicfile import write_atomic
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ScanCache():
+    """
+    Last time each link was seen, by an interface specific key (for the
+    radio <channel>/<datarate>/<address>). If no file is supplied the cache
+    only lives as long as the object.
+    """
+
+    # Entries not seen for this long are forgotten (in seconds)
+    MAX_AGE = 30 * 24 * 3600
+
+    def __init__(self, filename=None):
+        self._filename = filename
+        self._lock = threading.Lock()
+        self._seen = {}
+        if filename and os.path.exists(filename):
+            try:
+                cache = open(filename)
+                self._seen = json.load(cache)
+                cache.close()
+            except Exception as exp:
+                logger.warning("Error while parsing scan cache [%s]:%s",
+                               filename, str(exp))
+
+    def recent(self):
+        """Return the keys, the most recently seen first"""
+        with self._lock:
+            limit = time.time() - self.MAX_AGE
+            keys = [k for (k, t) in self._seen.items() if t > limit]
+            return sorted(keys, key=lambda k: self._seen[k], reverse=True)
+
+    def seen(self, key):
+        """Record that a link has just been seen"""
+        with self._lock:
+            self._seen[key] = time.time()
+
+    def save(self):
+        """Write the cache to file"""
+        if not self._filename:
+            return
+        with self._lock:
+            limit = time.time() - self.MAX_AGE
+            seen = dict((k, t) for (k, t) in self._seen.items() if t > limit)
+        try:
+            # Clients scanning at the same time each write a file of their
+            # own and rename it
+            write_atomic(self._filename, json.dumps(seen, indent=2))
+        except Exception as exp:
+            logger.warning("Could not save scan cache to file [%s]: %s",
+                           self._filename, str(exp))
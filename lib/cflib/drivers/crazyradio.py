@@ -31,10 +31,11 @@ USB driver for the Crazyradio USB dongle.
 """
 
 __author__ = 'Bitcraze AB'
-__all__ = ['Crazyradio']
+__all__ = ['Crazyradio', 'find_devices']
 
 
 import os
+import array
 import usb
 import logging
 logger = logging.getLogger(__name__)
@@ -67,25 +68,35 @@ except:
     pyusb1 = False
 
 
-def _find_devices():
+# Simulated dongles plugged in with cflib.drivers.simradio, they are found
+# after the real ones
+_simulated_devices = []
+
+
+def find_devices():
     """
     Returns a list of CrazyRadio devices currently connected to the computer
     """
     ret = []
 
-    if pyusb1:
-        dev = usb.core.find(idVendor=0x1915, idProduct=0x7777, find_all=1, backend=pyusb_backend)
-        if dev is not None:
-            ret = dev
-    else:
-        busses = usb.busses()
-        for bus in busses:
-            for device in bus.devices:
-                if device.idVendor == CRADIO_VID:
-                    if device.idProduct == CRADIO_PID:
-                        ret += [device, ]
+    try:
+        if pyusb1:
+            dev = usb.core.find(idVendor=0x1915, idProduct=0x7777, find_all=1, backend=pyusb_backend)
+            if dev is not None:
+                ret = list(dev)
+        else:
+            busses = usb.busses()
+            for bus in busses:
+                for device in bus.devices:
+                    if device.idVendor == CRADIO_VID:
+                        if device.idProduct == CRADIO_PID:
+                            ret += [device, ]
+    except Exception:
+        # Simulated dongles work without any USB backend
+        if not _simulated_devices:
+            raise
 
-    return ret
+    return ret + _simulated_devices
 
 
 class _radio_ack:
@@ -111,7 +122,7 @@ class Crazyradio:
         """ Create object and scan for USB dongle if no device is supplied """
         if device is None:
             try:
-                device = _find_devices()[devid]
+                device = find_devices()[devid]
             except Exception:
                 raise Exception("Cannot find a Crazyradio Dongle")
 
@@ -215,12 +226,29 @@ class Crazyradio:
         # FIXME: Mitigation for Crazyradio firmware bug #9
         return False
 
-    def scan_channels(self, start, stop, packet):
-        if self._has_fw_scan():  # Fast firmware-driven scann
+    def scan_channels(self, start, stop, packet, verify_fw_scan=False):
+        """Return a tuple of the channels between start and stop (included)
+        where packet is acked.
+
+        If verify_fw_scan is True the firmware scan is used when the dongle
+        supports it, even though it can report false hits (firmware bug #9).
+        Every hit is then verified with a single ping on the channel, which
+        is much faster than scanning all the channels from the PC."""
+        if self._has_fw_scan() or (verify_fw_scan and self.version >= 0.5):
+            # Fast firmware-driven scann
             _send_vendor_setup(self.handle, SCANN_CHANNELS, start, stop,
                                packet)
-            return tuple(_get_vendor_setup(self.handle, SCANN_CHANNELS,
+            hits = tuple(_get_vendor_setup(self.handle, SCANN_CHANNELS,
                                            0, 0, 64))
+            if not verify_fw_scan:
+                return hits
+            result = tuple()
+            for i in hits:
+                self.set_channel(i)
+                status = self.send_packet(packet)
+                if status and status.ack:
+                    result = result + (i,)
+            return result
         else:  # Slow PC-driven scann
             result = tuple()
             for i in range(start, stop + 1):
@@ -234,13 +262,19 @@ class Crazyradio:
     def send_packet(self, dataOut):
         """ Send a packet and receive the ack from the radio dongle
             The ack contains information about the packet transmition
-            and a data payload if the ack packet contained any """
+            and a data payload if the ack packet contained any
+
+            dataOut can be any bytes-like object (str, bytearray, array or
+            memoryview) or a sequence of byte values. The payload of the ack
+            is returned as an array of bytes."""
         ackIn = None
         data = None
+        if type(dataOut) == memoryview:
+            dataOut = dataOut.tobytes()
         try:
             if (pyusb1 is False):
                 self.handle.bulkWrite(1, dataOut, 1000)
-                data = self.handle.bulkRead(0x81, 64, 1000)
+                data = array.array('B', self.handle.bulkRead(0x81, 64, 1000))
             else:
                 self.handle.write(1, dataOut, 0, 1000)
                 data = self.handle.read(0x81, 64, 0, 1000)
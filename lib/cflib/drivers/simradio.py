@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Simulated Crazyradio USB dongle, used to run and benchmark the radio stack
+without any hardware.
+
+SimulatedCrazyradio implements the parts of the pyusb device API used by
+the Crazyradio driver: the vendor setup requests and the bulk write/read of
+packets, with the ack and retry semantics of the radio. The other end of the
+link is one or more SimulatedCopter, by default running the CRTP firmware
+emulation of the debug driver. Packet loss, USB latency and the air time of
+the datarate can be configured.
+
+    radio = SimulatedCrazyradio(loss=0.05)
+    radio.add_copter(SimulatedCopter(channel=80))
+    radio.plug()
+    # radio://0/80/2M now connects to the simulated copter
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['SimulatedCrazyradio', 'SimulatedCopter']
+
+import array
+import random
+import threading
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+from . import crazyradio
+from .crazyradio import (SET_RADIO_CHANNEL, SET_RADIO_ADDRESS, SET_DATA_RATE,
+                         SET_RADIO_POWER, SET_RADIO_ARD, SET_RADIO_ARC,
+                         ACK_ENABLE, SET_CONT_CARRIER, SCANN_CHANNELS,
+                         LAUNCH_BOOTLOADER)
+
+# Bits per second of the Crazyradio datarates
+_BITRATES = {0: 250000, 1: 1000000, 2: 2000000}
+# Preamble, address, packet control field and CRC of a radio packet
+_RADIO_OVERHEAD = 1 + 5 + 2 + 2
+# Null packet sent by the PC to poll the copter
+_NULL_PACKET = "\xff"
+_DEFAULT_ADDRESS = (0xE7,) * 5
+
+
+class SimulatedCopter(object):
+    """
+    A copter listening on a channel/datarate/address. Packets received from
+    the radio are passed to the firmware and the packets sent by the
+    firmware are returned in the acks, one per ack.
+
+    The firmware can be any object with the send_packet(pk) and
+    receive_packet(wait) methods of a CRTP link driver. By default the
+    debug driver, which emulates the log, param and console subsystems, is
+    used.
+    """
+
+    def __init__(self, channel=2, datarate=2, address=_DEFAULT_ADDRESS,
+                 firmware=None):
+        self.channel = channel
+        self.datarate = datarate
+        self.address = tuple(address)
+        if firmware is None:
+            from cflib.crtp.debugdriver import DebugDriver
+            firmware = DebugDriver()
+            firmware.connect("debug://0/0", None, None)
+        self.firmware = firmware
+        # The ack payload is kept until the PC has received the ack
+        self._ack_payload = None
+        self.received = 0
+
+    def receive(self, data):
+        """Called when a packet reaches the copter"""
+        self.received += 1
+        if data == _NULL_PACKET:
+            return
+        from cflib.crtp.crtpstack import CRTPPacket
+        self.firmware.send_packet(CRTPPacket(ord(data[0]), data[1:]))
+
+    def get_ack_payload(self):
+        """Return the data to put in the ack, the same until acked"""
+        if self._ack_payload is None:
+            pk = self.firmware.receive_packet(0)
+            if pk is None:
+                return ""
+            self._ack_payload = chr(pk.header) + pk.data
+        return self._ack_payload
+
+    def ack_received(self):
+        """Called when the PC has received the ack payload"""
+        self._ack_payload = None
+
+
+class SimulatedCrazyradio(object):
+    """
+    A simulated Crazyradio dongle. It can be passed as device to the
+    Crazyradio class or plugged in, so find_devices() returns it and the
+    radio driver uses it for radio:// URIs.
+    """
+
+    _next_address = 1
+
+    def __init__(self, loss=0.0, latency=0.0005, air_time=True,
+                 version=0x0052, seed=None):
+        """
+        @param loss Probability that a radio packet, or its ack, is lost
+        @param latency USB round trip time in seconds of a transaction
+        @param air_time Simulate the time it takes to send the packets at
+               the configured datarate, including the retry delays
+        @param version Firmware version in BCD, 0x0052 is 0.52
+        @param seed Seed of the loss generator, for repeatable runs
+        """
+        self.loss = loss
+        self.latency = latency
+        self.air_time = air_time
+        self.copters = []
+
+        # USB device attributes
+        self.idVendor = crazyradio.CRADIO_VID
+        self.idProduct = crazyradio.CRADIO_PID
+        self.bcdDevice = version
+        self.deviceVersion = "{0:x}.{1:x}".format(version >> 8,
+                                                  version & 0x0FF)
+        self.bus = "sim"
+        self.address = SimulatedCrazyradio._next_address
+        SimulatedCrazyradio._next_address += 1
+        self.filename = "sim%d" % self.address
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._reset_radio()
+        self._ack = None
+        self._scan_result = ()
+
+        self.transactions = 0
+        self.retries = 0
+
+    def _reset_radio(self):
+        self.channel = 2
+        self.datarate = 2
+        self.radio_address = _DEFAULT_ADDRESS
+        self.arc = 3
+        self.ard = 0.00025
+        self.ack_enabled = True
+
+    def add_copter(self, copter):
+        """Add a copter in range of the dongle"""
+        self.copters.append(copter)
+        return copter
+
+    def plug(self):
+        """Make find_devices() return the dongle, after the real ones"""
+        if self not in crazyradio._simulated_devices:
+            crazyradio._simulated_devices.append(self)
+
+    def unplug(self):
+        """Remove the dongle, it will fail like an unplugged dongle"""
+        if self in crazyradio._simulated_devices:
+            crazyradio._simulated_devices.remove(self)
+
+    def _copter(self):
+        """Return the copter listening to the current configuration"""
+        for copter in self.copters:
+            if (copter.channel == self.channel and
+                    copter.datarate == self.datarate and
+                    copter.address == self.radio_address):
+                return copter
+        return None
+
+    def _air_time(self, length):
+        """Time in seconds to send length bytes and get the ack"""
+        if not self.air_time:
+            return 0
+        bits = (length + _RADIO_OVERHEAD) * 8
+        return float(bits) / _BITRATES[self.datarate]
+
+    def _transmit(self, data):
+        """
+        Send a packet over the simulated radio with up to arc retries and
+        return the status byte and ack payload, like the dongle does.
+        """
+        copter = self._copter()
+        delay = self.latency
+        retry = 0
+        status = 0
+        payload = ""
+        delivered = False
+        while True:
+            delay += self._air_time(len(data))
+            if copter and self._random.random() >= self.loss:
+                # The copter only handles a packet once, even if it is
+                # resent because the ack was lost
+                if not delivered:
+                    copter.receive(data)
+                    delivered = True
+                payload = copter.get_ack_payload()
+                delay += self._air_time(len(payload))
+                if not self.ack_enabled or self._random.random() >= self.loss:
+                    copter.ack_received()
+                    status = 0x01
+                    break
+            if retry >= self.arc:
+                payload = ""
+                break
+            retry += 1
+            delay += self.ard
+
+        self.transactions += 1
+        self.retries += retry
+        if delay > 0:
+            time.sleep(delay)
+        return chr(status | retry << 4) + (payload if status else "")
+
+    def _scan(self, start, stop, packet):
+        """Return the channels between start and stop where packet is
+        acked"""
+        found = []
+        channel = self.channel
+        for c in range(start, stop + 1):
+            self.channel = c
+            copter = self._copter()
+            if copter and self._random.random() >= self.loss:
+                found.append(c)
+        self.channel = channel
+        if self.air_time:
+            time.sleep((stop - start + 1) * self._air_time(len(packet)))
+        return tuple(found[:64])
+
+    def _setup(self, request, value, index, data):
+        """Handle a vendor setup request"""
+        if request == SET_RADIO_CHANNEL:
+            self.channel = value
+        elif request == SET_RADIO_ADDRESS:
+            self.radio_address = tuple(data)
+        elif request == SET_DATA_RATE:
+            self.datarate = value
+        elif request == SET_RADIO_ARD:
+            if value & 0x80:
+                # Wait for the time of an ack with value & 0x7F bytes
+                self.ard = self._air_time(value & 0x7F)
+            else:
+                self.ard = (value + 1) * 0.00025
+        elif request == SET_RADIO_ARC:
+            self.arc = value
+        elif request == ACK_ENABLE:
+            self.ack_enabled = value != 0
+        elif request == SCANN_CHANNELS:
+            self._scan_result = self._scan(value, index, data)
+        elif request in (SET_RADIO_POWER, SET_CONT_CARRIER,
+                         LAUNCH_BOOTLOADER):
+            pass
+        else:
+            logger.warning("Unknown vendor request 0x%02X", request)
+
+    def _check_plugged(self):
+        if self not in crazyradio._simulated_devices:
+            raise IOError("Simulated Crazyradio unplugged")
+
+    ### pyusb 1.x API ###
+    def set_configuration(self, configuration=None):
+        self._reset_radio()
+
+    def ctrl_transfer(self, bmRequestType, bRequest, wValue=0, wIndex=0,
+                      data_or_wLength=None, timeout=None):
+        with self._lock:
+            self._check_plugged()
+            if bmRequestType & 0x80:
+                if bRequest == SCANN_CHANNELS:
+                    return array.array('B', self._scan_result)
+                return array.array('B')
+            self._setup(bRequest, wValue, wIndex, data_or_wLength or ())
+            return len(data_or_wLength or ())
+
+    def write(self, endpoint, data, interface=None, timeout=None):
+        with self._lock:
+            self._check_plugged()
+            if type(data) != str:
+                data = "".join(chr(b) for b in data)
+            self._ack = self._transmit(data)
+            return len(data)
+
+    def read(self, endpoint, size, interface=None, timeout=None):
+        with self._lock:
+            self._check_plugged()
+            ack = self._ack
+            self._ack = None
+            if ack is None:
+                raise IOError("Simulated Crazyradio: nothing to read")
+            return array.array('B', ack[:size])
+
+    def reset(self):
+        pass
+
+    ### pyusb 0.x API ###
+    def open(self):
+        return self
+
+    def setConfiguration(self, configuration):
+        self.set_configuration(configuration)
+
+    def claimInterface(self, interface):
+        pass
+
+    def releaseInterface(self):
+        pass
+
+    def controlMsg(self, requestType, request, buffer, value=0, index=0,
+                   timeout=100):
+        return self.ctrl_transfer(requestType, request, value, index,
+                                  buffer, timeout)
+
+    def bulkWrite(self, endpoint, buffer, timeout=100):
+        return self.write(endpoint, buffer, 0, timeout)
+
+    def bulkRead(self, endpoint, size, timeout=100):
+        return self.read(endpoint, size, 0, timeout)
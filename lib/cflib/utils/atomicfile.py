@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Writing of files that other processes can read at any time
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['write_atomic']
+
+import os
+import tempfile
+
+
+def write_atomic(filename, data):
+    """
+    Write the data to a temporary file in the same directory and rename it,
+    other processes will either see the old or the new file. Each writer
+    gets a temporary file of its own.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename) or ".",
+                               prefix=".%s." % os.path.basename(filename),
+                               suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.name == "nt" and os.path.exists(filename):
+            # Rename does not replace files on Windows
+            os.remove(filename)
+        os.rename(tmp, filename)
+    except:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
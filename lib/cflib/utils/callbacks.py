@@ -51,6 +51,7 @@ class Caller():
         self.callbacks.remove(cb)
 
     def call(self, *args):
-        """ Call the callbacks registered with the arguments args """
-        for cb in self.callbacks:
+        """ Call the callbacks registered with the arguments args. The
+        callbacks may remove themselves. """
+        for cb in list(self.callbacks):
             cb(*args)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Deadline scheduler used instead of one threading.Timer per deadline
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['Scheduler', 'get_scheduler']
+
+import heapq
+import itertools
+import threading
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Deadline(object):
+    """ A function scheduled to be called, returned by Scheduler.schedule """
+
+    __slots__ = ('when', 'func', 'args', 'cancelled')
+
+    def __init__(self, when, func, args):
+        self.when = when
+        self.func = func
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """ Do not call the function. Cancelled deadlines stay in the heap
+        until they expire, so cancelling is O(1) """
+        self.cancelled = True
+
+
+class Scheduler(object):
+    """
+    Calls functions after a delay from one thread, ordering the deadlines
+    in a heap. The functions are called from the scheduler thread and
+    should be short.
+    """
+
+    def __init__(self):
+        """ Create the scheduler, the thread is started on first use """
+        self._heap = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition(threading.Lock())
+        self._thread = None
+
+    def schedule(self, delay, func, *args):
+        """ Call func(*args) in delay seconds, returns a Deadline that can
+        be cancelled """
+        deadline = Deadline(time.time() + delay, func, args)
+        with self._cond:
+            # The sequence number keeps the order of equal deadlines and
+            # avoids comparing the Deadline objects
+            heapq.heappush(self._heap, (deadline.when, next(self._sequence),
+                                        deadline))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name="Scheduler")
+                self._thread.setDaemon(True)
+                self._thread.start()
+            elif self._heap[0][2] is deadline:
+                # New first deadline, the thread has to wake up earlier
+                self._cond.notify()
+        return deadline
+
+    def pending(self):
+        """ Return the number of deadlines not yet expired, including the
+        cancelled ones """
+        return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - time.time()
+                    if wait <= 0:
+                        deadline = heapq.heappop(self._heap)[2]
+                        break
+                    self._cond.wait(wait)
+            if deadline.cancelled:
+                continue
+            try:
+                deadline.func(*deadline.args)
+            except Exception:
+                logger.exception("Exception in scheduled function")
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """ Return the scheduler shared by the whole library """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
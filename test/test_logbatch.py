@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Tests of the batch decoding of log data, skipped without NumPy.
+
+Run from the repository root with: python -m unittest discover -s test
+"""
+
+__author__ = 'Bitcraze AB'
+
+import os
+import sys
+import struct
+import logging
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lib"))
+
+from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
+from cflib.crazyflie.log import Log, LogConfig, LogTocElement, CHAN_LOGDATA
+from cflib.crazyflie.logbatch import np, LogBatch
+
+from test_logconfig import FakeCrazyflie
+
+# Generous, the tests only wait this long if something is wrong
+TIMEOUT = 5.0
+
+
+def packet_data(block, timestamp, roll, thrust):
+    """The payload of a log data packet of the test block"""
+    return struct.pack("<BHBfH", block.id, timestamp & 0xFFFF,
+                       timestamp >> 16, roll, thrust)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class LogBatchTest(unittest.TestCase):
+    """Batches built directly"""
+
+    def setUp(self):
+        self.block = LogConfig("Test", 10)
+        self.block.add_variable("stabilizer.roll", "float")
+        self.block.add_variable("stabilizer.thrust", "uint16_t")
+        self.block.compile()
+
+    def batch(self, count=3, interval=TIMEOUT):
+        return LogBatch(self.block, LogTocElement.types, count, interval)
+
+    def test_count(self):
+        batch = self.batch()
+        self.assertIs(batch.append(packet_data(self.block, 1, 0.5, 10)),
+                      None)
+        self.assertIs(batch.append(packet_data(self.block, 2, 1.5, 20)),
+                      None)
+        decoded = batch.append(packet_data(self.block, 0x123456, -2.0, 30))
+        self.assertEqual(decoded.dtype.names,
+                         ("timestamp", "stabilizer.roll",
+                          "stabilizer.thrust"))
+        self.assertEqual(list(decoded["timestamp"]), [1, 2, 0x123456])
+        self.assertEqual(list(decoded["stabilizer.roll"]), [0.5, 1.5, -2.0])
+        self.assertEqual(list(decoded["stabilizer.thrust"]), [10, 20, 30])
+        # The slots are reused for the next batch
+        self.assertIs(batch.flush(), None)
+
+    def test_flush(self):
+        batch = self.batch()
+        batch.append(packet_data(self.block, 1, 0.5, 10))
+        self.assertEqual(list(batch.flush()["stabilizer.thrust"]), [10])
+        self.assertIs(batch.flush(), None)
+
+    def test_packet_length(self):
+        batch = self.batch()
+        # Trailing bytes are ignored like in the per packet decoding
+        batch.append(packet_data(self.block, 1, 0.5, 10) + "\xff\xff")
+        logger = logging.getLogger("cflib.crazyflie.logbatch")
+        logger.disabled = True
+        try:
+            self.assertIs(batch.append(
+                packet_data(self.block, 2, 1.5, 20)[:-1]), None)
+        finally:
+            logger.disabled = False
+        decoded = batch.flush()
+        self.assertEqual(len(decoded), 1)
+        self.assertEqual(decoded["stabilizer.thrust"][0], 10)
+
+    def test_interval(self):
+        # A block that stops sending gets its batch from the scheduler
+        delivered = threading.Event()
+        batches = []
+
+        def received(batch, block):
+            batches.append(batch)
+            delivered.set()
+        self.block.batch_received_cb.add_callback(received)
+        batch = self.batch(interval=0.01)
+        batch.append(packet_data(self.block, 1, 0.5, 10))
+        self.assertTrue(delivered.wait(TIMEOUT))
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(list(batches[0]["timestamp"]), [1])
+
+    def test_interval_after_count(self):
+        # The scheduled flush of a batch delivered when it was full does
+        # not deliver the next batch early
+        batch = self.batch(count=2)
+        batches = []
+        self.block.batch_received_cb.add_callback(
+            lambda batch, block: batches.append(batch))
+        generation = batch._generation
+        batch.append(packet_data(self.block, 1, 0.5, 10))
+        self.assertIsNot(batch.append(packet_data(self.block, 2, 1.5, 20)),
+                         None)
+        batch.append(packet_data(self.block, 3, 2.5, 30))
+        batch._expired(generation)
+        self.assertEqual(batches, [])
+        batch._expired(batch._generation)
+        self.assertEqual(list(batches[0]["timestamp"]), [3])
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class LogBatchModeTest(unittest.TestCase):
+    """Batch mode enabled in Log"""
+
+    def test_enable_disable(self):
+        log = Log(FakeCrazyflie())
+        block = LogConfig("Test", 10)
+        block.add_variable("stabilizer.roll", "float")
+        block.add_variable("stabilizer.thrust", "uint16_t")
+        log.log_blocks.append(block)
+        batches = []
+        data = []
+        block.batch_received_cb.add_callback(
+            lambda batch, block: batches.append(batch))
+        block.data_received_cb.add_callback(
+            lambda ts, values, block: data.append(values))
+
+        log.enable_batch(block, count=2, interval=TIMEOUT)
+        for i in range(3):
+            log._new_packet_cb(CRTPPacket(
+                CRTPPort.LOGGING << 4 | CHAN_LOGDATA,
+                packet_data(block, i, i, i)))
+        self.assertEqual(len(batches), 1)
+        log.disable_batch(block)
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+        self.assertEqual(data, [])
+        log._new_packet_cb(CRTPPacket(CRTPPort.LOGGING << 4 | CHAN_LOGDATA,
+                                      packet_data(block, 3, 3.0, 3)))
+        self.assertEqual(data, [{"stabilizer.roll": 3.0,
+                                 "stabilizer.thrust": 3}])
+
+
+if __name__ == "__main__":
+    unittest.main()
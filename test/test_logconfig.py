@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Tests of the decoding of log data by LogConfig.
+
+Run from the repository root with: python -m unittest discover -s test
+"""
+
+__author__ = 'Bitcraze AB'
+
+import os
+import sys
+import array
+import struct
+import logging
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lib"))
+
+from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
+from cflib.crazyflie.log import Log, LogConfig, CHAN_LOGDATA
+from cflib.utils.callbacks import Caller
+
+VARIABLES = [("stabilizer.roll", "float"), ("motor.m1", "uint16_t"),
+             ("acc.zw", "int8_t"), ("pm.vbat", "FP16"),
+             ("gyro.x", "int32_t")]
+VALUES = (1.5, 40000, -3, -2, -100000)
+DATA = struct.pack("<fHbhi", *VALUES)
+
+
+class FakeCrazyflie(object):
+    """Just enough of a Crazyflie for Log"""
+    def __init__(self):
+        self.reply_timeout = Caller()
+
+    def add_port_callback(self, port, cb):
+        pass
+
+
+class LogConfigTest(unittest.TestCase):
+    """The delivery forms of the data"""
+
+    def setUp(self):
+        self.block = LogConfig("Test", 10)
+        for name, fetch_as in VARIABLES:
+            self.block.add_variable(name, fetch_as)
+        self.received = []
+        self.block.data_received_cb.add_callback(
+            lambda ts, data, block: self.received.append((ts, data, block)))
+
+    def unpack(self):
+        self.block.unpack_log_data(DATA, 1234)
+        self.assertEqual(len(self.received), 1)
+        (timestamp, data, block) = self.received[0]
+        self.assertEqual(timestamp, 1234)
+        self.assertIs(block, self.block)
+        return data
+
+    def test_dict(self):
+        data = self.unpack()
+        self.assertEqual(data, dict(zip([v[0] for v in VARIABLES], VALUES)))
+
+    def test_tuple(self):
+        self.block.set_delivery(LogConfig.TUPLE)
+        self.assertEqual(self.unpack(), VALUES)
+
+    def test_record(self):
+        self.block.set_delivery(LogConfig.RECORD)
+        data = self.unpack()
+        self.assertEqual(tuple(data), VALUES)
+        self.assertEqual(data.stabilizer_roll, 1.5)
+        self.assertEqual(data.pm_vbat, -2)
+
+    def test_array_list(self):
+        target = [None] * 6
+        self.block.set_delivery(LogConfig.ARRAY, target)
+        data = self.unpack()
+        self.assertIs(data, target)
+        self.assertEqual(tuple(target[:5]), VALUES)
+        # The rest of the target is left alone
+        self.assertIs(target[5], None)
+
+    def test_array_array(self):
+        target = array.array("d", [0.0] * 5)
+        self.block.set_delivery(LogConfig.ARRAY, target)
+        self.assertEqual(tuple(self.unpack()), VALUES)
+
+    def test_delivery_errors(self):
+        self.assertRaises(ValueError, self.block.set_delivery, "unknown")
+        self.assertRaises(ValueError, self.block.set_delivery,
+                          LogConfig.ARRAY)
+
+    def test_offset_and_trailing_bytes(self):
+        self.block.set_delivery(LogConfig.TUPLE)
+        self.block.unpack_log_data("\x01\x02\x03\x04" + DATA + "\xff\xff",
+                                   0, 4)
+        self.assertEqual(self.received[0][1], VALUES)
+
+    def test_recompiled(self):
+        self.block.set_delivery(LogConfig.TUPLE)
+        self.block.compile()
+        self.block.add_variable("motor.m2", "uint8_t")
+        self.block.unpack_log_data(DATA + "\x07", 0)
+        self.assertEqual(self.received[0][1], VALUES + (7,))
+
+
+class LogDataTest(unittest.TestCase):
+    """Log data packets passed to Log"""
+
+    def setUp(self):
+        self.log = Log(FakeCrazyflie())
+        self.block = LogConfig("Test", 10)
+        for name, fetch_as in VARIABLES:
+            self.block.add_variable(name, fetch_as)
+        self.block.set_delivery(LogConfig.TUPLE)
+        self.log.log_blocks.append(self.block)
+        self.received = []
+        self.block.data_received_cb.add_callback(
+            lambda ts, data, block: self.received.append((ts, data)))
+
+    def test_timestamp(self):
+        header = struct.pack("<BHB", self.block.id, 0x3456, 0x12)
+        pk = CRTPPacket(CRTPPort.LOGGING << 4 | CHAN_LOGDATA, header + DATA)
+        self.log._new_packet_cb(pk)
+        self.assertEqual(self.received, [(0x123456, VALUES)])
+
+    def test_unknown_block(self):
+        header = struct.pack("<BHB", (self.block.id + 1) % 255, 0, 0)
+        pk = CRTPPacket(CRTPPort.LOGGING << 4 | CHAN_LOGDATA, header + DATA)
+        logger = logging.getLogger("cflib.crazyflie.log")
+        logger.disabled = True
+        try:
+            self.log._new_packet_cb(pk)
+        finally:
+            logger.disabled = False
+        self.assertEqual(self.received, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Tests of the packing of log subscriptions into log blocks.
+
+Run from the repository root with: python -m unittest discover -s test
+"""
+
+__author__ = 'Bitcraze AB'
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lib"))
+
+from cflib.crazyflie.log import (Log, LogConfig, LogSubscription,
+                                 LogTocElement, _pack_variables)
+
+from test_logconfig import FakeCrazyflie
+
+FLOAT = LogTocElement.get_id_from_cstring("float")
+INT16 = LogTocElement.get_id_from_cstring("int16_t")
+UINT8 = LogTocElement.get_id_from_cstring("uint8_t")
+# Space for variables in a log data packet
+SPACE = 26
+
+
+def sizes_of(keys):
+    return dict((key, LogTocElement.get_size_from_id(key[1]))
+                for key in keys)
+
+
+class PackVariablesTest(unittest.TestCase):
+    """First fit decreasing packing"""
+
+    def pack(self, keys):
+        sizes = sizes_of(keys)
+        groups = _pack_variables(keys, sizes)
+        # Every variable is packed once and every packet fits
+        self.assertEqual(sorted(k for g in groups for k in g), sorted(keys))
+        for group in groups:
+            self.assertTrue(sum(sizes[k] for k in group) <= SPACE)
+        return groups
+
+    def test_empty(self):
+        self.assertEqual(self.pack([]), [])
+
+    def test_one_packet(self):
+        keys = [("a.%d" % i, FLOAT) for i in range(6)] + [("b.x", INT16)]
+        self.assertEqual(len(self.pack(keys)), 1)
+
+    def test_decreasing(self):
+        keys = ([("u.%d" % i, UINT8) for i in range(4)] +
+                [("f.%d" % i, FLOAT) for i in range(6)])
+        groups = self.pack(keys)
+        # The floats are placed first, the bytes fill what is left
+        self.assertEqual(groups[0], [("f.%d" % i, FLOAT) for i in range(6)] +
+                         [("u.0", UINT8), ("u.1", UINT8)])
+        self.assertEqual(groups[1], [("u.2", UINT8), ("u.3", UINT8)])
+
+    def test_minimal(self):
+        # 42 bytes of mixed sizes need no more than two packets
+        keys = []
+        for i in range(5):
+            keys += [("f.%d" % i, FLOAT), ("s.%d" % i, INT16)]
+        keys += [("f.%d" % i, FLOAT) for i in range(5, 8)]
+        self.assertEqual(len(self.pack(keys)), 2)
+
+    def test_name_once_per_packet(self):
+        keys = [("a.x", FLOAT), ("a.x", INT16)]
+        groups = self.pack(keys)
+        self.assertEqual(len(groups), 2)
+
+
+class RoutingTest(unittest.TestCase):
+    """Data of packed blocks passed to the subscriptions"""
+
+    def test_spread_subscription(self):
+        log = Log(FakeCrazyflie())
+        first = LogConfig("Packed", 100)
+        second = LogConfig("Packed", 100)
+        sub = LogSubscription("Sub", 100, ["a.x", "b.y"])
+        other = LogSubscription("Other", 100, ["a.x"])
+        received = []
+        sub.data_received_cb.add_callback(
+            lambda ts, data, s: received.append((ts, data, s)))
+        other.data_received_cb.add_callback(
+            lambda ts, data, s: received.append((ts, data, s)))
+        sub._blocks = [first, second]
+        other._blocks = [first]
+        log._routes = {first: [(sub, [(1, "a.x")]), (other, [(1, "a.x")])],
+                       second: [(sub, [(0, "b.y")])]}
+
+        log._packed_block_data(10, (7, 1.5), first)
+        self.assertEqual(received, [(10, {"a.x": 1.5}, other)])
+        log._packed_block_data(11, (2.5,), second)
+        self.assertEqual(received[1], (11, {"a.x": 1.5, "b.y": 2.5}, sub))
+
+    def test_reset_clears_routes(self):
+        log = Log(FakeCrazyflie())
+        log.cf.send_packet = lambda pk, expected_reply=(): True
+        block = LogConfig("Packed", 100)
+        sub = LogSubscription("Sub", 100, ["a.x"])
+        received = []
+        sub.data_received_cb.add_callback(
+            lambda ts, data, s: received.append(data))
+        sub._blocks = [block]
+        log._routes = {block: [(sub, [(0, "a.x")])]}
+        log.reset_blocks()
+        log._packed_block_data(10, (1.0,), block)
+        self.assertEqual(received, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
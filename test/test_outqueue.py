@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Tests of the outgoing packet queue of the link drivers.
+
+Run from the repository root with: python -m unittest discover -s test
+"""
+
+__author__ = 'Bitcraze AB'
+
+import os
+import sys
+import Queue
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lib"))
+
+from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
+from cflib.crtp.outqueue import OutgoingPacketQueue, _TokenBucket
+
+
+def packet(port, value=0):
+    """A packet on channel 0 of port"""
+    return CRTPPacket(port << 4, (value,))
+
+
+class TokenBucketTest(unittest.TestCase):
+    """The rate limit of bulk ports, with explicit times"""
+
+    def setUp(self):
+        # Times that are exact in binary, for exact token counts
+        self.bucket = _TokenBucket(8, 2)
+        self.bucket._last = 100.0
+
+    def test_burst(self):
+        self.assertTrue(self.bucket.take(100.0))
+        self.assertTrue(self.bucket.take(100.0))
+        self.assertFalse(self.bucket.take(100.0))
+
+    def test_refill(self):
+        self.bucket.take(100.0)
+        self.bucket.take(100.0)
+        self.assertEqual(self.bucket.time_to_token(100.0), 0.125)
+        self.assertEqual(self.bucket.time_to_token(100.0625), 0.0625)
+        self.assertTrue(self.bucket.take(100.125))
+        self.assertFalse(self.bucket.take(100.125))
+
+    def test_burst_limit(self):
+        # A long pause does not give more than burst tokens
+        self.assertTrue(self.bucket.take(200.0))
+        self.assertTrue(self.bucket.take(200.0))
+        self.assertFalse(self.bucket.take(200.0))
+
+
+class OutgoingPacketQueueTest(unittest.TestCase):
+    """Scheduling of the packet classes"""
+
+    def setUp(self):
+        self.queue = OutgoingPacketQueue(maxsize=3, control_share=2)
+
+    def test_latest_setpoint_wins(self):
+        self.queue.put(packet(CRTPPort.COMMANDER, 1))
+        self.queue.put(packet(CRTPPort.COMMANDER, 2))
+        self.assertEqual(self.queue.qsize(), 1)
+        self.assertEqual(self.queue.get(False).datat, (2,))
+        self.assertRaises(Queue.Empty, self.queue.get, False)
+        stats = self.queue.get_stats()["commander"]
+        self.assertEqual(stats["sent"], 1)
+        self.assertEqual(stats["dropped"], 1)
+
+    def test_setpoint_first(self):
+        self.queue.put(packet(CRTPPort.CONSOLE))
+        self.queue.put(packet(CRTPPort.PARAM))
+        self.queue.put(packet(CRTPPort.COMMANDER))
+        ports = [self.queue.get(False).port for _ in range(3)]
+        self.assertEqual(ports, [CRTPPort.COMMANDER, CRTPPort.PARAM,
+                                 CRTPPort.CONSOLE])
+
+    def test_control_share(self):
+        # Setpoints sent continuously leave every third packet to control
+        for i in range(3):
+            self.queue.put(packet(CRTPPort.PARAM, i))
+        ports = []
+        for _ in range(9):
+            self.queue.put(packet(CRTPPort.COMMANDER))
+            ports.append(self.queue.get(False).port)
+        self.assertEqual(ports, [CRTPPort.COMMANDER, CRTPPort.COMMANDER,
+                                 CRTPPort.PARAM] * 3)
+
+    def test_full(self):
+        for i in range(3):
+            self.queue.put(packet(CRTPPort.PARAM, i))
+        self.assertTrue(self.queue.full())
+        self.assertEqual(self.queue.fill_level(), 1.0)
+        self.assertRaises(Queue.Full, self.queue.put,
+                          packet(CRTPPort.PARAM), False)
+        self.assertRaises(Queue.Full, self.queue.put,
+                          packet(CRTPPort.PARAM), True, 0.01)
+        self.assertEqual(self.queue.get_stats()["control"]["dropped"], 2)
+        # Setpoints are never blocked
+        self.queue.put(packet(CRTPPort.COMMANDER), False)
+
+    def test_rate_limit(self):
+        self.queue.set_rate_limit(CRTPPort.CONSOLE, 1)
+        self.queue.put(packet(CRTPPort.CONSOLE, 1))
+        self.queue.put(packet(CRTPPort.CONSOLE, 2))
+        self.queue.put(packet(CRTPPort.DEBUGDRIVER, 3))
+        now = self.queue._rate_limits[CRTPPort.CONSOLE]._last
+        self.assertEqual(self.queue.next_send_time(now), now)
+        self.assertEqual(self.queue.get(False).datat, (1,))
+        # The other bulk ports are not held back
+        self.assertEqual(self.queue.get(False).datat, (3,))
+        self.assertRaises(Queue.Empty, self.queue.get, False)
+        now = self.queue._rate_limits[CRTPPort.CONSOLE]._last
+        self.assertAlmostEqual(self.queue.next_send_time(now), now + 1.0,
+                               places=2)
+
+    def test_next_send_time_empty(self):
+        self.assertIs(self.queue.next_send_time(), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Tests of the port workers and their overflow policies.
+
+Run from the repository root with: python -m unittest discover -s test
+"""
+
+__author__ = 'Bitcraze AB'
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lib"))
+
+from cflib.crazyflie.portworker import PortWorker, DROP_OLDEST, BLOCK, SAMPLE
+
+# Generous, the tests only wait this long if something is wrong
+TIMEOUT = 5.0
+
+
+class PortWorkerTest(unittest.TestCase):
+    """The queue of workers, most of them not started so nothing is taken
+    from it"""
+
+    def setUp(self):
+        self.received = []
+        self.done = threading.Event()
+        self.expected = None
+
+    def callback(self, pk):
+        self.received.append(pk)
+        if len(self.received) == self.expected:
+            self.done.set()
+
+    def wait_for(self, count):
+        self.expected = count
+        if len(self.received) < count:
+            self.assertTrue(self.done.wait(TIMEOUT))
+
+    def test_unknown_policy(self):
+        self.assertRaises(ValueError, PortWorker, "x", self.callback, 10,
+                          "unknown", start=False)
+
+    def test_drop_oldest(self):
+        worker = PortWorker("x", self.callback, 3, DROP_OLDEST, start=False)
+        for i in range(5):
+            worker.put(i)
+        stats = worker.get_stats()
+        self.assertEqual(stats["depth"], 3)
+        self.assertEqual(stats["dropped"], 2)
+        self.assertEqual(stats["queued"], 5)
+        worker.start()
+        self.wait_for(3)
+        self.assertEqual(self.received, [2, 3, 4])
+
+    def test_sample(self):
+        worker = PortWorker("x", self.callback, 8, SAMPLE, sample_every=4,
+                            start=False)
+        for i in range(20):
+            worker.put(i)
+        # All are kept until half full, then one out of four
+        self.assertEqual(list(worker._queue), [0, 1, 2, 3, 7, 11, 15, 19])
+        self.assertEqual(worker.get_stats()["dropped"], 12)
+
+    def test_block(self):
+        gate = threading.Event()
+
+        def slow(pk):
+            gate.wait(TIMEOUT)
+            self.callback(pk)
+        worker = PortWorker("x", slow, 2, BLOCK)
+        for i in range(3):
+            # One is taken by the thread, waiting in the callback
+            worker.put(i)
+        putter = threading.Thread(target=worker.put, args=(3,))
+        putter.start()
+        putter.join(0.05)
+        self.assertTrue(putter.is_alive())
+        gate.set()
+        putter.join(TIMEOUT)
+        self.assertFalse(putter.is_alive())
+        self.wait_for(4)
+        self.assertEqual(self.received, [0, 1, 2, 3])
+        self.assertEqual(worker.get_stats()["dropped"], 0)
+
+    def test_stop(self):
+        worker = PortWorker("x", self.callback, 10, start=False)
+        worker.put(1)
+        worker.put(2)
+        handed = []
+        self.assertEqual(worker.stop(handed.append), [1, 2])
+        worker.put(3)
+        self.assertEqual(handed, [3])
+        self.assertEqual(worker.get_stats()["depth"], 0)
+
+    def test_stop_running(self):
+        worker = PortWorker("x", self.callback, 10)
+        worker.put(1)
+        self.wait_for(1)
+        self.assertEqual(worker.stop(self.callback), [])
+        self.assertFalse(worker._thread.is_alive())
+
+    def test_start_backlog(self):
+        worker = PortWorker("x", self.callback, 3, start=False)
+        worker.put(3)
+        worker.put(4)
+        worker.start([1, 2])
+        self.wait_for(3)
+        # The oldest of the backlog is dropped to keep maxsize
+        self.assertEqual(self.received, [2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
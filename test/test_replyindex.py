@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Tests of the index of the replies expected from the Crazyflie.
+
+Run from the repository root with: python -m unittest discover -s test
+"""
+
+__author__ = 'Bitcraze AB'
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lib"))
+
+from cflib.crazyflie.replyindex import ReplyPatternIndex
+
+
+class ReplyPatternIndexTest(unittest.TestCase):
+    """The dict interface and the matching of packets"""
+
+    def setUp(self):
+        self.index = ReplyPatternIndex()
+
+    def test_dict(self):
+        self.index[(0x2C, 0, 5)] = "a"
+        self.index[(0x2C, 0, 5)] = "b"
+        self.assertEqual(len(self.index), 1)
+        self.assertIn((0x2C, 0, 5), self.index)
+        self.assertNotIn((0x2C, 0), self.index)
+        self.assertEqual(self.index[(0x2C, 0, 5)], "b")
+        self.assertRaises(KeyError, lambda: self.index[(0x2C, 0)])
+        del self.index[(0x2C, 0, 5)]
+        self.assertEqual(len(self.index), 0)
+        self.assertRaises(KeyError, self.index.__delitem__, (0x2C, 0, 5))
+
+    def test_prune(self):
+        self.index[(0x2C, 0, 5)] = "a"
+        self.index[(0x2C, 0)] = "b"
+        del self.index[(0x2C, 0, 5)]
+        self.assertEqual(self.index[(0x2C, 0)], "b")
+        del self.index[(0x2C, 0)]
+        # The nodes left empty are removed
+        self.assertEqual(self.index._headers, {})
+
+    def test_longest_match(self):
+        self.index[(0x2C, 0)] = "short"
+        self.index[(0x2C, 0, 5)] = "long"
+        self.assertEqual(self.index.match(0x2C, (0, 5, 1, 2)), (0x2C, 0, 5))
+        self.assertEqual(self.index.match(0x2C, (0, 6, 1)), (0x2C, 0))
+        self.assertIs(self.index.match(0x2C, (1, 5)), None)
+        self.assertIs(self.index.match(0x3C, (0, 5)), None)
+        # The data has to be at least as long as the pattern
+        self.assertEqual(self.index.match(0x2C, (0,)), (0x2C, 0))
+
+    def test_header_only(self):
+        self.index[(0x5C,)] = "any"
+        self.assertEqual(self.index.match(0x5C, ()), (0x5C,))
+        self.assertEqual(self.index.match(0x5C, (1, 2)), (0x5C,))
+
+    def test_pop_match(self):
+        self.index[(0x2C, 0, 5)] = "a"
+        self.assertEqual(self.index.pop_match(0x2C, (0, 5, 9)),
+                         ((0x2C, 0, 5), "a"))
+        self.assertIs(self.index.pop_match(0x2C, (0, 5, 9)), None)
+        stats = self.index.get_stats()
+        self.assertEqual(stats["pending"], 0)
+        self.assertEqual(stats["matched"], 1)
+        self.assertTrue(stats["max_latency"] >= 0.0)
+
+    def test_values_clear(self):
+        self.index[(0x2C, 0, 5)] = "a"
+        self.index[(0x2C, 0)] = "b"
+        self.index[(0x5C, 1)] = "c"
+        self.assertEqual(sorted(self.index.values()), ["a", "b", "c"])
+        self.index.clear()
+        self.assertEqual(len(self.index), 0)
+        self.assertEqual(self.index.values(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Tests of the round trip time estimation and of the retries using it.
+
+Run from the repository root with: python -m unittest discover -s test
+"""
+
+__author__ = 'Bitcraze AB'
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lib"))
+
+from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.rttestimator import RttEstimator
+
+
+class RttEstimatorTest(unittest.TestCase):
+    """The RFC 6298 computations"""
+
+    def setUp(self):
+        self.rtt = RttEstimator()
+
+    def test_initial(self):
+        self.assertEqual(self.rtt.rto, RttEstimator.INITIAL_RTO)
+        self.assertIs(self.rtt.srtt, None)
+
+    def test_first_sample(self):
+        self.rtt.sample(0.1)
+        self.assertAlmostEqual(self.rtt.srtt, 0.1)
+        self.assertAlmostEqual(self.rtt.rttvar, 0.05)
+        # SRTT + K * RTTVAR
+        self.assertAlmostEqual(self.rtt.rto, 0.3)
+
+    def test_smoothing(self):
+        self.rtt.sample(0.1)
+        self.rtt.sample(0.2)
+        # RTTVAR = 3/4 * 0.05 + 1/4 * |0.1 - 0.2|, SRTT = 7/8 * 0.1 + 1/8 * 0.2
+        self.assertAlmostEqual(self.rtt.rttvar, 0.0625)
+        self.assertAlmostEqual(self.rtt.srtt, 0.1125)
+        self.assertAlmostEqual(self.rtt.rto, 0.3625)
+
+    def test_limits(self):
+        self.rtt.sample(0.001)
+        self.assertEqual(self.rtt.rto, RttEstimator.MIN_RTO)
+        self.rtt = RttEstimator()
+        self.rtt.sample(1.0)
+        self.assertEqual(self.rtt.rto, RttEstimator.MAX_RTO)
+
+    def test_backoff(self):
+        timeouts = [self.rtt.get_timeout(retries) for retries in range(6)]
+        self.assertEqual(timeouts, [0.2, 0.4, 0.8, 1.6, 2.0, 2.0])
+
+    def test_stats(self):
+        for i in range(1, 101):
+            self.rtt.sample(i / 1000.0)
+        stats = self.rtt.get_stats()
+        self.assertEqual(stats["samples"], 100)
+        self.assertAlmostEqual(stats["p50"], 0.051)
+        self.assertAlmostEqual(stats["p90"], 0.091)
+        self.assertAlmostEqual(stats["p99"], 0.1)
+
+
+class KarnTest(unittest.TestCase):
+    """Only replies to packets that were not resent are measured"""
+
+    def setUp(self):
+        self.cf = Crazyflie()
+        self.port = CRTPPort.PARAM
+
+    def reply(self, retries):
+        pk = CRTPPacket(self.port << 4, (0, 5))
+        pending, _ = self.cf._expect_reply(pk, (0, 5))
+        pending.retries = retries
+        self.cf._check_for_answers(CRTPPacket(self.port << 4, (0, 5, 1)))
+        self.assertEqual(len(self.cf._answer_patterns), 0)
+
+    def test_resent_not_sampled(self):
+        self.reply(1)
+        self.assertEqual(self.cf._get_rtt_estimator(self.port)
+                         .get_stats()["samples"], 0)
+
+    def test_first_sending_sampled(self):
+        self.reply(0)
+        self.assertEqual(self.cf._get_rtt_estimator(self.port)
+                         .get_stats()["samples"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Tests of the deadline scheduler.
+
+Run from the repository root with: python -m unittest discover -s test
+"""
+
+__author__ = 'Bitcraze AB'
+
+import os
+import sys
+import logging
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lib"))
+
+from cflib.utils.scheduler import Scheduler, get_scheduler
+
+# Generous, the tests only wait this long if something is wrong
+TIMEOUT = 5.0
+
+
+class SchedulerTest(unittest.TestCase):
+    """Deadlines on a scheduler of their own"""
+
+    def setUp(self):
+        self.scheduler = Scheduler()
+        self.calls = []
+        self.done = threading.Event()
+
+    def call(self, name, last=False):
+        self.calls.append(name)
+        if last:
+            self.done.set()
+
+    def test_order(self):
+        self.scheduler.schedule(0.06, self.call, "c", True)
+        self.scheduler.schedule(0.02, self.call, "a")
+        self.scheduler.schedule(0.04, self.call, "b")
+        self.assertTrue(self.done.wait(TIMEOUT))
+        self.assertEqual(self.calls, ["a", "b", "c"])
+
+    def test_earlier_deadline_wakes_thread(self):
+        self.scheduler.schedule(TIMEOUT * 2, self.call, "late")
+        self.scheduler.schedule(0.01, self.call, "early", True)
+        self.assertTrue(self.done.wait(TIMEOUT))
+        self.assertEqual(self.calls, ["early"])
+        # The late deadline is still waiting
+        self.assertEqual(self.scheduler.pending(), 1)
+
+    def test_cancel(self):
+        deadline = self.scheduler.schedule(0.01, self.call, "cancelled")
+        deadline.cancel()
+        self.scheduler.schedule(0.03, self.call, "kept", True)
+        self.assertTrue(self.done.wait(TIMEOUT))
+        self.assertEqual(self.calls, ["kept"])
+
+    def test_exception(self):
+        def fail():
+            raise RuntimeError("expected")
+        logger = logging.getLogger("cflib.utils.scheduler")
+        logger.disabled = True
+        try:
+            self.scheduler.schedule(0.0, fail)
+            self.scheduler.schedule(0.01, self.call, "after", True)
+            self.assertTrue(self.done.wait(TIMEOUT))
+        finally:
+            logger.disabled = False
+        self.assertEqual(self.calls, ["after"])
+
+    def test_shared(self):
+        self.assertIs(get_scheduler(), get_scheduler())
+
+
+if __name__ == "__main__":
+    unittest.main()
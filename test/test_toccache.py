@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2014 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Tests of the TOC cache.
+
+Run from the repository root with: python -m unittest discover -s test
+"""
+
+__author__ = 'Bitcraze AB'
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lib"))
+
+from cflib.crazyflie.toc import Toc, intern_toc
+from cflib.crazyflie.toccache import TocCache
+from cflib.crazyflie.param import ParamTocElement
+
+CACHE = os.path.join(os.path.dirname(__file__), "..", "lib", "cflib",
+                     "cache")
+
+
+class TocCacheJsonTest(unittest.TestCase):
+    """TOCs read from the shipped JSON cache files"""
+
+    def setUp(self):
+        self.crc = 0x27A2C4BA
+        self.cache = TocCache(ro_cache=CACHE)
+
+    def test_keys_are_str(self):
+        toc = self.cache.fetch(self.crc)
+        self.assertTrue(toc)
+        for group, elements in toc.iteritems():
+            self.assertIs(type(group), str)
+            for name, element in elements.iteritems():
+                self.assertIs(type(name), str)
+                self.assertEqual(element.group, group)
+                self.assertEqual(element.name, name)
+
+    def test_intern(self):
+        toc = self.cache.fetch(self.crc)
+        shared = intern_toc(ParamTocElement, self.crc, toc)
+        lookup = Toc()
+        lookup.toc = shared
+        element = lookup.get_element_by_complete_name("sensorfusion6.kp")
+        self.assertEqual(element.ident, 23)
+
+
+class TocCachePruneTest(unittest.TestCase):
+    """The read-write cache size limit"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.crc = 0x27A2C4BA
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_read_only_kept(self):
+        cache = TocCache(ro_cache=CACHE, rw_cache=self.dir, max_entries=1)
+        toc = cache.fetch(self.crc)
+        # Imported into the read-write cache
+        self.assertTrue(os.path.exists(
+            os.path.join(self.dir, "%08X.toc" % self.crc)))
+        cache.insert(0x12345678, toc)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.dir, "%08X.toc" % self.crc)))
+        # Found in the read-only cache again once removed
+        self.assertTrue(cache.fetch(self.crc))
+
+
+class TocCacheLastTest(unittest.TestCase):
+    """The CRCs of the last TOCs used, shared by the users of a cache"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_merge(self):
+        # Both opened before either saves, like two clients running
+        first = TocCache(rw_cache=self.dir)
+        second = TocCache(rw_cache=self.dir)
+        first.set_last("radio://0/10/250K", {"log": 1, "param": 2})
+        second.set_last("radio://0/80/2M", {"log": 3, "param": 4})
+
+        reopened = TocCache(rw_cache=self.dir)
+        self.assertEqual(reopened.get_last("radio://0/10/250K"),
+                         {"log": 1, "param": 2})
+        self.assertEqual(reopened.get_last("radio://0/80/2M"),
+                         {"log": 3, "param": 4})
+        self.assertEqual(second.get_last("radio://0/10/250K"),
+                         {"log": 1, "param": 2})
+
+    def test_update(self):
+        first = TocCache(rw_cache=self.dir)
+        second = TocCache(rw_cache=self.dir)
+        first.set_last("radio://0/10/250K", {"log": 1, "param": 2})
+        second.set_last("radio://0/10/250K", {"log": 5, "param": 6})
+        # Unchanged in memory of the first cache but not in the file
+        first.set_last("radio://0/10/250K", {"log": 1, "param": 2})
+        self.assertEqual(
+            TocCache(rw_cache=self.dir).get_last("radio://0/10/250K"),
+            {"log": 1, "param": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()